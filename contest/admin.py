@@ -11,6 +11,7 @@ from .models import (
     GameList,
     GameListEntry,
 )
+from .tally import RebuildTally
 
 
 @admin.register(Competition)
@@ -89,6 +90,23 @@ class CompetitionVoteAdmin(admin.ModelAdmin):
     ]
     raw_id_fields = ["game", "nomination"]
 
+    def save_model(self, request, obj, form, change):
+        # A vote moved to another competition leaves the old one's totals.
+        old = form.initial.get("competition") if change else None
+        super().save_model(request, obj, form, change)
+        for competition_id in {old, obj.competition_id} - {None}:
+            RebuildTally(competition_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        RebuildTally(obj.competition_id)
+
+    def delete_queryset(self, request, queryset):
+        competitions = set(queryset.values_list("competition_id", flat=True))
+        super().delete_queryset(request, queryset)
+        for competition_id in competitions:
+            RebuildTally(competition_id)
+
 
 @admin.register(CompetitionQuestion)
 class CompetitionQuestionAdmin(admin.ModelAdmin):
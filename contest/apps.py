@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
 
 
 class ContestConfig(AppConfig):
     name = "contest"
+
+    def ready(self):
+        from .tally import RebuildVotedCompetitions, RememberVotedCompetitions
+        from .views import LISTING_MODELS, InvalidateCompetitionListing
+
+        for model in LISTING_MODELS:
+            post_save.connect(InvalidateCompetitionListing, sender=model)
+            post_delete.connect(InvalidateCompetitionListing, sender=model)
+        pre_delete.connect(
+            RememberVotedCompetitions, sender=settings.AUTH_USER_MODEL
+        )
+        post_delete.connect(
+            RebuildVotedCompetitions, sender=settings.AUTH_USER_MODEL
+        )
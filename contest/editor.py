@@ -1,4 +1,7 @@
+from collections import defaultdict
+
 from django import forms
+from django.db import transaction
 from django.forms import widgets
 from django.shortcuts import redirect, render
 from django.urls import reverse
@@ -13,7 +16,12 @@ from contest.models import (
     GameList,
     GameListEntry,
 )
-from games.tools import CreateUrl
+from contest.views import (
+    InvalidateCompetitionListing,
+    InvalidateCompetitionRender,
+)
+from games.models import Game
+from games.tools import CreateUrls
 
 YEARS = range(timezone.now().year + 1, 1990, -1)
 
@@ -57,12 +65,11 @@ class UrlForm(forms.Form):
     url = forms.CharField()
     category = forms.ChoiceField(label="Тип ссылки", required=True, choices=[])
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, categories, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields["category"].choices = [(None, "(надо выбрать)")] + [
-            (x.id, x.title)
-            for x in CompetitionURLCategory.objects.order_by("order")
-        ]
+        self.fields["category"].choices = [
+            (None, "(надо выбрать)")
+        ] + categories
 
 
 class NominationsForm(forms.Form):
@@ -131,6 +138,70 @@ class DocumentsFormSet(forms.BaseFormSet):
             slugs.append(x)
 
 
+def SaveFormset(formset, queryset, populate, fields, **new_fields):
+    """Writes the changed rows of a formset with a statement per change kind.
+
+    Existing rows are loaded from queryset in one query, so ids that do not
+    belong to it are ignored. New rows get new_fields, populate(obj, cleaned)
+    fills both from the form, and fields lists what it may change.
+    """
+    changed = [f.cleaned_data for f in formset if f.has_changed()]
+    if not changed:
+        return
+    model = queryset.model
+    existing = queryset.in_bulk([x["id"] for x in changed if x.get("id")])
+    to_create = []
+    to_update = []
+    to_delete = []
+    for cl in changed:
+        if cl.get("id"):
+            obj = existing.get(cl["id"])
+            if obj is None:
+                continue
+        else:
+            obj = model(**new_fields)
+        if cl["DELETE"]:
+            if obj.id:
+                to_delete.append(obj.id)
+            continue
+        populate(obj, cl)
+        (to_update if obj.id else to_create).append(obj)
+    if to_delete:
+        queryset.filter(pk__in=to_delete).delete()
+    model.objects.bulk_update(to_update, fields)
+    model.objects.bulk_create(to_create)
+
+
+def _CompetitionGameIds(comp):
+    return set(
+        GameListEntry.objects.filter(
+            gamelist__competition=comp, game__isnull=False
+        ).values_list("game_id", flat=True)
+    )
+
+
+def _UrlPopulator(formset):
+    """PopulateUrl for SaveFormset, with all urls created in one batch.
+
+    CreateUrls queues backups only once the transaction commits, so the
+    worker never looks for a URL row that is not visible yet.
+    """
+    categories = CompetitionURLCategory.objects.in_bulk()
+    ok_to_clone = defaultdict(bool)
+    for f in formset:
+        if f.has_changed() and not f.cleaned_data.get("DELETE"):
+            category = categories[int(f.cleaned_data["category"])]
+            ok_to_clone[f.cleaned_data["url"]] |= category.allow_cloning
+    urls = CreateUrls(ok_to_clone) if ok_to_clone else {}
+
+    def PopulateUrl(v, cl):
+        v.category = categories[int(cl["category"])]
+        v.url = urls[cl["url"]]
+        v.description = cl["description"]
+
+    return PopulateUrl
+
+
 def edit_competition(request, id):
     comp = Competition.objects.get(pk=id)
     if comp.owner:
@@ -154,6 +225,12 @@ def edit_competition(request, id):
     urls = Urls(
         request.POST or None,
         prefix="urls",
+        form_kwargs={
+            "categories": [
+                (x.id, x.title)
+                for x in CompetitionURLCategory.objects.order_by("order")
+            ],
+        },
         initial=[
             {
                 "id": x.id,
@@ -161,7 +238,9 @@ def edit_competition(request, id):
                 "url": x.url,
                 "category": x.category_id,
             }
-            for x in CompetitionURL.objects.filter(competition=comp)
+            for x in CompetitionURL.objects.filter(
+                competition=comp
+            ).select_related("url")
         ],
     )
 
@@ -221,60 +300,74 @@ def edit_competition(request, id):
     fs = [main, urls, nominations, schedule, documents]
 
     if request.POST and all(map(lambda x: x.is_valid(), fs)):
-        if main.has_changed():
-            for x in ["title", "slug", "start_date", "end_date", "published"]:
-                field = main.cleaned_data[x]
-                setattr(comp, x, field)
-            comp.save()
-
-        def ProcessFormset(formset, model, func):
-            if not formset.has_changed():
-                return None
-            for f in formset:
-                if not f.has_changed():
-                    continue
-                cl = f.cleaned_data
-                if cl["id"]:
-                    v = model.objects.get(pk=cl["id"], competition_id=comp.id)
-                else:
-                    v = model()
-                    v.competition_id = comp.id
-                if cl["DELETE"]:
-                    if v.id:
-                        v.delete()
-                    continue
-                func(v, cl)
-                v.save()
-
-        def PopulateUrl(v, cl):
-            v.category = CompetitionURLCategory.objects.get(pk=cl["category"])
-            v.url = CreateUrl(cl["url"], ok_to_clone=v.category.allow_cloning)
-            v.description = cl["description"]
-
-        ProcessFormset(urls, CompetitionURL, PopulateUrl)
-
-        def PopulateNomination(v, cl):
-            v.order = cl["order"]
-            v.title = cl["title"]
-
-        ProcessFormset(nominations, GameList, PopulateNomination)
-
-        def PopulateSchedule(v, cl):
-            v.when = cl["when"]
-            v.show = cl["show"]
-            v.title = cl["title"]
-            if v.done is None:
-                v.done = False
-
-        ProcessFormset(schedule, CompetitionSchedule, PopulateSchedule)
-
-        def PopulateDocument(v, cl):
-            v.slug = cl["slug"]
-            v.title = cl["title"]
-            v.order = cl["order"]
-
-        ProcessFormset(documents, CompetitionDocument, PopulateDocument)
+        with transaction.atomic():
+            if main.has_changed():
+                for x in [
+                    "title",
+                    "slug",
+                    "start_date",
+                    "end_date",
+                    "published",
+                ]:
+                    field = main.cleaned_data[x]
+                    setattr(comp, x, field)
+                comp.save()
+
+            in_comp = {"competition_id": comp.id}
+
+            SaveFormset(
+                urls,
+                CompetitionURL.objects.filter(**in_comp),
+                _UrlPopulator(urls),
+                ["category", "url", "description"],
+                **in_comp,
+            )
 
+            def PopulateNomination(v, cl):
+                v.order = cl["order"]
+                v.title = cl["title"]
+
+            SaveFormset(
+                nominations,
+                GameList.objects.filter(**in_comp),
+                PopulateNomination,
+                ["order", "title"],
+                **in_comp,
+            )
+            if nominations.has_changed():
+                # Nomination titles show on the game pages.
+                Game.BumpRevision(*_CompetitionGameIds(comp))
+
+            def PopulateSchedule(v, cl):
+                v.when = cl["when"]
+                v.show = cl["show"]
+                v.title = cl["title"]
+                if v.done is None:
+                    v.done = False
+
+            SaveFormset(
+                schedule,
+                CompetitionSchedule.objects.filter(**in_comp),
+                PopulateSchedule,
+                ["when", "show", "title", "done"],
+                **in_comp,
+            )
+
+            def PopulateDocument(v, cl):
+                v.slug = cl["slug"]
+                v.title = cl["title"]
+                v.order = cl["order"]
+
+            SaveFormset(
+                documents,
+                CompetitionDocument.objects.filter(**in_comp),
+                PopulateDocument,
+                ["slug", "title", "order"],
+                **in_comp,
+            )
+
+        InvalidateCompetitionListing()
+        InvalidateCompetitionRender(comp.id)
         return redirect(request.get_full_path())
 
     return render(
@@ -297,18 +390,12 @@ def edit_competition(request, id):
 
 
 class ListEntryForm(forms.Form):
-    def __init__(self, *args, competition=None, **argw):
+    def __init__(self, *args, nominations=None, **argw):
         super().__init__(*args, **argw)
-        if competition:
-            choices = [
-                (x.id, x.title or "(основная)")
-                for x in GameList.objects.filter(
-                    competition=competition
-                ).order_by("order")
-            ]
+        if nominations is not None:
             self.fields["gamelist"].choices = [
                 (None, "(надо выбрать)")
-            ] + choices
+            ] + nominations
 
     id = forms.IntegerField(widget=widgets.HiddenInput(), required=False)
     rank = forms.IntegerField(required=False, label="Место")
@@ -358,9 +445,10 @@ def edit_complist(request, id):
                 "date": x.date,
                 "gamelist": x.gamelist_id,
             }
-            for x in GameListEntry.objects.filter(
-                gamelist__competition=comp
-            ).order_by(
+            for x in GameListEntry.objects
+            .filter(gamelist__competition=comp)
+            .select_related("game")
+            .order_by(
                 "gamelist__order",
                 "gamelist__id",
                 "rank",
@@ -370,33 +458,38 @@ def edit_complist(request, id):
             )
         ],
         form_kwargs={
-            "competition": comp,
+            "nominations": [
+                (x.id, x.title or "(основная)")
+                for x in GameList.objects.filter(competition=comp).order_by(
+                    "order"
+                )
+            ],
         },
     )
 
     if request.POST and entries.is_valid():
         if entries.has_changed():
-            for f in entries:
-                if not f.has_changed():
-                    continue
-                cl = f.cleaned_data
-                if cl["id"]:
-                    v = GameListEntry.objects.get(
-                        pk=cl["id"], gamelist__competition=comp
-                    )
-                else:
-                    v = GameListEntry()
-                if cl["DELETE"]:
-                    if v.id:
-                        v.delete()
-                    continue
+
+            def PopulateEntry(v, cl):
                 v.gamelist_id = cl["gamelist"]
                 v.rank = cl["rank"]
                 v.result = cl["result"]
                 v.game_id = cl["gameid"]
                 v.comment = cl["comment"]
                 v.date = cl["date"]
-                v.save()
+
+            with transaction.atomic():
+                game_ids = _CompetitionGameIds(comp)
+                SaveFormset(
+                    entries,
+                    GameListEntry.objects.filter(gamelist__competition=comp),
+                    PopulateEntry,
+                    ["gamelist", "rank", "result", "game", "comment", "date"],
+                )
+                # Game pages show the entries; bulk writes send no signals.
+                Game.BumpRevision(*game_ids | _CompetitionGameIds(comp))
+            InvalidateCompetitionRender(comp.id)
+            InvalidateCompetitionListing()
         return redirect(request.get_full_path())
 
     return render(
@@ -441,6 +534,7 @@ def edit_compdoc(request, id):
             doc.title = cl["title"]
             doc.text = cl["text"]
             doc.save()
+            InvalidateCompetitionRender(comp.id)
         return redirect(
             reverse(
                 "show_competition", kwargs={"slug": comp.slug, "doc": doc.slug}
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from contest.models import Competition
+from contest.tally import RebuildTally
+
+
+class Command(BaseCommand):
+    help = "Recomputes competition vote totals from the stored votes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "slugs",
+            nargs="*",
+            help="Competitions to rebuild (all with votes by default).",
+        )
+
+    def handle(self, *args, slugs, **options):
+        comps = Competition.objects.order_by("id")
+        if slugs:
+            comps = comps.filter(slug__in=slugs)
+        else:
+            comps = comps.filter(competitionvote__isnull=False).distinct()
+        for comp in comps:
+            self.stdout.write(
+                "%s: %d totals" % (comp.slug, RebuildTally(comp.id))
+            )
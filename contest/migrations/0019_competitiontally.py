@@ -0,0 +1,64 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "contest",
+            "0018_alter_competition_id_alter_competitiondocument_id_and_more",
+        ),
+        ("games", "0030_importjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompetitionTally",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("field", models.CharField(max_length=255)),
+                ("votes", models.IntegerField(default=0)),
+                ("numeric_votes", models.IntegerField(default=0)),
+                ("total", models.IntegerField(default=0)),
+                ("distribution", models.JSONField(default=dict)),
+                (
+                    "competition",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contest.competition",
+                    ),
+                ),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="games.game",
+                    ),
+                ),
+                (
+                    "nomination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contest.gamelist",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("nomination", "game", "field"),
+                        name="unique_competition_tally",
+                    )
+                ],
+            },
+        ),
+    ]
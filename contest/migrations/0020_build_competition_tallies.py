@@ -0,0 +1,68 @@
+from collections import Counter, defaultdict
+
+from django.db import migrations
+
+
+def build_competition_tallies(apps, schema_editor):
+    # Same totals as contest.tally.RebuildTally(), kept self-contained so
+    # later changes to that module don't change this migration.
+    CompetitionVote = apps.get_model("contest", "CompetitionVote")
+    CompetitionTally = apps.get_model("contest", "CompetitionTally")
+
+    tallies = defaultdict(
+        lambda: {
+            "votes": 0,
+            "numeric_votes": 0,
+            "total": 0,
+            "distribution": Counter(),
+        }
+    )
+    for vote in CompetitionVote.objects.filter(
+        nomination__isnull=False
+    ).iterator():
+        tally = tallies[
+            (vote.competition_id, vote.nomination_id, vote.game_id, vote.field)
+        ]
+        tally["votes"] += 1
+        value = (
+            int(vote.bool_val) if vote.bool_val is not None else vote.int_val
+        )
+        if value is not None:
+            tally["numeric_votes"] += 1
+            tally["total"] += value
+            tally["distribution"][str(value)] += 1
+
+    CompetitionTally.objects.all().delete()
+    CompetitionTally.objects.bulk_create(
+        [
+            CompetitionTally(
+                competition_id=competition_id,
+                nomination_id=nomination_id,
+                game_id=game_id,
+                field=field,
+                votes=tally["votes"],
+                numeric_votes=tally["numeric_votes"],
+                total=tally["total"],
+                distribution=dict(tally["distribution"]),
+            )
+            for (
+                competition_id,
+                nomination_id,
+                game_id,
+                field,
+            ), tally in tallies.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contest", "0019_competitiontally"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            build_competition_tallies, migrations.RunPython.noop
+        ),
+    ]
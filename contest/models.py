@@ -176,3 +176,34 @@ class CompetitionQuestion(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
     question_id = models.SlugField(max_length=32, db_index=True)
     text = models.TextField()
+
+
+class CompetitionTally(models.Model):
+    """Running aggregate of one ballot field for a game in a nomination.
+
+    Maintained by contest.tally as ballots change; rebuilt from
+    CompetitionVote with the rebuildtally command.
+    """
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["nomination", "game", "field"],
+                name="unique_competition_tally",
+            )
+        ]
+
+    def __str__(self):
+        return "%s -- %s -- %s" % (self.nomination, self.game, self.field)
+
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE)
+    nomination = models.ForeignKey(GameList, on_delete=models.CASCADE)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    field = models.CharField(max_length=255)
+    # All votes, and the ones with an integer or boolean value.
+    votes = models.IntegerField(default=0)
+    numeric_votes = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    # Number of votes per value, for numeric values only.
+    distribution = models.JSONField(default=dict)
@@ -0,0 +1,247 @@
+"""Running totals of competition votes.
+
+CompetitionTally keeps, per nomination, game and ballot field, the number of
+votes, the sum of numeric values and how many votes each value got. Ballot
+saves pass the votes they remove and add to UpdateTally(), which adjusts the
+affected rows in the same transaction, so standings never need a scan of
+CompetitionVote. RebuildTally() recomputes a competition from scratch, e.g.
+after votes are edited in the admin or deleted along with their user.
+"""
+
+import csv
+import json
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import CompetitionTally, CompetitionVote, GameListEntry
+
+
+def _NumericValue(vote):
+    if vote.bool_val is not None:
+        return int(vote.bool_val)
+    return vote.int_val
+
+
+def _Key(vote):
+    return (vote.nomination_id, vote.game_id, vote.field)
+
+
+class _Delta:
+    def __init__(self):
+        self.votes = 0
+        self.numeric_votes = 0
+        self.total = 0
+        self.distribution = Counter()
+
+    def Add(self, vote, sign):
+        self.votes += sign
+        value = _NumericValue(vote)
+        if value is not None:
+            self.numeric_votes += sign
+            self.total += sign * value
+            self.distribution[str(value)] += sign
+
+    def ApplyTo(self, tally):
+        tally.votes += self.votes
+        tally.numeric_votes += self.numeric_votes
+        tally.total += self.total
+        distribution = Counter(tally.distribution)
+        distribution.update(self.distribution)
+        tally.distribution = {k: v for k, v in distribution.items() if v > 0}
+
+
+def _Deltas(removed, added):
+    deltas = defaultdict(_Delta)
+    for votes, sign in [(removed, -1), (added, 1)]:
+        for vote in votes:
+            if vote.nomination_id is not None:
+                deltas[_Key(vote)].Add(vote, sign)
+    return deltas
+
+
+def UpdateTally(comp, removed=(), added=()):
+    """Applies a ballot change to the running totals.
+
+    removed are the votes as they were before the change (deleted rows and
+    old values of updated ones), added the votes as they are after it.
+    """
+    deltas = _Deltas(removed, added)
+    if not deltas:
+        return
+    with transaction.atomic():
+        # Make sure every row exists, then lock them, so that concurrent
+        # ballots add up instead of overwriting each other.
+        CompetitionTally.objects.bulk_create(
+            [
+                CompetitionTally(
+                    competition=comp,
+                    nomination_id=nom,
+                    game_id=game,
+                    field=field,
+                )
+                for nom, game, field in deltas
+            ],
+            ignore_conflicts=True,
+        )
+        tallies = (
+            CompetitionTally.objects
+            .select_for_update()
+            .filter(
+                competition=comp,
+                nomination__in={x[0] for x in deltas},
+                game__in={x[1] for x in deltas},
+                field__in={x[2] for x in deltas},
+            )
+            .order_by("id")
+        )
+        updated = []
+        for tally in tallies:
+            delta = deltas.get(_Key(tally))
+            if delta is not None:
+                delta.ApplyTo(tally)
+                updated.append(tally)
+        CompetitionTally.objects.bulk_update(
+            updated, ["votes", "numeric_votes", "total", "distribution"]
+        )
+        CompetitionTally.objects.filter(
+            pk__in=[x.pk for x in updated if x.votes <= 0]
+        ).delete()
+
+
+def RebuildTally(competition_id):
+    """Recomputes the running totals of a competition from its votes."""
+    deltas = _Deltas(
+        (),
+        CompetitionVote.objects.filter(
+            competition_id=competition_id
+        ).iterator(),
+    )
+    tallies = []
+    for (nom, game, field), delta in deltas.items():
+        tally = CompetitionTally(
+            competition_id=competition_id,
+            nomination_id=nom,
+            game_id=game,
+            field=field,
+        )
+        delta.ApplyTo(tally)
+        tallies.append(tally)
+    with transaction.atomic():
+        CompetitionTally.objects.filter(competition_id=competition_id).delete()
+        CompetitionTally.objects.bulk_create(tallies)
+    return len(tallies)
+
+
+def RememberVotedCompetitions(sender, instance, **kwargs):
+    """pre_delete receiver for users, whose votes go away with them."""
+    instance.voted_competitions = set(
+        CompetitionVote.objects.filter(user=instance).values_list(
+            "competition_id", flat=True
+        )
+    )
+
+
+def RebuildVotedCompetitions(sender, instance, **kwargs):
+    """post_delete receiver for users, see RememberVotedCompetitions."""
+    for competition_id in getattr(instance, "voted_competitions", ()):
+        RebuildTally(competition_id)
+
+
+def _Median(distribution):
+    values = sorted((int(k), v) for k, v in distribution.items())
+    count = sum(v for _, v in values)
+    if not count:
+        return None
+    # Positions of the two middle votes; the same one for an odd count.
+    middle = [(count - 1) // 2, count // 2]
+    found = []
+    seen = 0
+    for value, n in values:
+        seen += n
+        while len(found) < 2 and seen > middle[len(found)]:
+            found.append(value)
+    return found[0] if count % 2 else sum(found) / 2
+
+
+class GameResult:
+    def __init__(self, entry, tally):
+        self.game = entry.game
+        self.entry = entry
+        self.votes = tally.votes if tally else 0
+        self.numeric_votes = tally.numeric_votes if tally else 0
+        self.total = tally.total if tally else 0
+        self.distribution = (
+            {
+                int(k): v
+                for k, v in sorted(
+                    tally.distribution.items(), key=lambda x: int(x[0])
+                )
+            }
+            if tally
+            else {}
+        )
+        self.mean = (
+            self.total / self.numeric_votes if self.numeric_votes else None
+        )
+        self.median = _Median(tally.distribution) if tally else None
+
+    def AsJson(self):
+        return {
+            "game_id": self.game.id,
+            "title": self.game.title,
+            "votes": self.votes,
+            "mean": self.mean,
+            "median": self.median,
+            "distribution": self.distribution,
+        }
+
+
+def GetStandings(comp, nomination_id, field):
+    """Games of a nomination with their totals, best mean first."""
+    entries = (
+        GameListEntry.objects
+        .filter(gamelist_id=nomination_id, game__isnull=False)
+        .select_related("game")
+        .order_by("game__title")
+    )
+    tallies = {
+        x.game_id: x
+        for x in CompetitionTally.objects.filter(
+            competition=comp, nomination_id=nomination_id, field=field
+        )
+    }
+    results = [GameResult(x, tallies.get(x.game_id)) for x in entries]
+    results.sort(
+        key=lambda x: (x.mean is None, -(x.mean or 0), -x.numeric_votes)
+    )
+    return results
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+EXPORT_COLUMNS = ["game_id", "title", "votes", "mean", "median"]
+
+
+def ExportCsv(standings):
+    """Yields the standings as CSV lines, for StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    values = sorted({v for x in standings for v in x.distribution})
+    yield writer.writerow(EXPORT_COLUMNS + [str(v) for v in values])
+    for x in standings:
+        row = x.AsJson()
+        yield writer.writerow(
+            [row[k] for k in EXPORT_COLUMNS]
+            + [x.distribution.get(v, 0) for v in values]
+        )
+
+
+def ExportJson(standings):
+    """Yields the standings as a JSON list, for StreamingHttpResponse."""
+    yield "["
+    for i, x in enumerate(standings):
+        yield ("," if i else "") + json.dumps(x.AsJson(), ensure_ascii=False)
+    yield "]"
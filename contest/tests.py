@@ -1,7 +1,33 @@
-from django.test import Client, TestCase
+import json
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.db import connection
+from django.forms import modelform_factory
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from .models import Competition, CompetitionDocument
+from games.models import URL, Game
+from ifdb.permissioner import Permissioner
+
+from .admin import CompetitionVoteAdmin
+from .models import (
+    Competition,
+    CompetitionDocument,
+    CompetitionQuestion,
+    CompetitionTally,
+    CompetitionURL,
+    CompetitionURLCategory,
+    CompetitionVote,
+    GameList,
+    GameListEntry,
+)
+from .tally import GetStandings, RebuildTally
+from .voting import Ballot, RenderVoting
 
 
 class ShowCompetitionViewTest(TestCase):
@@ -32,3 +58,618 @@ class ShowCompetitionViewTest(TestCase):
 
         # The view should not crash (status should be 200, not 500)
         self.assertEqual(response.status_code, 200)
+
+
+class CompetitionDocumentCacheTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.comp = Competition.objects.create(
+            title="Contest",
+            slug="contest",
+            end_date=timezone.now().date(),
+            published=True,
+        )
+        self.gamelist = GameList.objects.create(competition=self.comp)
+        self.doc = CompetitionDocument.objects.create(
+            title="Main",
+            slug="",
+            competition=self.comp,
+            text="# Results\n\n{{ RESULTS }}\n\n{{ NOSUCH 1 }}",
+        )
+
+    def add_entry(self, comment):
+        GameListEntry.objects.create(gamelist=self.gamelist, comment=comment)
+
+    def test_results_are_cached_until_edited(self):
+        self.add_entry("First entry")
+        response = self.client.get("/jam/contest/")
+        self.assertContains(response, "<h1>Results</h1>", html=True)
+        self.assertContains(response, "First entry")
+        self.assertContains(response, "NOSUCH 1 ??")
+
+        self.add_entry("Second entry")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/jam/contest/")
+        self.assertNotContains(response, "Second entry")
+        self.assertFalse([
+            x for x in queries if 'FROM "contest_gamelist"' in x["sql"]
+        ])
+
+        user = get_user_model().objects.create_user(
+            username="owner", email="owner@example.com", password="pw"
+        )
+        self.comp.owner = user
+        self.comp.save()
+        self.client.force_login(user)
+        self.client.post(
+            "/jam/editdoc/%d/" % self.doc.id,
+            {"id": self.doc.id, "title": "Main", "text": "{{ RESULTS }}"},
+        )
+        response = self.client.get("/jam/contest/")
+        self.assertNotContains(response, "<h1>Results</h1>", html=True)
+        self.assertContains(response, "Second entry")
+
+    def test_literal_placeholders_are_ignored(self):
+        self.add_entry("Entry")
+        self.doc.text = "<!--snippet:0-->\n\n<!--snippet:3-->\n\n{{ RESULTS }}"
+        self.doc.save()
+
+        response = self.client.get("/jam/contest/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.decode().count("Entry"), 1)
+
+    def test_options_change_the_key(self):
+        GameListEntry.objects.create(
+            gamelist=self.gamelist, result="Winner", comment="Entry"
+        )
+        self.assertContains(self.client.get("/jam/contest/"), "Winner")
+
+        self.comp.options = json.dumps({"listtype": "parovoz"})
+        self.comp.save()
+        self.assertNotContains(self.client.get("/jam/contest/"), "Winner")
+
+
+class CompetitionEditorTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="owner", email="owner@example.com", password="pw"
+        )
+        self.client.force_login(self.user)
+        self.comp = Competition.objects.create(
+            title="Contest",
+            slug="contest",
+            end_date=timezone.now().date(),
+            published=True,
+            owner=self.user,
+        )
+        self.gamelist = GameList.objects.create(competition=self.comp)
+
+    def add_entries(self, count):
+        for i in range(count):
+            GameListEntry.objects.create(
+                gamelist=self.gamelist,
+                game=Game.objects.create(
+                    title="Game %d" % i, creation_time=timezone.now()
+                ),
+            )
+
+    def formset(self, prefix, rows):
+        data = {
+            "%s-TOTAL_FORMS" % prefix: len(rows),
+            "%s-INITIAL_FORMS" % prefix: sum(1 for x in rows if x.get("id")),
+        }
+        for i, row in enumerate(rows):
+            for k, v in row.items():
+                if v is not None:
+                    data["%s-%d-%s" % (prefix, i, k)] = v
+        return data
+
+    def save_list(self):
+        entries = list(
+            GameListEntry.objects.filter(gamelist=self.gamelist).order_by("id")
+        )
+        rows = [
+            {
+                "id": x.id,
+                "rank": i + 1,
+                "gameid": x.game_id,
+                "gamelist": self.gamelist.id,
+                "DELETE": "on" if i == 0 else None,
+            }
+            for i, x in enumerate(entries)
+        ] + [{"comment": "New", "gamelist": self.gamelist.id}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/jam/editlist/%d/" % self.comp.id, self.formset("form", rows)
+            )
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def test_list_is_saved_in_fixed_statements(self):
+        self.add_entries(2)
+        self.assertContains(
+            self.client.get("/jam/editlist/%d/" % self.comp.id), "Game 1"
+        )
+        small = self.save_list()
+        self.assertEqual(
+            list(
+                GameListEntry.objects.order_by("id").values_list(
+                    "rank", "comment"
+                )
+            ),
+            [(2, ""), (None, "New")],
+        )
+
+        self.add_entries(6)
+        self.assertEqual(small, self.save_list())
+        self.assertEqual(GameListEntry.objects.count(), 8)
+
+    def test_list_edits_bump_game_revisions(self):
+        self.add_entries(2)
+        before = dict(Game.objects.values_list("id", "revision"))
+        self.save_list()
+        self.assertTrue(
+            all(
+                revision > before[id]
+                for id, revision in Game.objects.values_list("id", "revision")
+            )
+        )
+
+    def test_competition_formsets_are_saved(self):
+        category = CompetitionURLCategory.objects.create(
+            symbolic_id="forum", title="Forum", allow_cloning=False
+        )
+        other = GameList.objects.create(
+            competition=self.comp, title="Other", order=1
+        )
+        foreign = GameList.objects.create(title="Foreign")
+        old_url = CompetitionURL.objects.create(
+            competition=self.comp,
+            category=category,
+            url=URL.objects.create(
+                original_url="http://old.test/", creation_date=timezone.now()
+            ),
+            description="Old",
+        )
+        data = {
+            "main-id": self.comp.id,
+            "main-title": "Renamed",
+            "main-slug": "contest",
+            "main-end_date_year": self.comp.end_date.year,
+            "main-end_date_month": self.comp.end_date.month,
+            "main-end_date_day": self.comp.end_date.day,
+            "main-published": "on",
+            **self.formset(
+                "urls",
+                [
+                    # A deleted row with its url cleared.
+                    {
+                        "id": old_url.id,
+                        "description": "Old",
+                        "category": category.id,
+                        "DELETE": "on",
+                    }
+                ]
+                + [
+                    {
+                        "description": "Forum",
+                        "url": "http://forum.test/",
+                        "category": category.id,
+                    }
+                ]
+                * 2,
+            ),
+            **self.formset(
+                "nominations",
+                [
+                    {"id": self.gamelist.id, "order": 2, "title": ""},
+                    {"id": other.id, "order": 0, "DELETE": "on"},
+                    {"id": foreign.id, "order": 5, "title": "Stolen"},
+                    {"order": 1, "title": "Added"},
+                ],
+            ),
+            **self.formset("schedule", []),
+            **self.formset("docs", []),
+        }
+
+        self.assertContains(
+            self.client.get("/jam/edit/%d/" % self.comp.id), "Forum"
+        )
+        response = self.client.post("/jam/edit/%d/" % self.comp.id, data)
+
+        self.assertEqual(response.status_code, 302)
+        self.comp.refresh_from_db()
+        self.assertEqual(self.comp.title, "Renamed")
+        self.assertEqual(
+            list(
+                self.comp.competitionurl_set.values_list(
+                    "url__original_url", "category"
+                )
+            ),
+            [("http://forum.test/", category.id)] * 2,
+        )
+        self.assertEqual(
+            set(URL.objects.values_list("original_url", flat=True)),
+            {"http://old.test/", "http://forum.test/"},
+        )
+        self.assertEqual(
+            list(
+                self.comp.gamelist_set.order_by("order").values_list(
+                    "title", "order"
+                )
+            ),
+            [("Added", 1), ("", 2)],
+        )
+        foreign.refresh_from_db()
+        self.assertEqual((foreign.title, foreign.order), ("Foreign", 0))
+
+    def test_url_backups_are_queued_after_commit(self):
+        category = CompetitionURLCategory.objects.create(
+            symbolic_id="download", title="Download", allow_cloning=True
+        )
+        data = {
+            "main-id": self.comp.id,
+            "main-title": "Contest",
+            "main-slug": "contest",
+            "main-end_date_year": self.comp.end_date.year,
+            "main-end_date_month": self.comp.end_date.month,
+            "main-end_date_day": self.comp.end_date.day,
+            "main-published": "on",
+            **self.formset(
+                "urls",
+                [
+                    {
+                        "description": "Game",
+                        "url": "http://files.test/game.zip",
+                        "category": category.id,
+                    }
+                ],
+            ),
+            **self.formset("nominations", []),
+            **self.formset("schedule", []),
+            **self.formset("docs", []),
+        }
+
+        with patch("games.tools.clone_files.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/jam/edit/%d/" % self.comp.id, data
+                )
+                delay.assert_not_called()
+
+        self.assertEqual(response.status_code, 302)
+        url = URL.objects.get(original_url="http://files.test/game.zip")
+        self.assertTrue(url.ok_to_clone)
+        delay.assert_called_once_with([url.id])
+
+
+class ListCompetitionsTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.count = 0
+
+    def add_competition(self, games=2):
+        self.count += 1
+        comp = Competition.objects.create(
+            title="Contest %d" % self.count,
+            slug="contest%d" % self.count,
+            end_date=timezone.now().date(),
+            published=True,
+        )
+        for title in ["Main", "Extra"]:
+            gamelist = GameList.objects.create(competition=comp, title=title)
+            for i in range(games):
+                GameListEntry.objects.create(
+                    gamelist=gamelist,
+                    rank=i + 1,
+                    game=Game.objects.create(
+                        title="%s game %d" % (comp.slug, i),
+                        creation_time=timezone.now(),
+                    ),
+                )
+        return comp
+
+    def queries(self):
+        caches["default"].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/jam/")
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_competitions(self):
+        self.add_competition()
+        small = self.queries()
+        for _ in range(3):
+            self.add_competition(games=3)
+        self.assertEqual(small, self.queries())
+
+    def test_listing_is_cached_until_lists_change(self):
+        comp = self.add_competition()
+        self.assertContains(self.client.get("/jam/"), "contest1 game 1")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/jam/")
+        self.assertFalse([
+            x for x in queries if "contest_gamelist" in x["sql"]
+        ])
+
+        GameListEntry.objects.create(
+            gamelist=comp.gamelist_set.get(title="Main"),
+            comment="Upcoming game",
+        )
+        self.assertContains(self.client.get("/jam/"), "Upcoming game")
+
+
+class BallotTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="voter", email="voter@example.com", password="pw"
+        )
+        self.comp = Competition.objects.create(
+            title="Contest",
+            slug="contest",
+            end_date=timezone.now().date(),
+            published=True,
+        )
+        self.gamelist = GameList.objects.create(
+            competition=self.comp, title="Games"
+        )
+        self.comp.options = json.dumps({
+            "voting": {
+                "version": 2,
+                "open": True,
+                "fields": [
+                    {
+                        "name": "score",
+                        "label": "Score",
+                        "type": "IntegerField",
+                        "required": False,
+                    },
+                    {
+                        "name": "comment",
+                        "label": "Comment",
+                        "type": "CharField",
+                        "required": False,
+                        "widget": "question",
+                        "widget_kwargs": {"question_id": "q"},
+                    },
+                ],
+                "view_nominations": [self.gamelist.id],
+                "sections": {
+                    "main": {
+                        "nomination": self.gamelist.id,
+                        "fields": ["score", "comment"],
+                    }
+                },
+            }
+        })
+        self.comp.save()
+        self.games = []
+
+    def add_games(self, count):
+        for i in range(count):
+            game = Game.objects.create(
+                title="Game %d" % len(self.games), creation_time=timezone.now()
+            )
+            GameListEntry.objects.create(gamelist=self.gamelist, game=game)
+            CompetitionQuestion.objects.create(
+                game=game, question_id="q", text="Question %d" % game.id
+            )
+            self.games.append(game)
+
+    def request(self, data=None, user=None):
+        factory = RequestFactory()
+        request = factory.post("/", data) if data else factory.get("/")
+        request.user = user or self.user
+        request.session = SessionStore()
+        with patch("ifdb.permissioner.IsTor", return_value=False):
+            request.perm = Permissioner(request)
+        return request
+
+    def render(self, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            html = RenderVoting(self.request(data), self.comp, "main")
+        return len(queries), html
+
+    def post_data(self, ballots):
+        data = {
+            "voting_0-TOTAL_FORMS": len(self.games),
+            "voting_0-INITIAL_FORMS": len(self.games),
+        }
+        for i, game in enumerate(self.games):
+            if game.id in ballots:
+                score, comment = ballots[game.id]
+                data["voting_0-%d-has_vote" % i] = "on"
+                data["voting_0-%d-score" % i] = score
+                data["voting_0-%d-comment" % i] = comment
+        return data
+
+    def votes(self):
+        return set(
+            CompetitionVote.objects.values_list(
+                "game_id", "field", "int_val", "text_val"
+            )
+        )
+
+    def test_form_is_loaded_in_fixed_queries(self):
+        self.add_games(2)
+        small, _ = self.render()
+        self.add_games(4)
+        CompetitionVote.objects.create(
+            competition=self.comp,
+            user=self.user,
+            when=timezone.now(),
+            nomination=self.gamelist,
+            game=self.games[0],
+            field="score",
+            int_val=7,
+        )
+
+        large, html = self.render()
+
+        self.assertEqual(small, large)
+        self.assertIn("Question %d" % self.games[5].id, html)
+        self.assertIn('value="7"', html)
+
+    def test_ballot_is_saved_in_fixed_statements(self):
+        self.add_games(3)
+        a, b, c = self.games
+        _, html = self.render(
+            self.post_data({a.id: (5, "Fine"), b.id: (3, "")})
+        )
+        self.assertIn("Ваш голос принят.", html)
+        self.assertEqual(
+            self.votes(),
+            {
+                (a.id, "score", 5, None),
+                (a.id, "comment", None, "Fine"),
+                (b.id, "score", 3, None),
+                (b.id, "comment", None, ""),
+            },
+        )
+
+        # Each round updates, creates and clears votes, in different numbers.
+        self.add_games(4)
+        small, _ = self.render(
+            self.post_data({a.id: (6, "Fine"), c.id: (1, "New")})
+        )
+        self.assertEqual(
+            self.votes(),
+            {
+                (a.id, "score", 6, None),
+                (a.id, "comment", None, "Fine"),
+                (c.id, "score", 1, None),
+                (c.id, "comment", None, "New"),
+            },
+        )
+        large, _ = self.render(
+            self.post_data({
+                game.id: (i, "Ok")
+                for i, game in enumerate(self.games)
+                if game != c
+            })
+        )
+        self.assertEqual(len(self.votes()), 12)
+        self.assertEqual(small, large)
+
+    def vote(self, username, scores):
+        user = get_user_model().objects.get_or_create(
+            username=username, email="%s@example.com" % username
+        )[0]
+        ballot = Ballot(self.comp, user, self.games)
+        for game, score in scores.items():
+            if score is None:
+                ballot.Clear(self.gamelist.id, game.id, ["score"])
+            else:
+                ballot.Set(
+                    self.gamelist.id, game.id, "score", "IntegerField", score
+                )
+        ballot.Save(self.request(user=user))
+
+    def tallies(self):
+        return sorted(
+            CompetitionTally.objects.values_list(
+                "game_id", "field", "votes", "total", "distribution"
+            )
+        )
+
+    def test_tally_follows_ballots(self):
+        self.add_games(2)
+        a, b = self.games
+        self.vote("u1", {a: 3, b: 5})
+        self.vote("u2", {a: 4, b: 5})
+        self.vote("u3", {a: 8})
+        self.vote("u1", {a: 10, b: None})
+
+        incremental = self.tallies()
+        RebuildTally(self.comp.id)
+        self.assertEqual(incremental, self.tallies())
+        self.assertEqual(
+            incremental,
+            [
+                (a.id, "score", 3, 22, {"4": 1, "8": 1, "10": 1}),
+                (b.id, "score", 1, 5, {"5": 1}),
+            ],
+        )
+        standings = GetStandings(self.comp, self.gamelist.id, "score")
+        self.assertEqual(
+            [(x.game, x.votes, x.mean, x.median) for x in standings],
+            [(a, 3, 22 / 3, 8), (b, 1, 5, 5)],
+        )
+
+        self.vote("u2", {a: None, b: None})
+        self.vote("u3", {a: None})
+        self.vote("u1", {a: None})
+        self.assertEqual(CompetitionTally.objects.count(), 0)
+
+    def test_tally_follows_deleted_users_and_moved_votes(self):
+        self.add_games(1)
+        (a,) = self.games
+        self.vote("u1", {a: 3})
+        self.vote("u2", {a: 5})
+
+        get_user_model().objects.get(username="u1").delete()
+        self.assertEqual(self.tallies(), [(a.id, "score", 1, 5, {"5": 1})])
+
+        other = Competition.objects.create(
+            title="Other",
+            slug="other",
+            end_date=timezone.now().date(),
+            published=True,
+        )
+        vote = CompetitionVote.objects.get()
+        form = modelform_factory(CompetitionVote, fields="__all__")(
+            instance=vote
+        )
+        vote.competition = other
+        CompetitionVoteAdmin(CompetitionVote, admin.site).save_model(
+            None, vote, form, True
+        )
+        self.assertFalse(
+            CompetitionTally.objects.filter(competition=self.comp).exists()
+        )
+        self.assertEqual(
+            CompetitionTally.objects.get(competition=other).votes, 1
+        )
+
+    def test_export_votes(self):
+        self.add_games(2)
+        a, b = self.games
+        self.vote("u1", {a: 2, b: 5})
+        self.vote("u2", {a: 3, b: 6})
+        self.comp.owner = self.user
+        self.comp.save()
+        self.client.force_login(self.user)
+        url = "/jam/showvotes/%d/export.%%s?category=%d&field=score" % (
+            self.comp.id,
+            self.gamelist.id,
+        )
+
+        response = self.client.get("/jam/showvotes/%d/" % self.comp.id)
+        self.assertContains(response, url.replace("&", "&amp;") % "csv")
+
+        response = self.client.get(url % "csv")
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            [
+                "game_id,title,votes,mean,median,2,3,5,6",
+                "%d,Game 1,2,5.5,5.5,0,0,1,1" % b.id,
+                "%d,Game 0,2,2.5,2.5,1,1,0,0" % a.id,
+            ],
+        )
+        response = self.client.get(url % "json")
+        self.assertEqual(
+            json.loads(b"".join(response.streaming_content))[1],
+            {
+                "game_id": a.id,
+                "title": "Game 0",
+                "votes": 2,
+                "mean": 2.5,
+                "median": 2.5,
+                "distribution": {"2": 1, "3": 1},
+            },
+        )
+
+        self.client.force_login(get_user_model().objects.get(username="u1"))
+        self.assertEqual(self.client.get(url % "csv").status_code, 403)
@@ -5,6 +5,11 @@ from . import editor, views
 urlpatterns = [
     path("", views.list_competitions, name="list_competitions"),
     path("showvotes/<int:id>/", views.list_votes, name="view_compvotes"),
+    re_path(
+        r"^showvotes/(?P<id>\d+)/export\.(?P<fmt>csv|json)$",
+        views.export_votes,
+        name="export_compvotes",
+    ),
     path(
         "edit/<int:id>/",
         editor.edit_competition,
@@ -1,20 +1,25 @@
 import datetime
+import hashlib
 import json
+import re
+import secrets
 from collections import defaultdict
 
 from dateutil import relativedelta
 from django import forms
 from django.conf import settings
+from django.core.cache import caches
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db.models import Count, Max
 from django.forms import widgets
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 
-from games.models import GameAuthor, GameURL
+from core.cacheversions import BumpCacheVersion, GetCacheVersion
+from games.models import Game, GameAuthor, GameURL
 from games.tools import (
     ComputeGameRating,
     FormatDate,
@@ -33,6 +38,7 @@ from .models import (
     GameList,
     GameListEntry,
 )
+from .tally import ExportCsv, ExportJson, GetStandings
 from .voting import RenderVoting
 
 
@@ -51,42 +57,55 @@ def FormatHead(g, options):
             return {"primary": g.rank, "secondary": "место"}
 
 
+def FetchCompetitionGames(comps, details=False):
+    """Non-empty game lists of competitions, keyed by competition id.
+
+    Two queries however many competitions and lists there are. With details,
+    entries also get comment stats, votes and authors for the results page.
+    """
+    lists = {
+        x.id: {
+            "competition_id": x.competition_id,
+            "title": x.title,
+            "unranked": [],
+            "ranked": [],
+        }
+        for x in GameList.objects.filter(competition__in=comps).order_by(
+            "order", "id"
+        )
+    }
+    entries = GameListEntry.objects.filter(gamelist__in=lists).select_related(
+        "game"
+    )
+    if details:
+        entries = entries.annotate(
+            coms_count=Count("game__gamecomment"),
+            coms_recent=Max("game__gamecomment__creation_time"),
+        ).prefetch_related(
+            "game__gamevote_set",
+            "game__gameauthor_set__role",
+            "game__gameauthor_set__author",
+        )
+    for y in entries.order_by("rank", "date", "result", "game__title"):
+        lists[y.gamelist_id][
+            "unranked" if y.rank is None else "ranked"
+        ].append(y)
+    res = defaultdict(list)
+    for x in lists.values():
+        if x["ranked"] or x["unranked"]:
+            res[x.pop("competition_id")].append(x)
+    return res
+
+
 class CompetitionGameFetcher:
     def __init__(self, comp):
         self.comp = comp
         self.options = json.loads(comp.options)
 
     def GetCompetitionGamesRaw(self):
-        lists = []
-        for x in GameList.objects.filter(competition=self.comp).order_by(
-            "order"
-        ):
-            ranked = []
-            unranked = []
-            for y in (
-                x.gamelistentry_set
-                .annotate(
-                    coms_count=Count("game__gamecomment"),
-                    coms_recent=Max("game__gamecomment__creation_time"),
-                )
-                .prefetch_related(
-                    "game__gamevote_set",
-                    "game__gameauthor_set__role",
-                    "game__gameauthor_set__author",
-                )
-                .order_by("rank", "date", "result", "game__title")
-            ):
-                if y.rank is None:
-                    unranked.append(y)
-                else:
-                    ranked.append(y)
-            if ranked or unranked:
-                lists.append({
-                    "title": x.title,
-                    "unranked": unranked,
-                    "ranked": ranked,
-                })
-        return lists
+        return FetchCompetitionGames([self.comp], details=True).get(
+            self.comp.id, []
+        )
 
     def FetchSnippetData(self):
         raw = self.GetCompetitionGamesRaw()
@@ -113,8 +132,6 @@ class CompetitionGameFetcher:
             game__in=games, role__symbolic_id="author"
         ).select_related("author")
 
-        from games.models import Game
-
         CATEGORY_KEY = {
             "genre": "genres",
             "tag": "tags",
@@ -169,12 +186,36 @@ class CompetitionGameFetcher:
         return raw
 
 
+DOCUMENT_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# Results also change with game edits, which do not invalidate them.
+SNIPPET_CACHE_TIMEOUT = 10 * 60
+
+
 class SnippetProvider:
+    # Snippets that look the same to every visitor; they are cached per
+    # competition (see Render). The rest depend on the request.
+    CACHED_SNIPPETS = {"RESULTS", "PARTICIPANTS"}
+
     def __init__(self, request, comp):
         self.request = request
         self.comp = comp
         self.fetcher = CompetitionGameFetcher(comp)
 
+    def Render(self, name, *args):
+        func = getattr(self, "render_%s" % name)
+        if name not in self.CACHED_SNIPPETS:
+            return func(*args)
+        cache = caches["default"]
+        key = "competition-snippet/%s/%s" % (
+            _CompetitionRenderKey(self.comp),
+            ":".join([name, *args]),
+        )
+        res = cache.get(key)
+        if res is None:
+            res = func(*args)
+            cache.set(key, res, SNIPPET_CACHE_TIMEOUT)
+        return res
+
     def render_RESULTS(self):
         lists = self.fetcher.FetchSnippetData()
         return render_to_string(
@@ -184,6 +225,24 @@ class SnippetProvider:
     def render_PARTICIPANTS(self):
         return self.render_RESULTS()
 
+    def render_TALLY(self, nomination_id, field=None):
+        voting = json.loads(self.comp.options).get("voting", {})
+        if field is None:
+            field = next(
+                (
+                    x["name"]
+                    for x in voting.get("fields", [])
+                    if x.get("type") in ("IntegerField", "BooleanField")
+                ),
+                None,
+            )
+        if not nomination_id.isdigit() or field is None:
+            return ""
+        return render_to_string(
+            "contest/tally.html",
+            {"results": GetStandings(self.comp, int(nomination_id), field)},
+        )
+
     def render_VOTING(self, group=None):
         return RenderVoting(self.request, self.comp, group)
 
@@ -191,6 +250,77 @@ class SnippetProvider:
         return RenderVoting(self.request, self.comp, group, preview=True)
 
 
+class _DeferredSnippets:
+    """Snippet provider that leaves numbered placeholders in the document.
+
+    Lets the markdown of a document be cached while its snippets are filled
+    in on every view. Markdown passes raw html through, so placeholders
+    carry a random nonce that the document text cannot know.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.nonce = secrets.token_hex(8)
+
+    def __getattr__(self, name):
+        if not name.startswith("render_") or not hasattr(
+            SnippetProvider, name
+        ):
+            raise AttributeError(name)
+
+        def Defer(*args):
+            self.calls.append([name.removeprefix("render_"), *args])
+            return "<!--snippet:%s:%d-->" % (self.nonce, len(self.calls) - 1)
+
+        return Defer
+
+
+def _CompetitionRenderKey(comp):
+    return "%d/%s/%s" % (
+        comp.id,
+        GetCacheVersion(_RenderVersionName(comp.id)),
+        hashlib.sha256(comp.options.encode()).hexdigest()[:16],
+    )
+
+
+def _RenderVersionName(competition_id):
+    return "competition-render/%d" % competition_id
+
+
+def InvalidateCompetitionRender(competition_id):
+    """Drops cached documents and snippets of a competition."""
+    BumpCacheVersion(_RenderVersionName(competition_id))
+
+
+def RenderCompetitionDocument(request, comp, doc):
+    """Document html, markdown cached per document text and competition."""
+    cache = caches["default"]
+    key = "competition-doc/%s/%d/%s" % (
+        _CompetitionRenderKey(comp),
+        doc.id,
+        hashlib.sha256(doc.text.encode()).hexdigest(),
+    )
+    body = cache.get(key)
+    if body is None:
+        deferred = _DeferredSnippets()
+        body = {
+            "html": RenderMarkdown(doc.text, deferred),
+            "calls": deferred.calls,
+            "nonce": deferred.nonce,
+        }
+        cache.set(key, body, DOCUMENT_CACHE_TIMEOUT)
+    provider = SnippetProvider(request, comp)
+    calls = body["calls"]
+
+    def Fill(m):
+        i = int(m.group(1))
+        return provider.Render(*calls[i]) if i < len(calls) else ""
+
+    return re.sub(
+        r"<!--snippet:%s:(\d+)-->" % body["nonce"], Fill, body["html"]
+    )
+
+
 def show_competition(request, slug, doc=""):
     try:
         comp = Competition.objects.get(slug=slug)
@@ -227,9 +357,7 @@ def show_competition(request, slug, doc=""):
         {
             "comp": comp,
             "doc": docobj,
-            "markdown": RenderMarkdown(
-                docobj.text, SnippetProvider(request, comp)
-            ),
+            "markdown": RenderCompetitionDocument(request, comp, docobj),
             "logo": logo,
             "docs": links,
             "links": ext_links,
@@ -258,6 +386,18 @@ MONTHS = [
     "дек",
 ]
 
+# Models whose writes change the competition list.
+LISTING_MODELS = [
+    Competition,
+    CompetitionSchedule,
+    CompetitionURL,
+    GameList,
+    GameListEntry,
+    Game,
+]
+LISTING_CACHE_TIMEOUT = 60 * 60
+LISTING_VERSION = "competition-listing"
+
 SHOW_LINKS = [
     "official_page",
     "other_site",
@@ -388,10 +528,7 @@ def get_competitions_data():
     ).select_related():
         logos[x.competition_id] = x.GetLocalUrl()
 
-    competition_games = {
-        comp.id: CompetitionGameFetcher(comp).GetCompetitionGamesRaw()
-        for comp in competitions
-    }
+    competition_games = FetchCompetitionGames(competitions)
 
     competition_options = {
         comp.id: json.loads(comp.options) for comp in competitions
@@ -407,13 +544,43 @@ def get_competitions_data():
     }
 
 
+def InvalidateCompetitionListing(**kwargs):
+    """Signal receiver for writes to any of LISTING_MODELS."""
+    BumpCacheVersion(LISTING_VERSION)
+
+
 def list_competitions(request):
+    cache = caches["default"]
+    key = "competition-listing/%s/%s" % (
+        GetCacheVersion(LISTING_VERSION),
+        datetime.date.today().isoformat(),
+    )
+    context = cache.get(key)
+    if context is None:
+        context, timeout = _BuildCompetitionListing()
+        cache.set(key, context, timeout)
+    return render(request, "contest/index.html", context)
+
+
+def _BuildCompetitionListing():
+    """Context of the competition list and how long it stays current."""
     end_date = datetime.date.today().replace(
         day=1
     ) + relativedelta.relativedelta(months=1)
     now = timezone.now()
 
     data = get_competitions_data()
+    # Past schedule entries are dimmed, so the listing is rebuilt when the
+    # next one passes.
+    timeout = min([
+        LISTING_CACHE_TIMEOUT,
+        *(
+            (x["when"] - now).total_seconds() + 1
+            for entries in data["schedule"].values()
+            for x in entries
+            if x["when"] >= now
+        ),
+    ])
 
     # Process schedule data with date formatting
     schedule = defaultdict(list)
@@ -545,15 +712,11 @@ def list_competitions(request):
     ruler.append({"label": "текущие", "days": 1, "long": True})
     ruler.reverse()
 
-    return render(
-        request,
-        "contest/index.html",
-        {
-            "ruler": ruler,
-            "contests": contests,
-            "upcoming": upcoming,
-        },
-    )
+    return {
+        "ruler": ruler,
+        "contests": contests,
+        "upcoming": upcoming,
+    }, timeout
 
 
 class NominationSelectionForm(forms.Form):
@@ -603,16 +766,23 @@ def FirstNotNone(*argv):
     return None
 
 
-def list_votes(request, id):
-    comp = Competition.objects.get(pk=id)
-    options = json.loads(comp.options)
-    voting = options.get("voting")
+def _GetOrganizedVoting(request, id):
+    try:
+        comp = Competition.objects.get(pk=id)
+    except Competition.DoesNotExist:
+        raise Http404()
+    voting = json.loads(comp.options).get("voting")
     if not voting:
         raise PermissionDenied
     if comp.owner:
         request.perm.Ensure("(o @admin [%d])" % comp.owner_id)
     else:
         request.perm.Ensure("(o @admin)")
+    return comp, voting
+
+
+def list_votes(request, id):
+    comp, voting = _GetOrganizedVoting(request, id)
 
     if "category" in request.GET:
         nomination_form = NominationSelectionForm(
@@ -684,7 +854,6 @@ def list_votes(request, id):
             vote_per_game = []
             for y in games:
                 game_votes = x["votes"].get(y.game.id, {})
-                print(game_votes)
                 vote_per_game.append([
                     x
                     for key, x in sorted(
@@ -695,11 +864,25 @@ def list_votes(request, id):
                 ])
             votes.append({"name": x["name"], "votes": vote_per_game})
 
+        labels = {
+            x["name"]: x.get("label", x["name"]) for x in voting["fields"]
+        }
         table = {
             "games": [x.game for x in games],
             "votes": votes,
             "showtime": details_form.cleaned_data["showtime"],
             "highlight": details_form.cleaned_data["highlight"],
+            "standings": [
+                {
+                    "field": field,
+                    "label": labels.get(field, field),
+                    "results": GetStandings(comp, selected_nomination, field),
+                }
+                for field in sorted(
+                    fields_to_show, key=lambda z: fields_order.get(z, -1)
+                )
+            ],
+            "nomination": selected_nomination,
         }
     else:
         table = {}
@@ -708,8 +891,38 @@ def list_votes(request, id):
         request,
         "contest/showvotes.html",
         {
+            "comp": comp,
             "nomination_form": nomination_form,
             "details_form": details_form,
             "table": table,
         },
     )
+
+
+def export_votes(request, id, fmt):
+    comp, voting = _GetOrganizedVoting(request, id)
+    try:
+        nomination = int(request.GET["category"])
+        field = request.GET["field"]
+    except (KeyError, ValueError):
+        raise Http404()
+    if nomination not in voting.get("view_nominations", []) or field not in {
+        x["name"] for x in voting["fields"]
+    }:
+        raise Http404()
+    standings = GetStandings(comp, nomination, field)
+    if fmt == "csv":
+        response = StreamingHttpResponse(
+            ExportCsv(standings), content_type="text/csv; charset=utf-8"
+        )
+    else:
+        response = StreamingHttpResponse(
+            ExportJson(standings), content_type="application/json"
+        )
+    response["Content-Disposition"] = 'attachment; filename="%s-%d-%s.%s"' % (
+        comp.slug,
+        nomination,
+        field,
+        fmt,
+    )
+    return response
@@ -1,7 +1,10 @@
+import copy
 import datetime
 import json
 
 from django import forms
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils import timezone
 
@@ -9,6 +12,8 @@ from contest.models import CompetitionQuestion, CompetitionVote, GameListEntry
 from games.tools import FormatDate, GetIpAddr
 from moder.userlog import LogAction
 
+from .tally import UpdateTally
+
 # Competition options:
 #
 # voting:
@@ -50,19 +55,17 @@ class QuestionWidget(forms.widgets.TextInput):
     needs_game = True
     template_name = "contest/question_widget.html"
 
-    def __init__(self, *argv, game, question_id, **kwargs):
+    def __init__(self, *argv, game, ballot, question_id, **kwargs):
         self.game = game
+        self.ballot = ballot
         self.question_id = question_id
         super().__init__(*argv, **kwargs)
 
     def get_context(self, name, value, attrs):
         res = super().get_context(name, value, attrs)
-        try:
-            res["question"] = CompetitionQuestion.objects.get(
-                game=self.game, question_id=self.question_id
-            ).text
-        except CompetitionQuestion.DoesNotExist:
-            res["question"] = "( — — — — — )"
+        res["question"] = self.ballot.Question(
+            self.game, self.question_id, "( — — — — — )"
+        )
         return res
 
 
@@ -74,6 +77,128 @@ WIDGETS = {
 }
 
 
+class Ballot:
+    """A user's votes in a competition, loaded and saved in bulk.
+
+    Everything the voting forms need is read with two queries: the user's
+    votes in the competition and the questions of the listed games. Changes
+    are collected with Set()/Clear() and written by Save() in one
+    transaction, as a bulk insert, a bulk update and a delete.
+    """
+
+    def __init__(self, comp, user, games):
+        self.comp = comp
+        self.user = user
+        self.votes = self._Load()
+        self.questions = {
+            (x.game_id, x.question_id): x.text
+            for x in CompetitionQuestion.objects.filter(game__in=games)
+        }
+        self.pending = {}
+
+    def _Load(self):
+        votes = {}
+        for x in CompetitionVote.objects.filter(
+            competition=self.comp, user=self.user
+        ).order_by("id"):
+            votes.setdefault((x.nomination_id, x.game_id, x.field), []).append(
+                x
+            )
+        return votes
+
+    def Get(self, nomination_id, game_id, fields=None):
+        """Votes for a game, by field name."""
+        return {
+            field: votes[0]
+            for (nom, game, field), votes in self.votes.items()
+            if nom == nomination_id
+            and game == game_id
+            and (fields is None or field in fields)
+        }
+
+    def Question(self, game, question_id, default=None):
+        if game is None:
+            return default
+        return self.questions.get((game.id, question_id), default)
+
+    def Set(self, nomination_id, game_id, field, typ, value):
+        key = (nomination_id, game_id, field)
+        votes = self.votes.get(key)
+        if votes and votes[0].GetVal(typ) == value:
+            self.pending.pop(key, None)
+        else:
+            self.pending[key] = (typ, value)
+
+    def Clear(self, nomination_id, game_id, fields):
+        for field in fields:
+            key = (nomination_id, game_id, field)
+            if key in self.votes or key in self.pending:
+                self.pending[key] = None
+
+    def Save(self, request):
+        if not self.pending:
+            return
+        now = timezone.now()
+        meta = {
+            "when": now,
+            "ip_addr": GetIpAddr(request),
+            "session": request.session.session_key,
+            "perm": str(request.perm),
+        }
+        with transaction.atomic():
+            # Serializes concurrent submits of the same user (double clicks),
+            # so that the votes below are current.
+            get_user_model().objects.select_for_update().filter(
+                pk=self.user.pk
+            ).exists()
+            self.votes = self._Load()
+            to_create = []
+            to_update = []
+            to_delete = []
+            # Old values of updated votes, to take out of the tally.
+            replaced = []
+            for key, change in self.pending.items():
+                votes = self.votes.get(key, [])
+                if change is None:
+                    to_delete += votes
+                    continue
+                typ, value = change
+                to_delete += votes[1:]
+                if votes:
+                    replaced.append(copy.copy(votes[0]))
+                vote = (
+                    votes[0]
+                    if votes
+                    else CompetitionVote(
+                        competition=self.comp,
+                        user=self.user,
+                        nomination_id=key[0],
+                        game_id=key[1],
+                        field=key[2],
+                    )
+                )
+                vote.SetVal(typ, value)
+                for k, v in meta.items():
+                    setattr(vote, k, v)
+                (to_update if votes else to_create).append(vote)
+            if to_delete:
+                CompetitionVote.objects.filter(
+                    id__in=[x.id for x in to_delete]
+                ).delete()
+            CompetitionVote.objects.bulk_create(to_create)
+            CompetitionVote.objects.bulk_update(
+                to_update,
+                [*CompetitionVote.FIELD_TYPE_TO_FIELD.values(), *meta],
+            )
+            UpdateTally(
+                self.comp,
+                removed=to_delete + replaced,
+                added=to_create + to_update,
+            )
+        self.pending = {}
+        self.votes = self._Load()
+
+
 class VotingFormSet(forms.BaseFormSet):
     def __init__(
         self,
@@ -81,6 +206,7 @@ class VotingFormSet(forms.BaseFormSet):
         fields,
         games,
         nomination_id,
+        ballot,
         additional_label=None,
         **kwargs,
     ):
@@ -88,26 +214,31 @@ class VotingFormSet(forms.BaseFormSet):
         self.fields = fields
         self.games = games
         self.nomination_id = nomination_id
+        self.ballot = ballot
         self.additional_label = additional_label
 
     def get_form_kwargs(self, index):
         kwargs = super().get_form_kwargs(index)
         kwargs["fields"] = self.fields
+        kwargs["ballot"] = self.ballot
         if index is not None and index < len(self.games):
             kwargs["game"] = self.games[index]
         if self.additional_label:
-            try:
-                kwargs["additional_label"] = CompetitionQuestion.objects.get(
-                    game=kwargs["game"].game, question_id=self.additional_label
-                ).text
-            except CompetitionQuestion.DoesNotExist:
-                pass
+            kwargs["additional_label"] = self.ballot.Question(
+                kwargs["game"].game, self.additional_label
+            )
         return kwargs
 
 
 class VotingForm(forms.Form):
     def __init__(
-        self, *args, fields, game=None, additional_label=None, **kwargs
+        self,
+        *args,
+        fields,
+        ballot,
+        game=None,
+        additional_label=None,
+        **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.gameentry = game
@@ -132,7 +263,7 @@ class VotingForm(forms.Form):
                 widget_class = widget = WIDGETS[widget_name]
                 if getattr(widget_class, "needs_game", False):
                     widget = WIDGETS[widget_name](
-                        game=self.game, **widget_kwargs
+                        game=self.game, ballot=ballot, **widget_kwargs
                     )
                 else:
                     widget = WIDGETS[widget_name](**widget_kwargs)
@@ -149,6 +280,17 @@ class VotingForm(forms.Form):
     )
 
 
+def _GameList(comp, nomination_id):
+    return list(
+        GameListEntry.objects
+        .filter(gamelist__competition=comp, gamelist__id=nomination_id)
+        .order_by("game__title")
+        .select_related()
+        .prefetch_related("game__gameauthor_set__role")
+        .prefetch_related("game__gameauthor_set__author")
+    )
+
+
 def RenderVotingImpl(request, comp, voting, group, preview):
     if not preview:
         if not voting.get("open"):
@@ -189,35 +331,33 @@ def RenderVotingImpl(request, comp, voting, group, preview):
 
     res = {"sections": []}
 
-    fss = []
-    before = []
-    for i, section in enumerate(voting.get("sections", [])):
+    sections = []
+    for section in voting.get("sections", []):
         if group:
             fieldlist = section["groups"][group]
         else:
-            fieldlist = map(lambda x: x["name"], section["fields"])
+            fieldlist = [x["name"] for x in section["fields"]]
+        sections.append((
+            section,
+            fieldlist,
+            _GameList(comp, section["nomination"]),
+        ))
+    ballot = Ballot(
+        comp,
+        request.user,
+        [x.game_id for _, _, gamelist in sections for x in gamelist],
+    )
 
+    fss = []
+    before = []
+    for i, (section, fieldlist, gamelist) in enumerate(sections):
         nomination_id = section["nomination"]
-        gamelist = (
-            GameListEntry.objects
-            .filter(gamelist__competition=comp, gamelist__id=nomination_id)
-            .order_by("game__title")
-            .select_related()
-        )
         Fs = forms.formset_factory(VotingForm, formset=VotingFormSet, extra=0)
         initials = []
         for x in gamelist:
             initial = {}
             initial["game_id"] = x.game.id
-            votes = {
-                y.field: y
-                for y in CompetitionVote.objects.filter(
-                    competition=comp,
-                    user=request.user,
-                    nomination_id=nomination_id,
-                    game=x.game,
-                )
-            }
+            votes = ballot.Get(nomination_id, x.game.id)
             if votes:
                 initial["has_vote"] = True
             for y in section["fields"]:
@@ -235,16 +375,16 @@ def RenderVotingImpl(request, comp, voting, group, preview):
             ),
             games=gamelist,
             nomination_id=nomination_id,
+            ballot=ballot,
             initial=initials,
         )
-        fss.append(fs)
+        fss.append((fs, fieldlist))
         res["sections"].append(fs)
         before.append(initials)
 
-    if request.POST and all(map(lambda x: x.is_valid(), fss)):
-        now = timezone.now()
+    if request.POST and all(fs.is_valid() for fs, _ in fss):
         after = []
-        for fs in fss:
+        for fs, fieldlist in fss:
             after.append(fs.cleaned_data)
             if not fs.has_changed():
                 continue
@@ -253,42 +393,20 @@ def RenderVotingImpl(request, comp, voting, group, preview):
                     continue
                 cd = f.cleaned_data
                 if not cd["has_vote"]:
-                    CompetitionVote.objects.filter(
-                        competition=comp,
-                        user=request.user,
-                        nomination_id=fs.nomination_id,
-                        field__in=fieldlist,
-                        game=cd["game_id"],
-                    ).delete()
+                    ballot.Clear(fs.nomination_id, cd["game_id"], fieldlist)
                     continue
 
                 for field in filter(
                     lambda x: x["name"] in fieldlist, fs.fields
                 ):
-                    try:
-                        vote = CompetitionVote.objects.get(
-                            competition=comp,
-                            user=request.user,
-                            nomination_id=fs.nomination_id,
-                            game=cd["game_id"],
-                            field=field["name"],
-                        )
-                        if vote.GetVal(field["type"]) == cd[field["name"]]:
-                            continue
-                    except CompetitionVote.DoesNotExist:
-                        vote = CompetitionVote(
-                            competition=comp,
-                            user=request.user,
-                            nomination_id=fs.nomination_id,
-                            game_id=cd["game_id"],
-                            field=field["name"],
-                        )
-                    vote.when = now
-                    vote.SetVal(field["type"], cd[field["name"]])
-                    vote.ip_addr = GetIpAddr(request)
-                    vote.session = request.session.session_key
-                    vote.perm = str(request.perm)
-                    vote.save()
+                    ballot.Set(
+                        fs.nomination_id,
+                        cd["game_id"],
+                        field["name"],
+                        field["type"],
+                        cd[field["name"]],
+                    )
+        ballot.Save(request)
         LogAction(
             request,
             "comp-vote",
@@ -357,27 +475,14 @@ def RenderVotingImplV2(request, comp, voting, section_name, preview):
 
     fieldlist = section["fields"]
     nomination_id = section["nomination"]
-    gamelist = (
-        GameListEntry.objects
-        .filter(gamelist__competition=comp, gamelist__id=nomination_id)
-        .order_by("game__title")
-        .select_related()
-    )
+    gamelist = _GameList(comp, nomination_id)
+    ballot = Ballot(comp, request.user, [x.game_id for x in gamelist])
 
     initials = []
     for x in gamelist:
         initial = {}
         initial["game_id"] = x.game.id
-        votes = {
-            y.field: y
-            for y in CompetitionVote.objects.filter(
-                competition=comp,
-                user=request.user,
-                nomination_id=nomination_id,
-                game=x.game,
-                field__in=fieldlist,
-            )
-        }
+        votes = ballot.Get(nomination_id, x.game.id, fieldlist)
         if votes or section.get("always_expanded"):
             initial["has_vote"] = True
         for y in voting["fields"]:
@@ -394,6 +499,7 @@ def RenderVotingImplV2(request, comp, voting, section_name, preview):
         fields=[x for x in voting["fields"] if x["name"] in fieldlist],
         games=gamelist,
         nomination_id=nomination_id,
+        ballot=ballot,
         additional_label=section.get("additional_label"),
         initial=initials,
     )
@@ -407,51 +513,22 @@ def RenderVotingImplV2(request, comp, voting, section_name, preview):
                 continue
             cd = f.cleaned_data
             if not section.get("always_expanded") and not cd["has_vote"]:
-                CompetitionVote.objects.filter(
-                    competition=comp,
-                    user=request.user,
-                    nomination_id=fs.nomination_id,
-                    field__in=fieldlist,
-                    game=cd["game_id"],
-                ).delete()
+                ballot.Clear(fs.nomination_id, cd["game_id"], fieldlist)
                 continue
             for field in filter(lambda x: x["name"] in fieldlist, fs.fields):
                 if section.get("always_expanded") and not cd[field["name"]]:
-                    try:
-                        CompetitionVote.objects.get(
-                            competition=comp,
-                            user=request.user,
-                            nomination_id=fs.nomination_id,
-                            game=cd["game_id"],
-                            field=field["name"],
-                        ).delete()
-                    except CompetitionVote.DoesNotExist:
-                        pass
-                    continue
-                try:
-                    vote = CompetitionVote.objects.get(
-                        competition=comp,
-                        user=request.user,
-                        nomination_id=fs.nomination_id,
-                        game=cd["game_id"],
-                        field=field["name"],
+                    ballot.Clear(
+                        fs.nomination_id, cd["game_id"], [field["name"]]
                     )
-                    if vote.GetVal(field["type"]) == cd[field["name"]]:
-                        continue
-                except CompetitionVote.DoesNotExist:
-                    vote = CompetitionVote(
-                        competition=comp,
-                        user=request.user,
-                        nomination_id=fs.nomination_id,
-                        game_id=cd["game_id"],
-                        field=field["name"],
-                    )
-                vote.when = now
-                vote.SetVal(field["type"], cd[field["name"]])
-                vote.ip_addr = GetIpAddr(request)
-                vote.session = request.session.session_key
-                vote.perm = str(request.perm)
-                vote.save()
+                    continue
+                ballot.Set(
+                    fs.nomination_id,
+                    cd["game_id"],
+                    field["name"],
+                    field["type"],
+                    cd[field["name"]],
+                )
+        ballot.Save(request)
 
         LogAction(
             request,
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from .models import Package, PackageVersion
+        from .views import InvalidatePackageManifests
+
+        for model in [Package, PackageVersion]:
+            post_save.connect(InvalidatePackageManifests, sender=model)
+            post_delete.connect(InvalidatePackageManifests, sender=model)
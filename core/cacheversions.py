@@ -0,0 +1,33 @@
+"""Versions of cached data that is invalidated as a whole.
+
+Cache keys of such data include GetCacheVersion() of its namespace, and
+BumpCacheVersion() moves all of them to a new one at once. Versions are
+random tokens rather than counters: a version that gets lost is replaced by
+a fresh one, instead of counting again from zero and running into keys of an
+earlier era that are still in the cache. They are kept in the "versions"
+cache, so that they don't compete for room with the data they version.
+"""
+
+import secrets
+
+from django.core.cache import caches
+
+
+def _Key(name):
+    return "version/%s" % name
+
+
+def GetCacheVersion(name):
+    """Current version of the name namespace, for use in cache keys."""
+    cache = caches["versions"]
+    version = cache.get(_Key(name))
+    if version is None:
+        version = secrets.token_hex(8)
+        if not cache.add(_Key(name), version, None):
+            version = cache.get(_Key(name), version)
+    return version
+
+
+def BumpCacheVersion(name):
+    """Invalidates everything cached under the name namespace."""
+    caches["versions"].set(_Key(name), secrets.token_hex(8), None)
@@ -1,8 +1,10 @@
 import hashlib
 import json
 import os.path
+import re
 import shutil
 import ssl
+import urllib.error
 import urllib.request
 from logging import getLogger
 from urllib.parse import quote
@@ -71,3 +73,111 @@ def FetchUrlToFileLike(url, use_cache=True, headers={}):
     f = open(filename, "rb")
     f.metadata = metadata
     return f
+
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _OpenUrl(url, headers, method=None, timeout=None):
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    url = quote(url.encode("utf-8"), safe="/+=&?%:@;!#$*()_-")
+    request = urllib.request.Request(
+        url, data=None, headers=headers, method=method
+    )
+    response = urllib.request.urlopen(request, context=ctx, timeout=timeout)
+    response.metadata = _ResponseInfoToMetadata(url, response.info())
+    return response
+
+
+def _RangeStart(response):
+    """First byte of a 206 response, from its Content-Range header."""
+    m = re.match(r"bytes (\d+)-", response.info().get("Content-Range", ""))
+    return int(m.group(1)) if m else None
+
+
+def FetchUrlToFile(url, filename, headers={}):
+    """Streams url into filename, resuming a partial download if present.
+
+    Whatever is already in filename is assumed to be a prefix of the remote
+    content. It is re-requested with a Range header (guarded by If-Range with
+    the validator remembered from the interrupted attempt); if the server
+    ignores the range or answers with a different one, the file is truncated
+    and the download starts over.
+    Content is hashed as it is written, so the returned metadata carries the
+    sha256 and size of the complete file without a second read.
+    """
+    logger.info("Streaming: %s" % url)
+    state_filename = "%s.json" % filename
+    state = {}
+    if os.path.isfile(state_filename):
+        with open(state_filename, "r") as f:
+            state = json.loads(f.read())
+
+    hasher = hashlib.sha256()
+    offset = 0
+    if os.path.isfile(filename) and state.get("url") == url:
+        with open(filename, "rb") as f:
+            while chunk := f.read(STREAM_CHUNK_SIZE):
+                hasher.update(chunk)
+                offset += len(chunk)
+
+    headers = dict(headers)
+    if offset:
+        headers["Range"] = "bytes=%d-" % offset
+        if state.get("validator"):
+            headers["If-Range"] = state["validator"]
+
+    response = _OpenUrl(url, headers)
+    if offset and response.status == 206 and _RangeStart(response) != offset:
+        logger.info("Got a different range of %s, restarting" % url)
+        response.close()
+        headers.pop("Range")
+        headers.pop("If-Range", None)
+        response = _OpenUrl(url, headers)
+    if offset and response.status != 206:
+        logger.info("Range ignored, restarting download of %s" % url)
+        hasher = hashlib.sha256()
+        offset = 0
+
+    info = response.info()
+    state = {
+        "url": url,
+        "validator": info.get("ETag") or info.get("Last-Modified"),
+    }
+    with open(state_filename, "w") as f:
+        f.write(json.dumps(state))
+
+    with open(filename, "r+b" if offset else "wb") as f:
+        f.seek(offset)
+        f.truncate()
+        while chunk := response.read(STREAM_CHUNK_SIZE):
+            f.write(chunk)
+            hasher.update(chunk)
+            offset += len(chunk)
+
+    os.remove(state_filename)
+    metadata = response.metadata
+    metadata["sha256"] = hasher.hexdigest()
+    metadata["size"] = offset
+    return metadata
+
+
+def FetchUrlStatus(url, timeout=30, headers={}):
+    """Returns the HTTP status of url without downloading its body.
+
+    Tries HEAD first and falls back to GET when HEAD is answered with an
+    error, since plenty of servers reject or mishandle HEAD requests. Network
+    failures (DNS, refused connections, timeouts) propagate to the caller.
+    """
+    try:
+        with _OpenUrl(url, headers, method="HEAD", timeout=timeout) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        logger.info("HEAD %s returned %d, retrying with GET" % (url, e.code))
+    try:
+        with _OpenUrl(url, headers, method="GET", timeout=timeout) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
@@ -0,0 +1,147 @@
+"""Launcher heartbeats, coalesced into batched PackageSession writes.
+
+The launcher reports the total play time of a session every few seconds.
+Each web process keeps the latest report of the sessions it hears from in
+memory and writes all of them with a single statement every
+HEARTBEAT_FLUSH_SECS, and once more when the process exits. A finished
+session is written right away.
+
+Reports carry the cumulative time, so a process that dies loses nothing for
+sessions that keep reporting: their next report reaches another process.
+The buffer itself does not survive the process though. A worker that is
+killed, rather than shut down, loses up to HEARTBEAT_FLUSH_SECS of the
+sessions that went silent since the last flush. That is the price of not
+touching shared storage on every ping.
+
+With several processes each may hold an older report of the same session,
+so writes never move a session back.
+"""
+
+import atexit
+import datetime
+import threading
+import time
+from logging import getLogger
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import close_old_connections
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import PackageSession
+
+logger = getLogger("web")
+
+HEARTBEAT_FLUSH_SECS = 60
+
+
+class HeartbeatBuffer:
+    """Latest report of each session, written by a background thread.
+
+    Sessions that have not reported for a few flush intervals are forgotten,
+    the next report of such a session reads it from the database again.
+    """
+
+    def __init__(self, max_delay):
+        self.max_delay = max_delay
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def record(self, session_id, timesecs, finish):
+        with self.lock:
+            state = self.sessions.get(session_id)
+        if state is None:
+            session = PackageSession.objects.get(pk=session_id)
+            state = {
+                "duration_secs": session.duration_secs or 0,
+                "last_update": session.last_update,
+                "is_finished": session.is_finished,
+            }
+        now = timezone.now()
+        old_time = state["duration_secs"]
+        if timesecs < old_time:
+            raise SuspiciousOperation
+        if timesecs - old_time > (now - state["last_update"]).seconds + 60:
+            raise SuspiciousOperation
+        if state["is_finished"]:
+            raise SuspiciousOperation
+
+        if finish:
+            PackageSession.objects.filter(pk=session_id).update(
+                duration_secs=timesecs, last_update=now, is_finished=True
+            )
+            with self.lock:
+                self.sessions.pop(session_id, None)
+            return
+        with self.lock:
+            self.sessions[session_id] = {
+                "duration_secs": timesecs,
+                "last_update": now,
+                "is_finished": False,
+                "dirty": True,
+            }
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="heartbeat-flusher", daemon=True
+                )
+                self.thread.start()
+
+    def flush(self):
+        """Writes the unwritten reports, returns how many there were."""
+        quiet = timezone.now() - datetime.timedelta(seconds=3 * self.max_delay)
+        with self.lock:
+            pending = {
+                id: dict(x)
+                for id, x in self.sessions.items()
+                if x.get("dirty")
+            }
+            for x in self.sessions.values():
+                x["dirty"] = False
+            self.sessions = {
+                id: x
+                for id, x in self.sessions.items()
+                if x["last_update"] >= quiet
+            }
+        if not pending:
+            return 0
+
+        def Latest(field):
+            return Case(*[
+                When(pk=id, then=Value(x[field])) for id, x in pending.items()
+            ])
+
+        # Another process may have written a newer report meanwhile.
+        PackageSession.objects.filter(
+            pk__in=pending, is_finished=False
+        ).update(
+            duration_secs=Greatest(
+                Coalesce(F("duration_secs"), 0), Latest("duration_secs")
+            ),
+            last_update=Greatest(F("last_update"), Latest("last_update")),
+        )
+        return len(pending)
+
+    def _run(self):
+        while True:
+            time.sleep(self.max_delay)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Unable to write heartbeats")
+            finally:
+                close_old_connections()
+
+
+_buffer = HeartbeatBuffer(HEARTBEAT_FLUSH_SECS)
+atexit.register(_buffer.flush)
+
+
+def RecordHeartbeat(session_id, timesecs, finish=False):
+    """Validates a launcher report and records it, see HeartbeatBuffer."""
+    _buffer.record(session_id, timesecs, finish)
+
+
+def FlushHeartbeats():
+    return _buffer.flush()
@@ -3,10 +3,14 @@ import os.path
 import re
 import shutil
 import subprocess
+import timeit
 from logging import getLogger
 
 from django.core.management.base import BaseCommand
 
+from games.authorstats import RebuildAuthorStats
+from games.importer.tools import AUTHOR_URL_RULES, GAME_URL_RULES
+from games.linkcheck import run_linkcheck
 from games.models import (
     URL,
     Game,
@@ -111,6 +115,8 @@ def BuildLoonchatableLinks():
             d["id"] = g[0].id
 
             src = BACKUPS_PATH % x.local_filename
+            # Backups are stored under content hash directories.
+            filename = os.path.basename(x.local_filename)
             dst = os.path.join(DSTDIR, "%04d" % count)
             os.mkdir(dst)
 
@@ -121,7 +127,7 @@ def BuildLoonchatableLinks():
                 d["metadata"] = {"dependencies": [{"package": "fireurq"}]}
             if fireurq and ext == "qst":
                 need_unpacking = False
-                d["metadata"]["variables"] = {"gamefile": x.local_filename}
+                d["metadata"]["variables"] = {"gamefile": filename}
 
             if ext == "qsp":
                 need_unpacking = False
@@ -139,12 +145,12 @@ def BuildLoonchatableLinks():
                     d["panic"].append("Unextractable!")
                     need_unpacking = False
             if not need_unpacking:
-                shutil.copyfile(src, os.path.join(dst, x.local_filename))
+                shutil.copyfile(src, os.path.join(dst, filename))
 
             if ext == "qsp" or HasTag(tags, "qsp"):
                 d["metadata"] = {"dependencies": [{"package": "qsp"}]}
                 if ext == "qsp":
-                    d["metadata"]["variables"] = {"gamefile": x.local_filename}
+                    d["metadata"]["variables"] = {"gamefile": filename}
                 else:
                     for root, subFolders, files in os.walk(dst):
                         y = HasTag(files, ".qsp")
@@ -247,6 +253,56 @@ def PopulateAliasRedirects():
         x.delete()
 
 
+def BenchmarkUrlCategorizer():
+    """Checks the indexed url rules against a linear scan over all URLs."""
+    urls = list(URL.objects.values_list("original_url", flat=True))
+    mismatches = 0
+    for name, rules in [
+        ("game", GAME_URL_RULES),
+        ("author", AUTHOR_URL_RULES),
+    ]:
+        rules.Match.cache_clear()
+        rules.RulesForHost.cache_clear()
+        timings = {}
+        results = {}
+        for run, match in [
+            ("linear", rules.MatchLinear),
+            ("cold", rules.Match),
+            ("warm", rules.Match),
+        ]:
+            started = timeit.default_timer()
+            results[run] = [_MatchOrError(match, x) for x in urls]
+            timings[run] = timeit.default_timer() - started
+        for url, linear, indexed in zip(
+            urls, results["linear"], results["cold"]
+        ):
+            if linear != indexed:
+                mismatches += 1
+                logger.error(
+                    "%s rules: %s gives %s, linear scan %s"
+                    % (name, url, indexed, linear)
+                )
+        logger.info(
+            "%s rules, %d urls: linear %.3fs, indexed %.3fs, memoized %.3fs"
+            % (
+                name,
+                len(urls),
+                timings["linear"],
+                timings["cold"],
+                timings["warm"],
+            )
+        )
+    logger.info("%d mismatches" % mismatches)
+    return mismatches
+
+
+def _MatchOrError(match, url):
+    try:
+        return match(url)
+    except ValueError as e:
+        return str(e)
+
+
 class Command(BaseCommand):
     help = "Does some batch processing."
 
@@ -255,6 +311,9 @@ class Command(BaseCommand):
 
     def handle(self, cmd, *args, **options):
         options = {
+            "authorstats": RebuildAuthorStats,
+            "benchurls": BenchmarkUrlCategorizer,
+            "checklinks": run_linkcheck,
             "fixgameauthors": FixGameAuthors,
             "fixurldups": FixDuplicateUrls,
             "resetperms": ResetPermissions,
@@ -1,5 +1,23 @@
+import datetime
+import json
+import time
+from unittest.mock import patch
+
 from django.conf import settings
-from django.test import SimpleTestCase
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import SuspiciousOperation
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from games.models import Game
+
+from .cacheversions import BumpCacheVersion, GetCacheVersion
+from .heartbeats import HEARTBEAT_FLUSH_SECS, FlushHeartbeats, HeartbeatBuffer
+from .models import Package, PackageSession, PackageVersion
+from .views import fetchpackage, logtime
 
 
 class CeleryTestSettingsTest(SimpleTestCase):
@@ -10,3 +28,196 @@ class CeleryTestSettingsTest(SimpleTestCase):
             getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False),
             "Tests should not execute queued tasks implicitly.",
         )
+
+
+class CacheVersionTest(SimpleTestCase):
+    def test_versions_never_repeat(self):
+        seen = {GetCacheVersion("test")}
+        self.assertIn(GetCacheVersion("test"), seen)
+
+        BumpCacheVersion("test")
+        seen.add(GetCacheVersion("test"))
+        caches["versions"].clear()
+        seen.add(GetCacheVersion("test"))
+
+        self.assertEqual(len(seen), 3)
+
+
+class HeartbeatTest(TestCase):
+    def setUp(self):
+        self.start = timezone.now()
+        self.session = PackageSession.objects.create(
+            client="test", start_time=self.start, last_update=self.start
+        )
+        self.restart()
+
+    def restart(self):
+        self.buffer = HeartbeatBuffer(HEARTBEAT_FLUSH_SECS)
+        for patcher in [
+            patch("core.heartbeats._buffer", self.buffer),
+            patch.object(self.buffer, "_run"),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def at(self, secs):
+        return patch(
+            "core.heartbeats.timezone.now",
+            return_value=self.start + datetime.timedelta(seconds=secs),
+        )
+
+    def ping(self, secs, finish=False):
+        request = RequestFactory().post(
+            "/",
+            json.dumps({
+                "session": signing.dumps(
+                    self.session.id, salt="core.packages.session"
+                ),
+                "time_secs": secs,
+                "finish": finish,
+            }),
+            content_type="application/json",
+        )
+        with self.at(secs):
+            return logtime(request)
+
+    def stored(self):
+        self.session.refresh_from_db()
+        return self.session.duration_secs, self.session.is_finished
+
+    def test_heartbeats_are_written_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            for secs in range(10, 60, 10):
+                self.ping(secs)
+        # Only the first report reads the session, none writes it.
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.stored(), (None, False))
+
+        with self.at(60), self.assertNumQueries(1):
+            self.assertEqual(FlushHeartbeats(), 1)
+        self.assertEqual(self.stored(), (50, False))
+        with self.at(60), self.assertNumQueries(0):
+            self.assertEqual(FlushHeartbeats(), 0)
+
+        self.ping(70, finish=True)
+        self.assertEqual(self.stored(), (70, True))
+        with self.assertRaises(SuspiciousOperation):
+            self.ping(80)
+
+    def test_older_reports_never_overwrite_newer(self):
+        self.ping(10)
+        other = HeartbeatBuffer(HEARTBEAT_FLUSH_SECS)
+        with self.at(20), patch.object(other, "_run"):
+            other.record(self.session.id, 20, False)
+            other.flush()
+
+            FlushHeartbeats()
+        self.assertEqual(self.stored(), (20, False))
+
+        self.ping(30, finish=True)
+        with self.at(40):
+            other.record(self.session.id, 40, False)
+            other.flush()
+        self.assertEqual(self.stored(), (30, True))
+
+    def test_restart_falls_back_to_database(self):
+        self.ping(10)
+        self.ping(20)
+        with self.at(20):
+            FlushHeartbeats()
+        self.ping(30)
+        self.restart()
+
+        with self.assertRaises(SuspiciousOperation):
+            self.ping(15)
+        self.ping(40, finish=True)
+        self.assertEqual(self.stored(), (40, True))
+
+
+class PackageManifestTest(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.package = Package.objects.create(
+            name="game",
+            game=Game.objects.create(
+                title="The Game", creation_time=timezone.now()
+            ),
+        )
+        runtime = Package.objects.create(name="runtime")
+        self.add_version(
+            self.package,
+            "1.0",
+            {"dependencies": [{"package": "runtime"}]},
+        )
+        self.add_version(
+            runtime,
+            "2.0",
+            {
+                "runtime": {"execute": ["{{self}}/run"]},
+                "variables": {"home": "{{self}}"},
+            },
+        )
+        self.token = signing.dumps(
+            [self.package.id], salt="core.packages.token"
+        )
+
+    def add_version(self, package, version, metadata):
+        PackageVersion.objects.create(
+            package=package,
+            version=version,
+            md5hash="0" * 32,
+            metadata_json=json.dumps(metadata),
+            creation_date=timezone.now(),
+        )
+
+    def fetch(self, etag=None, **params):
+        request = RequestFactory().post(
+            "/",
+            json.dumps({"token": self.token, **params}),
+            content_type="application/json",
+            headers={"If-None-Match": etag} if etag else {},
+        )
+        return fetchpackage(request)
+
+    def test_manifest_is_cached_with_etag(self):
+        response = self.fetch()
+        manifest = json.loads(response.content)
+        self.assertEqual(manifest["shortcut"]["name"], "The Game")
+        self.assertEqual(manifest["runtime"], {"execute": ["{{runtime}}/run"]})
+        self.assertEqual(
+            manifest["variables"], {"this": "{{game}}", "home": "{{runtime}}"}
+        )
+        etag = response["ETag"]
+
+        # Signed tokens in the body change every second; the tag must not.
+        later = time.time() + 5
+        with (
+            patch("django.core.signing.time.time", return_value=later),
+            self.assertNumQueries(1),
+        ):
+            response = self.fetch(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.add_version(self.package, "1.1", {})
+        response = self.fetch(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            [x["version"] for x in json.loads(response.content)["packages"]],
+            ["1.1"],
+        )
+
+    def test_new_session_is_never_cached(self):
+        etag = self.fetch()["ETag"]
+
+        response = self.fetch(etag, startsession=True, client="test")
+
+        self.assertEqual(response.status_code, 200)
+        session = json.loads(response.content)["session"]["session"]
+        self.assertEqual(
+            PackageSession.objects.get(
+                pk=signing.loads(session, salt="core.packages.session")
+            ).package,
+            self.package,
+        )
@@ -1,18 +1,25 @@
+import hashlib
 import json
 from logging import getLogger
 
 from django.contrib.auth import get_user_model
 from django.core import signing
+from django.core.cache import caches
 from django.core.exceptions import SuspiciousOperation
 from django.core.signing import BadSignature
 from django.http import HttpResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
+from .cacheversions import BumpCacheVersion, GetCacheVersion
+from .heartbeats import RecordHeartbeat
 from .models import Package, PackageSession
 
 logger = getLogger("web")
 
+MANIFEST_CACHE_TIMEOUT = 24 * 60 * 60
+MANIFEST_VERSION = "package-manifest"
+
 
 @csrf_exempt
 def logtime(request):
@@ -24,24 +31,7 @@ def logtime(request):
     timesecs = j["time_secs"]
     finish = j.get("finish", False)
 
-    session = PackageSession.objects.get(pk=session_id)
-    old_time = session.duration_secs or 0
-    if timesecs < old_time:
-        raise SuspiciousOperation
-
-    if (
-        timesecs - old_time
-        > (timezone.now() - session.last_update).seconds + 60
-    ):
-        raise SuspiciousOperation
-
-    if session.is_finished:
-        raise SuspiciousOperation
-
-    session.duration_secs = timesecs
-    session.last_update = timezone.now()
-    session.is_finished = finish
-    session.save()
+    RecordHeartbeat(session_id, timesecs, finish)
 
     return HttpResponse("A cat.")
 
@@ -58,11 +48,13 @@ def fetchpackage(request):
         client = None
         if j.get("token"):
             x = signing.loads(j["token"], salt="core.packages.token")
-            package = Package.objects.get(pk=x[0])
+            package = Package.objects.select_related("game").get(pk=x[0])
             if len(x) > 1:
                 user = get_user_model().objects.get(pk=x[1])
         if not package and j.get("package"):
-            package = Package.object.get(name=j["package"])
+            package = Package.objects.select_related("game").get(
+                name=j["package"]
+            )
         if j.get("user"):
             x = signing.loads(j["user"], salt="core.packages.user")
             user = get_user_model().objects.get(pk=x)
@@ -71,12 +63,25 @@ def fetchpackage(request):
         if not package:
             raise SuspiciousOperation
 
-        response = BuildPackageResponse(user, package)
+        if not j.get("startsession"):
+            # Without a new session the response only changes with the
+            # manifest, so a launcher that already has it gets a 304. The
+            # signed tokens in the body carry a timestamp, so the tag is
+            # built from what they encode instead.
+            etag = PackageResponseETag(user, package)
+            if request.headers.get("If-None-Match") == etag:
+                res = HttpResponse(status=304)
+            else:
+                res = HttpResponse(
+                    json.dumps(BuildPackageResponse(user, package))
+                )
+            res["ETag"] = etag
+            return res
 
-        if j.get("startsession"):
-            response["session"]["session"] = CreateNewSession(
-                package, user, client
-            )
+        response = BuildPackageResponse(user, package)
+        response["session"]["session"] = CreateNewSession(
+            package, user, client
+        )
 
     except BadSignature:
         response = {
@@ -114,13 +119,14 @@ def ExpandSelf(s, repl):
         return res
 
 
-def BuildPackageResponse(user, package):
+def InvalidatePackageManifests(**kwargs):
+    """Signal receiver for writes to Package and PackageVersion."""
+    BumpCacheVersion(MANIFEST_VERSION)
+
+
+def BuildPackageManifest(package):
+    """Latest versions, runtime and variables of a package and its deps."""
     res = {
-        "session": {},
-        "shortcut": {
-            "invocation": BuildPackageUserFingerprint(user, package.id),
-            "package": package.name,
-        },
         "runtime": {},
         "packages": [],
         "variables": {
@@ -128,14 +134,6 @@ def BuildPackageResponse(user, package):
         },
     }
 
-    if user:
-        res["session"]["user"] = signing.dumps(
-            user.id, salt="core.packages.user"
-        )
-
-    if package.game:
-        res["shortcut"]["name"] = package.game.title
-
     todo = set([package])
     done = set()
 
@@ -163,6 +161,62 @@ def BuildPackageResponse(user, package):
     return res
 
 
+def _ManifestKey(package):
+    return "package-manifest/%s/%d" % (
+        GetCacheVersion(MANIFEST_VERSION),
+        package.id,
+    )
+
+
+def GetPackageManifest(package):
+    """BuildPackageManifest, cached until packages are repopulated."""
+    cache = caches["default"]
+    key = _ManifestKey(package)
+    res = cache.get(key)
+    if res is None:
+        res = BuildPackageManifest(package)
+        cache.set(key, res, MANIFEST_CACHE_TIMEOUT)
+    return res
+
+
+def PackageResponseETag(user, package):
+    return (
+        '"%s"'
+        % hashlib.sha256(
+            json.dumps([
+                _ManifestKey(package),
+                package.name,
+                user.id if user else None,
+                package.game.title if package.game else None,
+            ]).encode()
+        ).hexdigest()
+    )
+
+
+def BuildPackageResponse(user, package):
+    manifest = GetPackageManifest(package)
+    res = {
+        "session": {},
+        "shortcut": {
+            "invocation": BuildPackageUserFingerprint(user, package.id),
+            "package": package.name,
+        },
+        "runtime": manifest["runtime"],
+        "packages": manifest["packages"],
+        "variables": manifest["variables"],
+    }
+
+    if user:
+        res["session"]["user"] = signing.dumps(
+            user.id, salt="core.packages.user"
+        )
+
+    if package.game:
+        res["shortcut"]["name"] = package.game.title
+
+    return res
+
+
 def BuildPackageUserFingerprint(user, package):
     x = [package]
     if user:
@@ -19,6 +19,7 @@ import copy
 import enum
 from abc import ABC, abstractmethod
 from collections.abc import Callable
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass, field
 from datetime import timedelta
 from logging import getLogger
@@ -42,6 +43,7 @@ from .models import (
     GameSourceFetch,
     LlmTrajectory,
 )
+from .reconcile import refresh_reconcile_signals
 
 logger = getLogger("worker")
 EDIT_LEASE_TIMEOUT = timedelta(minutes=15)
@@ -119,6 +121,11 @@ class GameEditPass(ABC):
     def apply(self, state: GameEditState, params: dict[str, Any]) -> None:
         """Mutate the state in place."""
 
+    @contextmanager
+    def run(self):
+        """Wraps a whole ``run_edit``; passes may load per-run state here."""
+        yield
+
 
 PASS_REGISTRY: dict[str, GameEditPass] = {}
 
@@ -393,6 +400,8 @@ def _process_history(history: GameHistory, pipeline: EditPipeline) -> str:
             outcome = "rejected"
 
     _flush(history, state, maintenance_user)
+    if outcome == "applied":
+        refresh_reconcile_signals([history.pk])
     if created_game_id is not None:
         PostNewGameToDiscord(created_game_id)
     return outcome
@@ -479,29 +488,33 @@ def run_edit(
     logger.info("Starting source edit")
     totals = _EditTotals()
     attempted_ids: set[int] = set()
-    while limit is None or len(attempted_ids) < limit:
-        claim = _claim_history(
-            history_id=history_id,
-            task_id=task_id,
-            attempted_ids=attempted_ids,
-            force=force,
-        )
-        if claim is None:
-            break
-        history, restore_state = claim
-        attempted_ids.add(history.pk)
-        try:
-            outcome = _process_history(history, pipeline)
-        except Exception:
-            logger.exception("Edit failed for history #%s", history.pk)
-            _release_failed_claim(history, restore_state)
-            totals.errors += 1
+    with ExitStack() as passes_run:
+        for spec in normalize_pass_specs(pipeline.passes):
+            if spec.name in PASS_REGISTRY:
+                passes_run.enter_context(PASS_REGISTRY[spec.name].run())
+        while limit is None or len(attempted_ids) < limit:
+            claim = _claim_history(
+                history_id=history_id,
+                task_id=task_id,
+                attempted_ids=attempted_ids,
+                force=force,
+            )
+            if claim is None:
+                break
+            history, restore_state = claim
+            attempted_ids.add(history.pk)
+            try:
+                outcome = _process_history(history, pipeline)
+            except Exception:
+                logger.exception("Edit failed for history #%s", history.pk)
+                _release_failed_claim(history, restore_state)
+                totals.errors += 1
+                if on_history_done is not None:
+                    on_history_done(history, "error")
+                continue
+            totals.record(outcome)
             if on_history_done is not None:
-                on_history_done(history, "error")
-            continue
-        totals.record(outcome)
-        if on_history_done is not None:
-            on_history_done(history, outcome)
+                on_history_done(history, outcome)
 
     stats = totals.as_stats()
     logger.info(
@@ -0,0 +1,213 @@
+"""Dry-run benchmark of the edit phase.
+
+Runs an ``EditPipeline`` over a selected or full corpus of histories the way
+``run_edit`` does, but inside a transaction that is always rolled back: no
+history is claimed, no ``GameEdit`` is written and no game is touched.  For
+every pass it records wall time, query count, how often the pass left the
+draft unchanged and how often it failed; results can be saved as a JSON
+baseline and compared with a later run.
+
+Only the database is rolled back, so passes that call out to other services
+(``llm_workflow``) still do; leave them out with ``skip_passes``.
+"""
+
+import json
+import time
+from collections.abc import Callable, Iterable
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from logging import getLogger
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from .edit import (
+    PASS_REGISTRY,
+    _build_state,
+    _resolve_pipeline,
+    is_noop_edit,
+    normalize_pass_specs,
+)
+from .models import GameHistory
+
+logger = getLogger("worker")
+
+# Slowdowns beyond this ratio are flagged when comparing with a baseline.
+REGRESSION_RATIO = 1.2
+
+
+@dataclass
+class PassTiming:
+    runs: int = 0
+    seconds: float = 0.0
+    queries: int = 0
+    # Runs that left the draft's canonical text unchanged.
+    noops: int = 0
+    errors: int = 0
+
+    @property
+    def ms_per_run(self) -> float:
+        return 1000 * self.seconds / self.runs if self.runs else 0.0
+
+    @property
+    def queries_per_run(self) -> float:
+        return self.queries / self.runs if self.runs else 0.0
+
+    @property
+    def noop_rate(self) -> float:
+        return self.noops / self.runs if self.runs else 0.0
+
+
+@dataclass
+class EditBenchmark:
+    histories: int = 0
+    # Histories whose final draft differs from the served game.
+    changed: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    # Keyed by "<position>:<pass name>", in pipeline order.
+    passes: dict[str, PassTiming] = field(default_factory=dict)
+
+    def as_json(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "EditBenchmark":
+        return cls(**{
+            **data,
+            "passes": {k: PassTiming(**v) for k, v in data["passes"].items()},
+        })
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.as_json(), f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> "EditBenchmark":
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+
+def _dry_run_history(history, specs, result: EditBenchmark) -> bool:
+    state = _build_state(history)
+    before = state.current.to_canonical()
+    for key, spec in specs:
+        timing = result.passes[key]
+        started = time.perf_counter()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                PASS_REGISTRY[spec.name].apply(state, spec.params)
+                state.current.canonicalize()
+        except Exception:
+            timing.errors += 1
+            raise
+        finally:
+            timing.seconds += time.perf_counter() - started
+            timing.runs += 1
+            timing.queries += len(queries)
+        after = state.current.to_canonical()
+        if after == before:
+            timing.noops += 1
+        before = after
+    return not is_noop_edit(state.current, state.served)
+
+
+def run_edit_benchmark(
+    history_id: int | None = None,
+    limit: int | None = None,
+    pipeline_id: int | None = None,
+    skip_passes: Iterable[str] = (),
+    on_history_done: Callable[[GameHistory, str], None] | None = None,
+) -> EditBenchmark:
+    pipeline = _resolve_pipeline(pipeline_id)
+    skip_passes = set(skip_passes)
+    # Passes that are not registered are skipped, as run_edit does.
+    specs = [
+        (f"{i}:{spec.name}", spec)
+        for i, spec in enumerate(normalize_pass_specs(pipeline.passes))
+        if spec.name not in skip_passes and spec.name in PASS_REGISTRY
+    ]
+    result = EditBenchmark(passes={key: PassTiming() for key, _ in specs})
+
+    histories = GameHistory.objects.exclude(
+        state=GameHistory.State.ABANDONED
+    ).order_by("id")
+    if history_id is not None:
+        histories = histories.filter(pk=history_id)
+    if limit is not None:
+        histories = histories[:limit]
+
+    logger.info("Starting edit dry run")
+    started = time.perf_counter()
+    with ExitStack() as passes_run:
+        for _, spec in specs:
+            passes_run.enter_context(PASS_REGISTRY[spec.name].run())
+        for history in histories.iterator():
+            result.histories += 1
+            try:
+                with transaction.atomic():
+                    changed = _dry_run_history(history, specs, result)
+                    transaction.set_rollback(True)
+            except Exception:
+                logger.exception("Dry run failed for history #%s", history.pk)
+                result.errors += 1
+                outcome = "error"
+            else:
+                result.changed += changed
+                outcome = "changed" if changed else "unchanged"
+            if on_history_done is not None:
+                on_history_done(history, outcome)
+    result.seconds = time.perf_counter() - started
+    logger.info(
+        "Edit dry run complete: %s histories, %s changed, %s errors in %.1fs",
+        result.histories,
+        result.changed,
+        result.errors,
+        result.seconds,
+    )
+    return result
+
+
+def format_benchmark(result: EditBenchmark) -> list[str]:
+    lines = [
+        f"histories: {result.histories}, {result.changed} changed, "
+        f"{result.errors} errors, {result.seconds:.1f}s"
+    ]
+    for key, t in result.passes.items():
+        lines.append(
+            f"{key}: {t.runs} runs, {t.ms_per_run:.1f} ms/run, "
+            f"{t.queries_per_run:.1f} queries/run, "
+            f"{t.noop_rate:.0%} no-op, {t.errors} errors"
+        )
+    return lines
+
+
+def compare_benchmarks(
+    result: EditBenchmark, baseline: EditBenchmark
+) -> list[str]:
+    """Per-pass differences against a baseline, regressions marked with !."""
+    lines = []
+    for key in [
+        *result.passes,
+        *sorted(baseline.passes.keys() - result.passes.keys()),
+    ]:
+        current = result.passes.get(key)
+        base = baseline.passes.get(key)
+        if current is None or base is None:
+            where = "baseline" if current is None else "this run"
+            lines.append(f"  {key}: only in {where}")
+            continue
+        ratio = (
+            current.ms_per_run / base.ms_per_run if base.ms_per_run else 1.0
+        )
+        queries = current.queries_per_run - base.queries_per_run
+        regressed = ratio > REGRESSION_RATIO or queries > 0
+        lines.append(
+            f"{'!' if regressed else ' '} {key}: "
+            f"{base.ms_per_run:.1f} -> {current.ms_per_run:.1f} ms/run "
+            f"(x{ratio:.2f}), "
+            f"{base.queries_per_run:.1f} -> {current.queries_per_run:.1f} "
+            f"queries/run, "
+            f"{base.noop_rate:.0%} -> {current.noop_rate:.0%} no-op"
+        )
+    return lines
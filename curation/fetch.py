@@ -12,6 +12,7 @@ from django.utils.timezone import now
 
 from .models import GameHistory, GameSource, GameSourceFetch
 from .providers import PROVIDER_BY_TYPE
+from .reconcile import refresh_reconcile_signals
 
 logger = getLogger("worker")
 
@@ -147,6 +148,8 @@ def _save_fetch_result(result: _FetchResult) -> _FetchResult:
         first_fetch=result.fetched_at,
         last_fetch=result.fetched_at,
     )
+    if source.history_id is not None:
+        refresh_reconcile_signals([source.history_id])
     return _FetchResult(source, result.fetched_at, "created")
 
 
@@ -16,8 +16,10 @@ from dataclasses import dataclass, field
 
 import yaml
 from dateutil.parser import parse as parse_date
+from django.db import transaction
 from django.utils import timezone
 
+from games.authorstats import RefreshingAuthorStats
 from games.importer.tools import HashizeUrl
 from games.models import (
     URL,
@@ -33,7 +35,7 @@ from games.models import (
     PersonalityAlias,
     PersonalityAliasRedirect,
 )
-from games.tools import CreateUrl
+from games.tools import CreateUrls
 
 
 @dataclass
@@ -221,6 +223,9 @@ class GameInfo:
         After rows are written the newly created ids are back-filled into this
         ``GameInfo`` so the returned canonical document resolves every entry to
         an id.  Re-saving that document is a no-op.
+
+        Every entry kind is diffed against the existing rows and written with
+        a fixed number of bulk statements, all in one transaction.
         """
         now = timezone.now()
         if game is None:
@@ -229,44 +234,71 @@ class GameInfo:
         game.title = self.name or ""
         game.description = self.description
         game.release_date = parse_date(self.date).date() if self.date else None
-        game.save()
-
-        self._save_tags(game)
-        self._save_authors(game)
-        self._save_urls(game)
-        self._save_attributions(game)
+        with transaction.atomic():
+            game.save()
+            self._save_tags(game)
+            with RefreshingAuthorStats(game.id):
+                self._save_authors(game)
+            self._save_urls(game)
+            self._save_attributions(game)
+            Game.BumpRevision(game.id)
         return game, self.to_canonical()
 
     def _save_tags(self, game: Game) -> None:
-        existing = {t.id for t in game.tags.all()}
-        desired = set()
-        for tag in self.tags:
-            tag_id = self._resolve_tag_id(tag)
-            if tag_id is not None:
-                desired.add(tag_id)
+        self._resolve_tag_ids()
+        existing = set(game.tags.values_list("id", flat=True))
+        desired = {t.tag_id for t in self.tags if t.tag_id is not None}
         if to_add := desired - existing:
             game.tags.add(*to_add)
         if to_remove := existing - desired:
             game.tags.remove(*to_remove)
 
-    def _resolve_tag_id(self, tag: Tag) -> int | None:
-        if tag.tag_id is not None:
-            return tag.tag_id
-        if tag.slug:
-            found = GameTag.objects.filter(symbolic_id=tag.slug).first()
-            tag.tag_id = found.id if found else None
-            return tag.tag_id
-        cat = GameTagCategory.objects.get(symbolic_id=tag.category)
-        if cat.allow_new_tags:
-            found, _ = GameTag.objects.get_or_create(
-                name=tag.text, category=cat
+    def _resolve_tag_ids(self) -> None:
+        by_slug = [t for t in self.tags if t.tag_id is None and t.slug]
+        if by_slug:
+            ids = dict(
+                GameTag.objects.filter(
+                    symbolic_id__in={t.slug for t in by_slug}
+                ).values_list("symbolic_id", "id")
             )
-        else:
-            found = GameTag.objects.get(name=tag.text, category=cat)
-        tag.tag_id, tag.text = found.id, None
-        return tag.tag_id
+            for tag in by_slug:
+                tag.tag_id = ids.get(tag.slug)
+
+        by_text = [t for t in self.tags if t.tag_id is None and not t.slug]
+        if not by_text:
+            return
+        categories = _in_bulk(
+            GameTagCategory, {t.category for t in by_text}, "symbolic_id"
+        )
+        found = {
+            (category_id, name): tag_id
+            for category_id, name, tag_id in GameTag.objects.filter(
+                category__in=categories.values(),
+                name__in={t.text for t in by_text},
+            ).values_list("category_id", "name", "id")
+        }
+        missing = {}
+        for tag in by_text:
+            cat = categories[tag.category]
+            key = (cat.id, tag.text)
+            if key in found or key in missing:
+                continue
+            if not cat.allow_new_tags:
+                raise GameTag.DoesNotExist(
+                    f"No tag {tag.text!r} in category {cat.symbolic_id!r}"
+                )
+            missing[key] = GameTag(name=tag.text, category=cat)
+        for key, created in zip(
+            missing, GameTag.objects.bulk_create(missing.values())
+        ):
+            found[key] = created.id
+        for tag in by_text:
+            key = (categories[tag.category].id, tag.text)
+            tag.tag_id, tag.text = found[key], None
 
     def _save_authors(self, game: Game) -> None:
+        role_ids = self._resolve_role_ids()
+        self._resolve_alias_ids()
         existing = {
             (ga.role_id, ga.author_id): ga.id
             for ga in game.gameauthor_set.all()
@@ -276,41 +308,74 @@ class GameInfo:
         for role_slug, people in self.personalities.items():
             if not role_slug:
                 continue
-            role, _ = GameAuthorRole.objects.get_or_create(
-                symbolic_id=role_slug, defaults={"title": role_slug}
-            )
             for person in people:
-                alias = self._resolve_alias(person)
-                if alias is None:
+                if person.alias_id is None:
+                    continue
+                key = (role_ids[role_slug], person.alias_id)
+                if key in desired:
                     continue
-                if alias.personality_id is None:
-                    alias.personality = Personality.objects.create(
-                        name=alias.name
-                    )
-                    alias.save(update_fields=["personality"])
-                key = (role.id, alias.id)
                 desired.add(key)
                 if key not in existing:
                     to_create.append(
-                        GameAuthor(
-                            game=game, role_id=role.id, author_id=alias.id
-                        )
+                        GameAuthor(game=game, role_id=key[0], author_id=key[1])
                     )
         GameAuthor.objects.bulk_create(to_create)
         if stale := [v for k, v in existing.items() if k not in desired]:
             GameAuthor.objects.filter(id__in=stale).delete()
 
-    def _resolve_alias(self, person: Person) -> PersonalityAlias | None:
-        if person.alias_id is not None:
-            return PersonalityAlias.objects.get(pk=person.alias_id)
-        name = person.name.strip()
-        if not name:
-            return None
-        alias_id = _existing_alias_id(name)
-        if alias_id is None:
-            alias_id = PersonalityAlias.objects.create(name=name).id
-        person.alias_id, person.name = alias_id, ""
-        return PersonalityAlias.objects.get(pk=alias_id)
+    def _resolve_role_ids(self) -> dict[str, int]:
+        slugs = [slug for slug in self.personalities if slug]
+        role_ids = dict(
+            GameAuthorRole.objects.filter(symbolic_id__in=slugs).values_list(
+                "symbolic_id", "id"
+            )
+        )
+        role_ids.update(
+            (role.symbolic_id, role.id)
+            for role in GameAuthorRole.objects.bulk_create(
+                GameAuthorRole(symbolic_id=slug, title=slug)
+                for slug in slugs
+                if slug not in role_ids
+            )
+        )
+        return role_ids
+
+    def _resolve_alias_ids(self) -> None:
+        """Resolve people to aliases, creating aliases and personalities."""
+        people = [
+            person
+            for role_slug, persons in self.personalities.items()
+            if role_slug
+            for person in persons
+        ]
+        names = {p.name.strip() for p in people if p.alias_id is None} - {""}
+        alias_ids = _existing_alias_ids(names)
+        alias_ids.update(
+            (alias.name, alias.id)
+            for alias in PersonalityAlias.objects.bulk_create(
+                PersonalityAlias(name=name)
+                for name in sorted(names)
+                if alias_ids.get(name) is None
+            )
+        )
+        for person in people:
+            if person.alias_id is None and (name := person.name.strip()):
+                person.alias_id, person.name = alias_ids[name], ""
+
+        aliases = _in_bulk(
+            PersonalityAlias,
+            {p.alias_id for p in people if p.alias_id is not None},
+        )
+        orphans = [a for a in aliases.values() if a.personality_id is None]
+        if orphans:
+            for alias, personality in zip(
+                orphans,
+                Personality.objects.bulk_create(
+                    Personality(name=a.name) for a in orphans
+                ),
+            ):
+                alias.personality = personality
+            PersonalityAlias.objects.bulk_update(orphans, ["personality"])
 
     def _resolve_existing_alias_id(self, person: Person) -> int | None:
         if person.alias_id is not None:
@@ -356,53 +421,80 @@ class GameInfo:
         return attr.attr_id
 
     def _save_urls(self, game: Game) -> None:
+        categories = _in_bulk(
+            GameURLCategory, {e.category for e in self.urls}, "symbolic_id"
+        )
+        urls = _in_bulk(
+            URL, {e.url_id for e in self.urls if e.url_id is not None}
+        )
+        new_urls: dict[str | None, bool] = defaultdict(bool)
+        for entry in self.urls:
+            if entry.url_id is None:
+                new_urls[entry.url] |= categories[entry.category].allow_cloning
+        if new_urls:
+            created = CreateUrls(new_urls)
+            for entry in self.urls:
+                if entry.url_id is None:
+                    url = created[entry.url]
+                    entry.url_id = url.id
+                    urls[url.id] = url
+
         existing = {
-            (gu.category_id, gu.url.original_url): (
-                gu.id,
-                gu.description or "",
-            )
+            (gu.category_id, gu.url.original_url): gu
             for gu in game.gameurl_set.select_related("url").all()
         }
         desired = set()
+        to_create = []
+        to_update = []
         for entry in self.urls:
-            cat = GameURLCategory.objects.get(symbolic_id=entry.category)
-            if entry.url_id is not None:
-                url = URL.objects.get(id=entry.url_id)
-            else:
-                url = CreateUrl(entry.url, ok_to_clone=cat.allow_cloning)
-                entry.url_id = url.id
+            cat = categories[entry.category]
+            url = urls[entry.url_id]
             key = (cat.id, url.original_url)
             if key in desired:
                 continue
             desired.add(key)
-            description = entry.description or ""
+            description = entry.description or None
             if key in existing:
-                game_url_id, old_description = existing[key]
-                if description != old_description:
-                    GameURL.objects.filter(pk=game_url_id).update(
-                        description=description or None
-                    )
+                gu = existing[key]
+                if (gu.description or None) != description:
+                    gu.description = description
+                    to_update.append(gu)
             else:
-                gu = GameURL(
-                    game=game,
-                    url_id=url.id,
-                    category_id=cat.id,
-                    description=description or None,
+                to_create.append(
+                    GameURL(
+                        game=game,
+                        url_id=url.id,
+                        category_id=cat.id,
+                        description=description,
+                    )
                 )
-                gu.save()
-        if stale := [v[0] for k, v in existing.items() if k not in desired]:
+        GameURL.objects.bulk_update(to_update, ["description"])
+        GameURL.objects.bulk_create(to_create)
+        if stale := [v.id for k, v in existing.items() if k not in desired]:
             GameURL.objects.filter(id__in=stale).delete()
 
     def _save_attributions(self, game: Game) -> None:
-        ids = []
-        for attr in self.attributions:
-            if attr.attr_id is None:
-                obj, _ = GameDescriptionAttribution.objects.get_or_create(
-                    name=attr.name
+        names = {a.name for a in self.attributions if a.attr_id is None}
+        if names:
+            ids = dict(
+                GameDescriptionAttribution.objects.filter(
+                    name__in=names
+                ).values_list("name", "id")
+            )
+            ids.update(
+                (obj.name, obj.id)
+                for obj in GameDescriptionAttribution.objects.bulk_create(
+                    GameDescriptionAttribution(name=name)
+                    for name in sorted(names)
+                    if name not in ids
                 )
-                attr.attr_id, attr.name = obj.id, ""
-            ids.append(attr.attr_id)
-        game.description_attributions.set(ids)
+            )
+            for attr in self.attributions:
+                if attr.attr_id is None:
+                    attr.attr_id, attr.name = ids[attr.name], ""
+        game.description_attributions.set([
+            attr.attr_id for attr in self.attributions
+        ])
 
 
 # -- Parsing --------------------------------------------------------------
@@ -496,6 +588,35 @@ def _parse_attribution(value) -> Attribution:
     return Attribution(attr.id, "") if attr else Attribution(None, value)
 
 
+def _existing_alias_ids(names: set[str]) -> dict[str, int | None]:
+    """Batched ``_existing_alias_id``: name -> alias id (or None)."""
+    ids = dict(
+        PersonalityAliasRedirect.objects.filter(name__in=names).values_list(
+            "name", "hidden_for_id"
+        )
+    )
+    # Lowest id wins, as with ``.first()``.
+    for alias_id, name in (
+        PersonalityAlias.objects
+        .filter(name__in=names - ids.keys())
+        .order_by("-id")
+        .values_list("id", "name")
+    ):
+        ids[name] = alias_id
+    return ids
+
+
+def _in_bulk(model, keys, field_name="pk") -> dict:
+    """``in_bulk`` that raises DoesNotExist when any key is missing."""
+    found = model.objects.in_bulk(keys, field_name=field_name)
+    if missing := set(keys) - found.keys():
+        raise model.DoesNotExist(
+            f"{model.__name__} matching {field_name} in {sorted(missing)}"
+            " does not exist."
+        )
+    return found
+
+
 def _existing_alias_id(name: str) -> int | None:
     if not name:
         return None
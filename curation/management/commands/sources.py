@@ -2,6 +2,12 @@ from django.core.management.base import BaseCommand
 
 from curation.discovery import run_discover
 from curation.edit import run_edit
+from curation.edit_benchmark import (
+    EditBenchmark,
+    compare_benchmarks,
+    format_benchmark,
+    run_edit_benchmark,
+)
 from curation.fetch import run_fetch
 from curation.models import GameSource
 from curation.reconcile import run_reconcile
@@ -42,6 +48,23 @@ class Command(BaseCommand):
         )
         parser.add_argument("--history", type=int, help="Edit one history pk.")
         parser.add_argument("--pipeline", type=int, help="Edit pipeline pk.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Edit: benchmark the pipeline without writing anything.",
+        )
+        parser.add_argument(
+            "--skip-pass",
+            action="append",
+            default=[],
+            help="Dry run: leave out this pass. Can be used repeatedly.",
+        )
+        parser.add_argument(
+            "--baseline", help="Dry run: compare with this saved result."
+        )
+        parser.add_argument(
+            "--save-baseline", help="Dry run: save the result to this file."
+        )
 
     def handle(self, *args, **options):
         verbose = options["verbose"] or options["verbosity"] > 1
@@ -103,6 +126,25 @@ class Command(BaseCommand):
             def edit_done(history, outcome):
                 self.stdout.write(f"history #{history.pk}: {outcome}")
 
+            if options["dry_run"]:
+                result = run_edit_benchmark(
+                    history_id=options["history"],
+                    limit=options["limit"],
+                    pipeline_id=options["pipeline"],
+                    skip_passes=options["skip_pass"],
+                    on_history_done=edit_done if verbose else None,
+                )
+                for line in format_benchmark(result):
+                    self.stdout.write(line)
+                if options["baseline"]:
+                    baseline = EditBenchmark.load(options["baseline"])
+                    self.stdout.write(f"compared to {options['baseline']}:")
+                    for line in compare_benchmarks(result, baseline):
+                        self.stdout.write(line)
+                if options["save_baseline"]:
+                    result.save(options["save_baseline"])
+                return
+
             stats = run_edit(
                 history_id=options["history"],
                 limit=options["limit"],
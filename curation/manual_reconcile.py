@@ -1,54 +1,36 @@
 from django.db import transaction
+from django.db.models import Prefetch
 from django.urls import reverse
 from django.utils.timezone import now
 
+from games.dictionaries import AllEditorDictionaries
 from games.models import (
     Game,
-    GameAuthorRole,
+    GameAuthor,
+    GameDescriptionAttribution,
     GameTag,
-    GameTagCategory,
-    GameURLCategory,
-    PersonalityAlias,
+    GameURL,
 )
 
 from .gameinfo import GameInfo
 from .manual import editor_payload_to_gameinfo
-from .merge import contest_related_usage
+from .merge import contest_related_usages
 from .models import GameEdit, GameHistory, GameHistoryAuditLog, GameSource
 
 
 def choices_payload():
+    """Author, tag and link choices, from the editor's cached dictionaries."""
+    dictionaries = AllEditorDictionaries()
     return {
         "authors": {
-            "roles": [
-                {"id": row.id, "title": row.title}
-                for row in GameAuthorRole.objects.order_by("order", "title")
-            ],
-            "authors": [
-                {"id": row.id, "name": row.name}
-                for row in PersonalityAlias.objects.order_by("name")
-            ],
-        },
-        "tags": {
-            "categories": [
-                {
-                    "id": cat.id,
-                    "name": cat.name,
-                    "allow_new_tags": cat.allow_new_tags,
-                    "tags": [
-                        {"id": tag.id, "name": tag.name}
-                        for tag in GameTag.objects.filter(
-                            category=cat
-                        ).order_by("name")
-                    ],
-                }
-                for cat in GameTagCategory.objects.order_by("order", "name")
-            ]
+            "roles": dictionaries["authortypes"]["roles"],
+            "authors": dictionaries["authortypes"]["authors"],
         },
+        "tags": {"categories": dictionaries["tagtypes"]["categories"]},
         "links": {
             "categories": [
-                {"id": row.id, "title": row.title}
-                for row in GameURLCategory.objects.order_by("order", "title")
+                {"id": x["id"], "title": x["title"]}
+                for x in dictionaries["linktypes"]["categories"]
             ]
         },
     }
@@ -63,20 +45,46 @@ def source_payload(source: GameSource) -> dict:
     }
 
 
-def column_for_history(history: GameHistory) -> dict:
-    game = history.game
-    if game is None:
-        return _empty_column(
-            client_id=f"history-{history.id}",
-            history_id=history.id,
-            sources=history.gamesource_set.order_by("id"),
+def _sources_prefetch(lookup: str) -> Prefetch:
+    return Prefetch(lookup, queryset=GameSource.objects.order_by("id"))
+
+
+def _load_games(game_ids) -> dict[int, Game]:
+    """Games with everything a column shows, in a fixed number of queries."""
+    return (
+        Game.objects
+        .select_related("gamehistory")
+        .prefetch_related(
+            Prefetch(
+                "tags",
+                queryset=GameTag.objects.order_by(
+                    "category__order", "category__name", "name"
+                ),
+            ),
+            Prefetch(
+                "gameauthor_set",
+                queryset=GameAuthor.objects.order_by(
+                    "role__order", "role__title"
+                ),
+            ),
+            Prefetch(
+                "gameurl_set",
+                queryset=GameURL.objects.select_related("url").order_by(
+                    "category__order", "category__title", "id"
+                ),
+            ),
+            Prefetch(
+                "description_attributions",
+                queryset=GameDescriptionAttribution.objects.order_by("name"),
+            ),
+            _sources_prefetch("gamehistory__gamesource_set"),
         )
-    return column_for_game(game, history=history)
+        .in_bulk(game_ids)
+    )
 
 
-def column_for_game(game: Game, *, history: GameHistory | None = None) -> dict:
-    if history is None:
-        history = getattr(game, "gamehistory", None)
+def _game_column(game: Game) -> dict:
+    history = getattr(game, "gamehistory", None)
     return {
         "client_id": f"game-{game.id}",
         "history_id": history.id if history else None,
@@ -85,17 +93,9 @@ def column_for_game(game: Game, *, history: GameHistory | None = None) -> dict:
         "release_date": game.release_date.isoformat()
         if game.release_date
         else "",
-        "tags": [
-            [tag.category_id, tag.id]
-            for tag in game.tags.select_related("category").order_by(
-                "category__order", "category__name", "name"
-            )
-        ],
+        "tags": [[tag.category_id, tag.id] for tag in game.tags.all()],
         "authors": [
-            [row.role_id, row.author_id]
-            for row in game.gameauthor_set.order_by(
-                "role__order", "role__title"
-            )
+            [row.role_id, row.author_id] for row in game.gameauthor_set.all()
         ],
         "links": [
             [
@@ -103,28 +103,60 @@ def column_for_game(game: Game, *, history: GameHistory | None = None) -> dict:
                 row.description or "",
                 row.url.original_url or "",
             ]
-            for row in game.gameurl_set.select_related(
-                "url", "category"
-            ).order_by("category__order", "category__title", "id")
+            for row in game.gameurl_set.all()
         ],
         "description_attributions": [
-            row.name for row in game.description_attributions.order_by("name")
+            row.name for row in game.description_attributions.all()
         ],
         "description": game.description or "",
         "sources": [
             source_payload(source)
-            for source in (
-                history.gamesource_set.order_by("id") if history else []
-            )
+            for source in (history.gamesource_set.all() if history else [])
         ],
         "delete": False,
     }
 
 
-def initial_payload(history: GameHistory) -> dict:
+def columns_for_games(game_ids) -> list[dict]:
+    """Columns of the given games, in order; missing ids are skipped."""
+    games = _load_games(game_ids)
+    return [_game_column(games[id]) for id in game_ids if id in games]
+
+
+def columns_for_histories(histories: list[GameHistory]) -> list[dict]:
+    """Columns of the given histories, loaded together, in order."""
+    games = _load_games([h.game_id for h in histories if h.game_id])
+    spawned = GameHistory.objects.prefetch_related(
+        _sources_prefetch("gamesource_set")
+    ).in_bulk([h.id for h in histories if h.game_id is None])
+    columns = []
+    for history in histories:
+        if history.game_id is None:
+            columns.append(
+                _empty_column(
+                    client_id=f"history-{history.id}",
+                    history_id=history.id,
+                    sources=spawned[history.id].gamesource_set.all(),
+                )
+            )
+        else:
+            columns.append(_game_column(games[history.game_id]))
+    return columns
+
+
+def column_for_history(history: GameHistory) -> dict:
+    return columns_for_histories([history])[0]
+
+
+def initial_payload(history: GameHistory, game_ids=()) -> dict:
+    """Editor payload for a history plus any other games to reconcile."""
+    columns = [column_for_history(history)]
+    columns += columns_for_games([
+        id for id in dict.fromkeys(game_ids) if id != history.game_id
+    ])
     return {
         "base_history_id": history.id,
-        "columns": [column_for_history(history)],
+        "columns": columns,
         "choices": choices_payload(),
     }
 
@@ -344,11 +376,16 @@ def _validate_deletions(
         for source in col["sources"]
     }
     orphan_ids = set(orphan_source_ids)
+    usages = contest_related_usages([
+        col["game_id"]
+        for col in columns
+        if col["delete"] and col["game_id"] is not None
+    ])
     for col in columns:
         if not col["delete"] or col["game_id"] is None:
             continue
         game = games[col["game_id"]]
-        if usage := contest_related_usage(game):
+        if usage := usages.get(game.id):
             related = ", ".join(
                 f"{item.label}: {item.count}" for item in usage
             )
@@ -1,16 +1,30 @@
 from dataclasses import dataclass
 
 from django.db import transaction
-from django.db.models import Model
+from django.db.models import (
+    Count,
+    Exists,
+    Model,
+    OuterRef,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
 
 from contest.models import CompetitionQuestion, CompetitionVote, GameListEntry
+from contest.tally import RebuildTally
 from core.models import Package
+from games.authorstats import RefreshingAuthorStats
 from games.models import Game, GameAuthor, GameComment, GameURL, GameVote
 
 from .models import GameHistory, GameHistoryAuditLog, GameSource
 
-CONTEST_RELATED_MODELS = [GameListEntry, CompetitionVote, CompetitionQuestion]
+CONTEST_RELATED_MODELS: list[type[Model]] = [
+    GameListEntry,
+    CompetitionVote,
+    CompetitionQuestion,
+]
 CONTEST_RELATED_LABELS = {
     GameListEntry: "списки игр",
     CompetitionVote: "голоса",
@@ -30,15 +44,36 @@ class RelatedUsage:
         )
 
 
+def contest_related_usages(game_ids) -> dict[int, list[RelatedUsage]]:
+    """Contest references of every game, counted in a single query."""
+    counts = {
+        f"n{i}": Coalesce(
+            Subquery(
+                model.objects
+                .filter(game=OuterRef("pk"))
+                .order_by()
+                .values("game")
+                .annotate(n=Count("pk"))
+                .values("n")
+            ),
+            0,
+        )
+        for i, model in enumerate(CONTEST_RELATED_MODELS)
+    }
+    return {
+        row["pk"]: [
+            RelatedUsage(model, count)
+            for i, model in enumerate(CONTEST_RELATED_MODELS)
+            if (count := row[f"n{i}"])
+        ]
+        for row in Game.objects.filter(pk__in=game_ids).values("pk", **counts)
+    }
+
+
 def contest_related_usage(game: Game) -> list[RelatedUsage]:
-    return [
-        RelatedUsage(model, count)
-        for model in CONTEST_RELATED_MODELS
-        if (count := model.objects.filter(game=game).count())
-    ]
+    return contest_related_usages([game.pk]).get(game.pk, [])
 
 
-@transaction.atomic
 def merge_game_into_history(
     *,
     target_history: GameHistory,
@@ -46,126 +81,159 @@ def merge_game_into_history(
     actor,
     remap_contests: bool,
 ) -> None:
+    merge_games_into_history(
+        target_history=target_history,
+        source_games=[source_game],
+        actor=actor,
+        remap_contests=remap_contests,
+    )
+
+
+@transaction.atomic
+def merge_games_into_history(
+    *,
+    target_history: GameHistory,
+    source_games: list[Game],
+    actor,
+    remap_contests: bool,
+) -> None:
+    """Merge a cluster of duplicate games into the game of a history.
+
+    Related rows are moved with a fixed number of statements per source game;
+    rows that would duplicate one the target already has are dropped first.
+    """
     target_game = target_history.game
     if target_game is None:
         raise ValueError("Target history has no game.")
-    if source_game.pk == target_game.pk:
-        raise ValueError("Cannot merge a game into itself.")
-
-    source_history = getattr(source_game, "gamehistory", None)
-    if source_history and source_history.pk == target_history.pk:
+    source_ids = list(dict.fromkeys(game.pk for game in source_games))
+    if not source_ids:
+        return
+    if (
+        target_game.pk in source_ids
+        or GameHistory.objects.filter(
+            pk=target_history.pk, game__in=source_ids
+        ).exists()
+    ):
         raise ValueError("Cannot merge a game into itself.")
 
-    usage = contest_related_usage(source_game)
-    if usage and not remap_contests:
+    if not remap_contests and any(contest_related_usages(source_ids).values()):
         raise ValueError("Contest references must be confirmed.")
 
     target_game = Game.objects.select_for_update().get(pk=target_game.pk)
-    source_game = Game.objects.select_for_update().get(pk=source_game.pk)
-    source_history = getattr(source_game, "gamehistory", None)
+    sources = Game.objects.select_for_update().in_bulk(source_ids)
+    source_games = [sources[pk] for pk in source_ids if pk in sources]
+    source_ids = [game.pk for game in source_games]
 
     if not target_game.release_date:
-        target_game.release_date = source_game.release_date
+        target_game.release_date = next(
+            (g.release_date for g in source_games if g.release_date), None
+        )
     target_game.description = _merged_description(
-        target_game.description, source_game.description
+        target_game.description, *(g.description for g in source_games)
     )
     target_game.edit_time = now()
     target_game.save(
         update_fields=["release_date", "description", "edit_time"]
     )
-    target_game.tags.add(*source_game.tags.all())
 
-    _move_game_urls(source_game, target_game)
-    _move_game_authors(source_game, target_game)
-    _move_game_votes(source_game, target_game)
-    _move_related(GameComment, source_game, target_game)
-    _move_related(Package, source_game, target_game)
+    related: list[type[Model]] = [GameComment, Package]
     if remap_contests:
-        for model in CONTEST_RELATED_MODELS:
-            _move_related(model, source_game, target_game)
-
-    if source_history is not None:
-        GameSource.objects.filter(history=source_history).update(
-            history=target_history
+        related += CONTEST_RELATED_MODELS
+    with RefreshingAuthorStats(*source_ids, target_game.id):
+        for source_id in source_ids:
+            for model, duplicate in [
+                (Game.tags.through, Q(gametag=OuterRef("gametag"))),
+                (
+                    Game.description_attributions.through,
+                    Q(
+                        gamedescriptionattribution=OuterRef(
+                            "gamedescriptionattribution"
+                        )
+                    ),
+                ),
+                (
+                    GameURL,
+                    Q(category=OuterRef("category"), url=OuterRef("url")),
+                ),
+                (
+                    GameAuthor,
+                    Q(role=OuterRef("role"))
+                    & (
+                        Q(author=OuterRef("author"))
+                        | Q(
+                            author__personality=OuterRef("author__personality")
+                        )
+                    ),
+                ),
+                (GameVote, Q(user=OuterRef("user"))),
+            ]:
+                _move_unique(model, source_id, target_game.id, duplicate)
+        voted_competitions = (
+            set(
+                CompetitionVote.objects.filter(
+                    game__in=source_ids
+                ).values_list("competition_id", flat=True)
+            )
+            if remap_contests
+            else set()
         )
+        for model in related:
+            model.objects.filter(game__in=source_ids).update(game=target_game)
+        for competition_id in voted_competitions:
+            RebuildTally(competition_id)
+    Game.BumpRevision(target_game.id)
+
+    source_histories = list(
+        GameHistory.objects.select_for_update().filter(game__in=source_ids)
+    )
+    GameSource.objects.filter(history__in=source_histories).update(
+        history=target_history
+    )
+    history_by_game = {h.game_id: h for h in source_histories}
+    for source_game in source_games:
         GameHistoryAuditLog.record_game_merge(
             target_history, actor, source_game, target_game
         )
-        GameHistoryAuditLog.record_game_merge(
-            source_history, actor, source_game, target_game
-        )
-        old_state = source_history.state
-        source_history.game = None
-        source_history.state = GameHistory.State.ABANDONED
-        source_history.auto_updates = GameHistory.AutoUpdate.REJECT
-        source_history.processing_started_at = None
-        source_history.processing_task_id = None
-        source_history.edit_time = now()
-        source_history.save(
-            update_fields=[
-                "game",
-                "state",
-                "auto_updates",
-                "processing_started_at",
-                "processing_task_id",
-                "edit_time",
-            ]
-        )
+        if source_history := history_by_game.get(source_game.pk):
+            GameHistoryAuditLog.record_game_merge(
+                source_history, actor, source_game, target_game
+            )
+    GameHistory.objects.filter(pk__in=[h.pk for h in source_histories]).update(
+        game=None,
+        state=GameHistory.State.ABANDONED,
+        auto_updates=GameHistory.AutoUpdate.REJECT,
+        processing_started_at=None,
+        processing_task_id=None,
+        edit_time=now(),
+    )
+    for source_history in source_histories:
         GameHistoryAuditLog.record_change(
             source_history,
             actor,
             GameHistoryAuditLog.AuditField.STATE,
-            old_state,
             source_history.state,
-        )
-    else:
-        GameHistoryAuditLog.record_game_merge(
-            target_history, actor, source_game, target_game
+            GameHistory.State.ABANDONED,
         )
 
-    source_game.delete()
+    Game.objects.filter(pk__in=source_ids).delete()
     target_history.edit_time = now()
     target_history.save(update_fields=["edit_time"])
 
 
-def _merged_description(left: str | None, right: str | None) -> str:
-    return "\n\n".join(x for x in [left or "", right or ""] if x)
-
-
-def _move_related(model: type[Model], source_game: Game, target_game: Game):
-    model.objects.filter(game=source_game).update(game=target_game)
+def _merged_description(*parts: str | None) -> str:
+    return "\n\n".join(x for x in parts if x)
 
 
-def _move_game_urls(source_game: Game, target_game: Game):
-    for row in GameURL.objects.filter(game=source_game):
-        if GameURL.objects.filter(
-            game=target_game, category=row.category, url=row.url
-        ).exists():
-            row.delete()
-            continue
-        row.game = target_game
-        row.save(update_fields=["game"])
-
-
-def _move_game_authors(source_game: Game, target_game: Game):
-    for row in GameAuthor.objects.filter(game=source_game).select_related(
-        "author__personality"
-    ):
-        if GameAuthor.objects.filter(
-            game=target_game,
-            role=row.role,
-            author__personality=row.author.personality,
-        ).exists():
-            row.delete()
-            continue
-        row.game = target_game
-        row.save(update_fields=["game"])
-
-
-def _move_game_votes(source_game: Game, target_game: Game):
-    for row in GameVote.objects.filter(game=source_game):
-        if GameVote.objects.filter(game=target_game, user=row.user).exists():
-            row.delete()
-            continue
-        row.game = target_game
-        row.save(update_fields=["game"])
+def _move_unique(
+    model: type[Model], source_id: int, target_id: int, duplicate: Q
+) -> None:
+    """Move rows of ``model`` from one game to another.
+
+    Rows of the source game matching a row of the target game on
+    ``duplicate`` are deleted instead of moved.
+    """
+    rows = model.objects.filter(game_id=source_id)
+    rows.filter(
+        Exists(model.objects.filter(duplicate, game_id=target_id))
+    ).delete()
+    rows.update(game_id=target_id)
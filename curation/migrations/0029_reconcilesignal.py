@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("curation", "0028_alter_gameedit_origin"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconcileSignal",
+            fields=[
+                (
+                    "history",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="reconcile_signal",
+                        serialize=False,
+                        to="curation.gamehistory",
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        max_length=64, verbose_name="Fingerprint"
+                    ),
+                ),
+                (
+                    "hash_urls",
+                    models.JSONField(
+                        default=list, verbose_name="Identity URL hashes"
+                    ),
+                ),
+                (
+                    "title_bow",
+                    models.JSONField(default=list, verbose_name="Title words"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+            },
+        ),
+    ]
@@ -8,6 +8,7 @@ from .curation import (
     GameSource,
     GameSourceFetch,
     GenreMapping,
+    ReconcileSignal,
     SourceDiscoveryStatus,
 )
 from .llm import LLMModel, LlmTrajectory, LlmWorkflow
@@ -25,5 +26,6 @@ __all__ = [
     "LLMModel",
     "LlmTrajectory",
     "LlmWorkflow",
+    "ReconcileSignal",
     "SourceDiscoveryStatus",
 ]
@@ -227,6 +227,32 @@ class GameSourceFetch(models.Model):
     last_fetch = models.DateTimeField(_("Last fetch"))
 
 
+class ReconcileSignal(models.Model):
+    """Precomputed reconcile matching signals of a history.
+
+    ``fingerprint`` describes the data the signals were derived from (game
+    revision, or attached sources and their latest fetch); a row whose
+    fingerprint no longer matches is recomputed by the next reconcile run.
+    """
+
+    class Meta:
+        default_permissions = ()
+
+    def __str__(self):
+        return f"Reconcile signals of history #{self.history_id}"
+
+    history = models.OneToOneField(
+        GameHistory,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="reconcile_signal",
+    )
+    fingerprint = models.CharField(_("Fingerprint"), max_length=64)
+    hash_urls = models.JSONField(_("Identity URL hashes"), default=list)
+    title_bow = models.JSONField(_("Title words"), default=list)
+    updated_at = models.DateTimeField(_("Updated at"))
+
+
 class GameEdit(models.Model):
     class Meta:
         default_permissions = ()
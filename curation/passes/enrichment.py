@@ -14,7 +14,11 @@ tag->genre step is driven by :class:`~curation.models.GenreMapping`.
 """
 
 import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from functools import lru_cache
+from types import CodeType
 from urllib.parse import urlsplit
 
 from curation.edit import GameEditPass, GameEditState, register_pass
@@ -23,20 +27,60 @@ from curation.models import EnrichmentRule, GenreMapping
 from games.models import GameTag
 
 
+@dataclass(frozen=True)
+class CompiledRules:
+    """Enabled rules as code objects, plus the genre mapping."""
+
+    # (condition or None for "always", action), in rule order.
+    rules: list[tuple[CodeType | None, CodeType]]
+    genres: dict[str, GenreMapping]
+
+    @classmethod
+    def load(cls) -> "CompiledRules":
+        return cls(
+            rules=[
+                (
+                    _compile(condition, "eval") if condition else None,
+                    _compile(action, "exec"),
+                )
+                for condition, action in EnrichmentRule.objects.filter(
+                    enabled=True
+                ).values_list("condition", "action")
+            ],
+            genres={m.tag: m for m in GenreMapping.objects.all()},
+        )
+
+
+# Loaded once per run_edit; outside of a run, rules are loaded per call. The
+# pass instance is shared through PASS_REGISTRY, so concurrent and nested
+# runs each keep their own rules here rather than on it.
+_compiled: ContextVar[CompiledRules | None] = ContextVar(
+    "enrichment_rules", default=None
+)
+
+
 @register_pass
 class EnrichmentPass(GameEditPass):
     name = "enrich"
 
+    @contextmanager
+    def run(self):
+        token = _compiled.set(CompiledRules.load())
+        try:
+            yield
+        finally:
+            _compiled.reset(token)
+
     def apply(self, state: GameEditState, params: dict) -> None:
+        compiled = _compiled.get() or CompiledRules.load()
         info = state.current
-        ns = _namespace(info)
-        for rule in EnrichmentRule.objects.filter(enabled=True):
-            if not rule.condition or eval(
-                _compile(rule.condition, "eval"), {"__builtins__": {}}, ns
-            ):
-                exec(_compile(rule.action, "exec"), {"__builtins__": {}}, ns)
+        tag_names = _tag_names(info)
+        ns = _namespace(info, tag_names)
+        for condition, action in compiled.rules:
+            if condition is None or eval(condition, {"__builtins__": {}}, ns):
+                exec(action, {"__builtins__": {}}, ns)
         _lowercase_tags(info)
-        _tags_to_genre(info)
+        _tags_to_genre(info, compiled.genres, tag_names)
 
 
 @lru_cache(maxsize=None)
@@ -44,19 +88,42 @@ def _compile(source: str, mode: str):
     return compile(source, "<enrichment-rule>", mode)
 
 
+@lru_cache(maxsize=None)
+def _regex(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _tag_names(info: GameInfo) -> dict[int, str]:
+    """DB names of the draft's resolved tags, in one query."""
+    ids = {tag.tag_id for tag in info.tags if tag.tag_id is not None}
+    if not ids:
+        return {}
+    return dict(GameTag.objects.filter(id__in=ids).values_list("id", "name"))
+
+
 # -- Helper namespace -----------------------------------------------------
 
 
-def _namespace(info: GameInfo) -> dict:
+def _namespace(info: GameInfo, tag_names: dict[int, str]) -> dict:
     """Closures over ``info`` exposed to rule condition / action code."""
 
+    # category -> lowercased identifiers of its tags; kept in step with the
+    # tags that add_tag / add_raw_tag append.
+    idents_by_category: dict[str, list[str]] = {}
+
+    def index_tag(tag):
+        idents_by_category.setdefault(tag.category, []).extend(
+            ident.lower() for ident in _tag_identifiers(tag, tag_names)
+        )
+
+    for tag in info.tags:
+        index_tag(tag)
+
     def has_tag(category, *patterns):
-        regexes = [re.compile(p) for p in patterns]
+        regexes = [_regex(p) for p in patterns]
         return any(
-            r.match(ident.lower())
-            for tag in info.tags
-            if tag.category == category
-            for ident in _tag_identifiers(tag)
+            r.match(ident)
+            for ident in idents_by_category.get(category, ())
             for r in regexes
         )
 
@@ -73,14 +140,18 @@ def _namespace(info: GameInfo) -> dict:
         present = {t.slug for t in info.tags if t.slug}
         for slug in slugs:
             if slug not in present:
-                info.tags.append(Tag("", slug, None, None))
+                tag = Tag("", slug, None, None)
+                info.tags.append(tag)
+                index_tag(tag)
                 present.add(slug)
 
     def add_raw_tag(category, text):
         if not any(
             t.category == category and t.text == text for t in info.tags
         ):
-            info.tags.append(Tag(category, None, None, text))
+            tag = Tag(category, None, None, text)
+            info.tags.append(tag)
+            index_tag(tag)
 
     def clone_url(from_cat, to_cat, desc_template):
         existing = {u.url for u in info.urls if u.category == to_cat}
@@ -109,22 +180,22 @@ def _namespace(info: GameInfo) -> dict:
     }
 
 
-def _tag_identifiers(tag: Tag) -> list[str]:
+def _tag_name(tag: Tag, tag_names: dict[int, str]) -> str | None:
+    """DB name of a resolved tag, None for unresolved ones."""
+    if tag.tag_id is None:
+        return None
+    return tag_names.get(tag.tag_id)
+
+
+def _tag_identifiers(tag: Tag, tag_names: dict[int, str]) -> list[str]:
     """Names a tag may be matched by: free text, slug, resolved DB name."""
     idents = []
     if tag.text:
         idents.append(tag.text)
     if tag.slug:
         idents.append(tag.slug)
-    if tag.tag_id is not None:
-        name = (
-            GameTag.objects
-            .filter(id=tag.tag_id)
-            .values_list("name", flat=True)
-            .first()
-        )
-        if name:
-            idents.append(name)
+    if name := _tag_name(tag, tag_names):
+        idents.append(name)
     return idents
 
 
@@ -137,24 +208,17 @@ def _lowercase_tags(info: GameInfo) -> None:
             tag.text = tag.text.lower()
 
 
-def _tags_to_genre(info: GameInfo) -> None:
-    mapping = {m.tag: m for m in GenreMapping.objects.all()}
-    tag_names = {
-        t.id: t.name
-        for t in GameTag.objects.filter(
-            id__in={
-                tag.tag_id
-                for tag in info.tags
-                if tag.category == "tag" and tag.tag_id is not None
-            }
-        )
-    }
+def _tags_to_genre(
+    info: GameInfo,
+    mapping: dict[str, GenreMapping],
+    tag_names: dict[int, str],
+) -> None:
     present_slugs = {tag.slug for tag in info.tags if tag.slug}
     extra: list[Tag] = []
     for tag in info.tags:
         if tag.category != "tag":
             continue
-        text = tag.text or tag_names.get(tag.tag_id)
+        text = tag.text or _tag_name(tag, tag_names)
         if not text:
             continue
         m = mapping.get(text.lower())
@@ -9,11 +9,11 @@ instead of live fetches.  Reconcile only *links*; building the ``GameEdit`` and
 applying changes is Phase 4.
 """
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass, field
 from logging import getLogger
 
-from django.db.models import Q
+from django.db.models import Count, Max, Q, Sum
 from django.utils.timezone import now
 
 from games.importer.tools import ComputeSimilarity, GetBagOfWords, HashizeUrl
@@ -24,6 +24,7 @@ from .models import (
     GameHistoryAuditLog,
     GameSource,
     GameSourceFetch,
+    ReconcileSignal,
 )
 from .providers import PROVIDER_BY_TYPE
 
@@ -37,6 +38,7 @@ URLCATS_TO_HASH = [
 ]
 SIMILAR_TITLES_HIGHCONF = 0.9
 SIMILAR_TITLES_LOWCONF = 0.67
+SIGNAL_BATCH_SIZE = 500
 
 
 @dataclass(frozen=True)
@@ -191,14 +193,46 @@ def _ambiguous_reason(
     return f"Источник s/{source.pk} {action}; другие игры: {other_games_text}"
 
 
-def _build_index() -> _TargetIndex:
-    """Load the full corpus into a matchable index, once per run."""
-    index = _TargetIndex()
-
+def _fingerprints(histories) -> dict[int, str]:
+    """Describe the data each history's signals are derived from.
+
+    A game-backed history changes with its game's revision; a spawned one
+    with the set of attached sources and their newest fetch.
+    """
+    rows = list(histories.values_list("id", "game_id", "game__revision"))
+    spawned = histories.filter(game__isnull=True)
+    sources = {
+        row["history_id"]: (row["count"], row["id_sum"])
+        for row in GameSource.objects
+        .filter(history__in=spawned)
+        .values("history_id")
+        .annotate(count=Count("id"), id_sum=Sum("id"))
+    }
+    latest_fetch = dict(
+        GameSourceFetch.objects
+        .filter(source__history__in=spawned)
+        .values("source__history_id")
+        .annotate(latest=Max("id"))
+        .values_list("source__history_id", "latest")
+    )
+    fingerprints = {}
+    for history_id, game_id, revision in rows:
+        if game_id is not None:
+            fingerprints[history_id] = f"game:{game_id}:{revision}"
+        else:
+            count, id_sum = sources.get(history_id, (0, 0))
+            fetch_id = latest_fetch.get(history_id, 0)
+            fingerprints[history_id] = f"sources:{count}:{id_sum}:{fetch_id}"
+    return fingerprints
+
+
+def _compute_signals(
+    history_ids: list[int],
+) -> dict[int, tuple[set[str], set[str]]]:
+    signals: dict[int, tuple[set[str], set[str]]] = {}
     existing = (
         GameHistory.objects
-        .filter(game__isnull=False)
-        .exclude(state=GameHistory.State.ABANDONED)
+        .filter(pk__in=history_ids, game__isnull=False)
         .select_related("game")
         .prefetch_related(
             "game__gameurl_set__category", "game__gameurl_set__url"
@@ -211,31 +245,107 @@ def _build_index() -> _TargetIndex:
             for gu in game.gameurl_set.all()
             if gu.category.symbolic_id in URLCATS_TO_HASH
         }
-        index.add(_Target(history, hash_urls, GetBagOfWords(game.title)))
+        signals[history.pk] = (hash_urls, GetBagOfWords(game.title))
+
+    # Spawned histories: union the signals of their sources' latest fetches
+    # so a later-run orphan can still cluster onto a history spawned earlier.
+    latest: dict[int, int] = {}
+    for fetch_id, source_id in (
+        GameSourceFetch.objects
+        .filter(
+            source__history__in=history_ids,
+            source__history__game__isnull=True,
+        )
+        .order_by("source_id", "last_fetch", "id")
+        .values_list("id", "source_id")
+    ):
+        latest[source_id] = fetch_id
+    fetches = GameSourceFetch.objects.filter(
+        pk__in=latest.values()
+    ).select_related("source")
+    for fetch in fetches:
+        hash_urls, title_bow = signals.setdefault(
+            fetch.source.history_id, (set(), set())
+        )
+        h, t = _signals(fetch.source, fetch)
+        hash_urls |= h
+        title_bow |= t
+    return signals
+
+
+def _store_signals(fingerprints: dict[int, str]) -> None:
+    history_ids = list(fingerprints)
+    ts = now()
+    for i in range(0, len(history_ids), SIGNAL_BATCH_SIZE):
+        batch = history_ids[i : i + SIGNAL_BATCH_SIZE]
+        signals = _compute_signals(batch)
+        ReconcileSignal.objects.bulk_create(
+            [
+                ReconcileSignal(
+                    history_id=history_id,
+                    fingerprint=fingerprints[history_id],
+                    hash_urls=sorted(hash_urls),
+                    title_bow=sorted(title_bow),
+                    updated_at=ts,
+                )
+                for history_id in batch
+                for hash_urls, title_bow in [signals.get(history_id, ((), ()))]
+            ],
+            update_conflicts=True,
+            unique_fields=["history"],
+            update_fields=[
+                "fingerprint",
+                "hash_urls",
+                "title_bow",
+                "updated_at",
+            ],
+        )
 
-    # Earlier-spawned histories: union the signals of their fetched sources so
-    # a later-run orphan can still cluster onto a history spawned earlier.
-    spawned = (
-        GameHistory.objects
-        .filter(game__isnull=True)
-        .exclude(state=GameHistory.State.ABANDONED)
-        .prefetch_related("gamesource_set")
+
+def refresh_reconcile_signals(history_ids: Iterable[int]) -> None:
+    """Recompute the stored signals of histories whose game or fetches
+    just changed, so the next reconcile run finds them up to date."""
+    history_ids = set(history_ids)
+    if history_ids:
+        _store_signals(
+            _fingerprints(GameHistory.objects.filter(pk__in=history_ids))
+        )
+
+
+def _build_index() -> _TargetIndex:
+    """Load the stored signals of the corpus into a matchable index.
+
+    Rows that are missing or whose fingerprint is out of date (the game or
+    the sources changed on a path that did not refresh them) are recomputed
+    first.
+    """
+    histories = GameHistory.objects.exclude(state=GameHistory.State.ABANDONED)
+    fingerprints = _fingerprints(histories)
+    stored = dict(
+        ReconcileSignal.objects.filter(history__in=histories).values_list(
+            "history_id", "fingerprint"
+        )
     )
-    for history in spawned:
-        hash_urls: set[str] = set()
-        title_bow: set[str] = set()
-        fetched = False
-        for source in history.gamesource_set.all():
-            fetch = _latest_fetch(source)
-            if fetch is None:
-                continue
-            fetched = True
-            h, t = _signals(source, fetch)
-            hash_urls |= h
-            title_bow |= t
-        if fetched:
-            index.add(_Target(history, hash_urls, title_bow))
+    if stale := {
+        history_id: fingerprint
+        for history_id, fingerprint in fingerprints.items()
+        if stored.get(history_id) != fingerprint
+    }:
+        logger.info("Refreshing reconcile signals of %d histories", len(stale))
+        _store_signals(stale)
 
+    index = _TargetIndex()
+    rows = ReconcileSignal.objects.filter(
+        history__in=histories
+    ).select_related("history")
+    # Game-backed histories win identity-url collisions over spawned ones.
+    for row in sorted(
+        rows, key=lambda r: (r.history.game_id is None, r.history_id)
+    ):
+        if row.hash_urls or row.title_bow:
+            index.add(
+                _Target(row.history, set(row.hash_urls), set(row.title_bow))
+            )
     return index
 
 
@@ -275,6 +385,7 @@ def run_reconcile(
 
     logger.info("Starting source reconcile")
     totals_by_type: dict[str, _ReconcileTotals] = {}
+    linked_history_ids: set[int] = set()
     for source in sources:
         totals = totals_by_type.setdefault(
             source.type, _ReconcileTotals(source.type)
@@ -313,6 +424,7 @@ def run_reconcile(
             source.history = target.history
             source.save(update_fields=["history"])
             _record_source_attached(source, target.history)
+            linked_history_ids.add(target.history.pk)
             _mark_needs_attention(
                 target.history,
                 _ambiguous_reason(
@@ -345,6 +457,7 @@ def run_reconcile(
             source.history = target.history
             source.save(update_fields=["history"])
             _record_source_attached(source, target.history)
+            linked_history_ids.add(target.history.pk)
             if target.is_new:  # grow so later same-run orphans cluster onto it
                 index.register_urls(target, hash_urls)
                 target.hash_urls |= hash_urls
@@ -362,6 +475,7 @@ def run_reconcile(
         source.history = history
         source.save(update_fields=["history"])
         _record_source_attached(source, history)
+        linked_history_ids.add(history.pk)
         index.add(
             _Target(history, set(hash_urls), set(title_bow), is_new=True)
         )
@@ -369,6 +483,8 @@ def run_reconcile(
         if on_source_done is not None:
             on_source_done(source, "spawned", history)
 
+    refresh_reconcile_signals(linked_history_ids)
+
     stats = [totals.as_stats() for totals in totals_by_type.values()]
     summary = ", ".join(
         f"{item.source_type}={item.attached}+{item.spawned}/{item.processed}"
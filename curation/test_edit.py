@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 from io import StringIO
 from unittest import mock
 
@@ -16,8 +19,14 @@ from games.models import (
     PersonalityAlias,
 )
 
-from . import edit
+from . import edit, edit_benchmark
 from .edit import Approval, GameEditPass, run_edit
+from .edit_benchmark import (
+    EditBenchmark,
+    PassTiming,
+    compare_benchmarks,
+    run_edit_benchmark,
+)
 from .gameinfo import Person, Tag
 from .manual import store_manual_edit
 from .models import (
@@ -544,6 +553,99 @@ class RunEditTests(TestCase):
         self.assertEqual(observer.seen, Person(alias.id, ""))
 
 
+class EditBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initifdb", stdout=StringIO(), stderr=StringIO())
+
+    def _run(self, passes, specs, **kwargs):
+        pipeline = EditPipeline.objects.create(name="Bench", passes=specs)
+        with mock.patch.object(
+            edit_benchmark, "PASS_REGISTRY", {p.name: p for p in passes}
+        ):
+            return run_edit_benchmark(pipeline_id=pipeline.pk, **kwargs)
+
+    def test_dry_run_writes_nothing_and_times_each_pass(self):
+        histories = [
+            GameHistory.objects.create(
+                game=Game.objects.create(title="Game", creation_time=now()),
+                state=GameHistory.State.SETTLED,
+                creation_time=now(),
+            )
+            for _ in range(3)
+        ]
+
+        result = self._run(
+            [_TagAndApprove(Approval.APPLIED), _Note()],
+            ["tag_and_approve", "note"],
+        )
+
+        self.assertEqual((result.histories, result.changed), (3, 3))
+        self.assertEqual(list(result.passes), ["0:tag_and_approve", "1:note"])
+        tag_pass = result.passes["0:tag_and_approve"]
+        self.assertEqual((tag_pass.runs, tag_pass.noops), (3, 0))
+        self.assertGreater(tag_pass.queries, 0)
+        self.assertEqual(result.passes["1:note"].noop_rate, 1.0)
+        self.assertFalse(GameEdit.objects.exists())
+        for history in histories:
+            history.refresh_from_db()
+            self.assertEqual(history.state, GameHistory.State.SETTLED)
+            self.assertFalse(history.game.tags.exists())
+
+    def test_failures_are_counted_and_skipped_passes_left_out(self):
+        GameHistory.objects.create(
+            game=None, state=GameHistory.State.SETTLED, creation_time=now()
+        )
+
+        result = self._run(
+            [_Fail(), _Note()], ["note", "fail"], skip_passes=["note"]
+        )
+
+        self.assertEqual(result.errors, 1)
+        self.assertEqual(list(result.passes), ["1:fail"])
+        self.assertEqual(result.passes["1:fail"].errors, 1)
+
+    def test_unregistered_passes_are_skipped(self):
+        GameHistory.objects.create(
+            game=Game.objects.create(title="Game", creation_time=now()),
+            state=GameHistory.State.SETTLED,
+            creation_time=now(),
+        )
+
+        result = self._run([_Note()], ["retired_pass", "note"])
+
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(list(result.passes), ["1:note"])
+        self.assertEqual(result.passes["1:note"].runs, 1)
+
+    def test_compare_with_saved_baseline(self):
+        baseline = EditBenchmark(
+            histories=2,
+            passes={"0:a": PassTiming(runs=2, seconds=0.002, queries=2)},
+        )
+        path = os.path.join(tempfile.mkdtemp(), "baseline.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        baseline.save(path)
+        result = EditBenchmark(
+            histories=2,
+            passes={
+                "0:a": PassTiming(runs=2, seconds=0.004, queries=4),
+                "1:b": PassTiming(runs=2),
+            },
+        )
+
+        lines = compare_benchmarks(result, EditBenchmark.load(path))
+
+        self.assertEqual(
+            lines,
+            [
+                "! 0:a: 1.0 -> 2.0 ms/run (x2.00), 1.0 -> 2.0 queries/run, "
+                "0% -> 0% no-op",
+                "  1:b: only in this run",
+            ],
+        )
+
+
 class ManualEditTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -137,3 +137,53 @@ class SandboxTests(TestCase):
         )
         with self.assertRaises(NameError):
             _enrich(GameInfo())
+
+
+class CompiledRulesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initenrichment", stdout=StringIO())
+        cat = GameTagCategory.objects.create(symbolic_id="tag", name="Tag")
+        cls.db_tag = GameTag.objects.create(category=cat, name="Detective")
+
+    def _info(self):
+        return GameInfo(
+            tags=[
+                Tag("platform", None, None, "Inform 7"),
+                Tag("tag", None, self.db_tag.id, None),
+            ]
+        )
+
+    def test_rules_are_loaded_once_per_run(self):
+        enrich = EnrichmentPass()
+        with enrich.run():
+            # Only the resolved tag names are looked up, once per game.
+            with self.assertNumQueries(3):
+                for _ in range(3):
+                    enrich.apply(SimpleNamespace(current=self._info()), {})
+
+    def test_nested_runs_keep_their_own_rules(self):
+        enrich = EnrichmentPass()
+        with enrich.run():
+            with enrich.run():
+                pass
+            # The outer run still has its rules loaded.
+            with self.assertNumQueries(1):
+                enrich.apply(SimpleNamespace(current=self._info()), {})
+        # Outside of a run, rules are loaded again.
+        with self.assertNumQueries(3):
+            enrich.apply(SimpleNamespace(current=self._info()), {})
+
+    def test_rule_sees_tags_added_by_earlier_rules(self):
+        EnrichmentRule.objects.create(
+            order=100, condition="has_tag('', 'os_web')", action="add_tag('x')"
+        )
+        EnrichmentRule.objects.create(
+            order=101,
+            condition="has_tag('tag', 'detect')",
+            action="add_tag('y')",
+        )
+
+        info = _enrich(self._info())
+
+        self.assertLessEqual({"os_web", "x", "y"}, _slugs(info))
@@ -1,8 +1,11 @@
 import datetime
 from io import StringIO
+from unittest.mock import patch
 
 from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from games.models import (
@@ -576,3 +579,63 @@ class SaveTest(GameInfoTestBase):
         )
         self.assertIn("os_linux", slugs)
         self.assertNotIn("os_win", slugs)
+
+    def _wide_info(self, n):
+        return GameInfo(
+            name="Wide",
+            personalities={
+                "author": [Person(None, f"Author {i}") for i in range(n)]
+                + [Person(None, "Author 0")],
+            },
+            tags=[Tag("tag", None, None, f"wide tag {i}") for i in range(n)],
+            urls=[
+                GameUrl("download_direct", None, f"#{i}", f"http://w/{i}")
+                for i in range(n)
+            ],
+            attributions=[Attribution(None, f"site{i}") for i in range(n)],
+        )
+
+    def _count_queries(self, info, game=None):
+        with CaptureQueriesContext(connection) as queries:
+            with patch("games.tools.clone_files.delay") as delay:
+                with self.captureOnCommitCallbacks(execute=True):
+                    game, _ = info.save(game)
+        return game, len(queries), delay
+
+    def test_bulk_save_uses_fixed_number_of_queries(self):
+        _, small, _ = self._count_queries(self._wide_info(2))
+        game, large, delay = self._count_queries(self._wide_info(30))
+
+        self.assertEqual(small, large)
+        self.assertEqual(game.gameurl_set.count(), 30)
+        self.assertEqual(game.gameauthor_set.count(), 30)
+        self.assertEqual(
+            PersonalityAlias.objects.filter(name="Author 0").count(), 1
+        )
+        delay.assert_called_once()
+        (url_ids,) = delay.call_args.args
+        # The first two urls were already queued by the smaller save.
+        self.assertEqual(
+            sorted(url_ids),
+            sorted(
+                URL.objects.filter(
+                    original_url__in=[f"http://w/{i}" for i in range(2, 30)]
+                ).values_list("id", flat=True)
+            ),
+        )
+
+    def test_bulk_resave_updates_in_place(self):
+        game, canonical = self._wide_info(5).save()
+        info = parse(canonical)
+        info.urls[0].description = "changed"
+        del info.urls[1]
+        info.personalities["author"].pop()
+
+        _, _, delay = self._count_queries(info, game)
+
+        delay.assert_not_called()
+        self.assertEqual(
+            sorted(game.gameurl_set.values_list("description", flat=True)),
+            ["#2", "#3", "#4", "changed"],
+        )
+        self.assertEqual(game.gameauthor_set.count(), 4)
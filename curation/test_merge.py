@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from contest.models import GameList, GameListEntry
+from games.models import (
+    URL,
+    Game,
+    GameAuthor,
+    GameAuthorRole,
+    GameTag,
+    GameTagCategory,
+    GameURL,
+    GameURLCategory,
+    GameVote,
+    Personality,
+    PersonalityAlias,
+)
+
+from .merge import contest_related_usages, merge_games_into_history
+from .models import GameHistory, GameHistoryAuditLog, GameSource
+
+
+class MergeGamesTests(TestCase):
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create(
+                username=f"user{i}", email=f"user{i}@example.com"
+            )
+            for i in range(3)
+        ]
+        self.category = GameURLCategory.objects.create(
+            symbolic_id="game_page", title="Game page"
+        )
+        self.role = GameAuthorRole.objects.create(
+            symbolic_id="author", title="Author"
+        )
+        self.tag = GameTag.objects.create(
+            category=GameTagCategory.objects.create(name="Genre"),
+            name="Adventure",
+        )
+        self.url = URL.objects.create(
+            original_url="http://example.com/game", creation_date=now()
+        )
+        self.personality = Personality.objects.create(name="Author")
+
+    def _history(self, title):
+        game = Game.objects.create(title=title, creation_time=now())
+        return GameHistory.objects.create(game=game, creation_time=now())
+
+    def _populate(self, game, voters):
+        game.tags.add(self.tag)
+        GameURL.objects.create(game=game, url=self.url, category=self.category)
+        GameAuthor.objects.create(
+            game=game,
+            role=self.role,
+            author=PersonalityAlias.objects.create(
+                personality=self.personality, name=f"Alias {game.pk}"
+            ),
+        )
+        for user in voters:
+            GameVote.objects.create(
+                game=game, user=user, creation_time=now(), star_rating=5
+            )
+
+    def _merge(self, target, games):
+        merge_games_into_history(
+            target_history=target,
+            source_games=games,
+            actor=self.users[0],
+            remap_contests=True,
+        )
+
+    def test_merges_cluster_and_drops_duplicates(self):
+        target = self._history("Target")
+        sources = [self._history(f"Source {i}") for i in range(2)]
+        self._populate(target.game, self.users[:1])
+        self._populate(sources[0].game, self.users[:2])
+        self._populate(sources[1].game, self.users[1:])
+        GameSource.objects.create(
+            history=sources[1], type=GameSource.SourceType.IFWIKI
+        )
+        source_game_ids = [h.game_id for h in sources]
+
+        self._merge(target, [h.game for h in sources])
+
+        game = target.game
+        self.assertFalse(Game.objects.filter(pk__in=source_game_ids).exists())
+        self.assertEqual(list(game.tags.all()), [self.tag])
+        self.assertEqual(game.gameurl_set.count(), 1)
+        self.assertEqual(game.gameauthor_set.count(), 1)
+        self.assertEqual(
+            sorted(game.gamevote_set.values_list("user", flat=True)),
+            [u.pk for u in self.users],
+        )
+        self.assertEqual(target.gamesource_set.count(), 1)
+        for history in sources:
+            history.refresh_from_db()
+            self.assertEqual(history.state, GameHistory.State.ABANDONED)
+        self.assertEqual(
+            sorted(
+                GameHistoryAuditLog.objects.filter(
+                    history=target,
+                    kind=GameHistoryAuditLog.AuditKind.GAME_MERGED,
+                ).values_list("old_id", flat=True)
+            ),
+            source_game_ids,
+        )
+
+    def test_query_count_does_not_depend_on_row_count(self):
+        def merge_queries(votes):
+            target = self._history("Target")
+            source = self._history("Source")
+            users = [
+                get_user_model().objects.create(
+                    username=f"voter{source.pk}-{i}",
+                    email=f"voter{source.pk}-{i}@example.com",
+                )
+                for i in range(votes)
+            ]
+            self._populate(source.game, users)
+            with CaptureQueriesContext(connection) as queries:
+                self._merge(target, [source.game])
+            return len(queries)
+
+        self.assertEqual(merge_queries(1), merge_queries(10))
+
+    def test_contest_usage_is_counted_per_game(self):
+        target = self._history("Target")
+        used = self._history("Used")
+        gamelist = GameList.objects.create(title="Contest games")
+        GameListEntry.objects.create(gamelist=gamelist, game=used.game)
+
+        with self.assertNumQueries(1):
+            usages = contest_related_usages([target.game_id, used.game_id])
+
+        self.assertEqual(usages[target.game_id], [])
+        self.assertEqual(
+            [(u.model, u.count) for u in usages[used.game_id]],
+            [(GameListEntry, 1)],
+        )
+
+    def test_refuses_merging_game_into_itself(self):
+        target = self._history("Target")
+
+        with self.assertRaises(ValueError):
+            self._merge(target, [target.game])
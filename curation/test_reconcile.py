@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.utils import timezone
 from django.utils.timezone import now
@@ -10,9 +12,10 @@ from .models import (
     GameHistoryAuditLog,
     GameSource,
     GameSourceFetch,
+    ReconcileSignal,
 )
 from .providers import PROVIDER_BY_TYPE
-from .reconcile import run_reconcile
+from .reconcile import _compute_signals, run_reconcile
 
 
 def _provider_type():
@@ -366,3 +369,53 @@ class RunReconcileTests(TestCase):
         self.assertEqual(stats[0].processed, 0)
         history.refresh_from_db()
         self.assertEqual(history.state, GameHistory.State.SETTLED)
+
+    def test_signals_are_stored_and_reused_across_runs(self):
+        history = self._existing("Stored Game", url="http://ifwiki.ru/Stored")
+
+        run_reconcile()
+
+        signal = ReconcileSignal.objects.get(history=history)
+        self.assertEqual(signal.title_bow, ["game", "stored"])
+        self.assertEqual(len(signal.hash_urls), 1)
+        with patch(
+            "curation.reconcile._compute_signals", wraps=_compute_signals
+        ) as compute:
+            run_reconcile()
+        compute.assert_not_called()
+
+    def test_stale_signals_are_recomputed_after_game_edit(self):
+        history = self._existing("Old Title")
+        run_reconcile()
+        game = history.game
+        game.title = "Bright Banshee Castle"
+        game.save(update_fields=["title"])
+        Game.BumpRevision(game.id)
+        source = self._orphan(
+            "http://apero.ru/renamed", self._canon("Bright Banshee Castle")
+        )
+
+        stats = run_reconcile()
+
+        self.assertEqual(stats[0].attached, 1)
+        source.refresh_from_db()
+        self.assertEqual(source.history_id, history.pk)
+
+    def test_spawned_history_signals_union_its_sources(self):
+        shared = ("game_page", "http://newsite.ru/g")
+        a = self._orphan(
+            "http://apero.ru/a", self._canon("Common Game", [shared])
+        )
+        run_reconcile()
+        a.refresh_from_db()
+        b = self._orphan(
+            "http://apero.ru/b",
+            self._canon("Common Game", [("game_page", "http://other.ru/g")]),
+        )
+        run_reconcile()
+        b.refresh_from_db()
+        self.assertEqual(b.history_id, a.history_id)
+
+        signal = ReconcileSignal.objects.get(history=a.history_id)
+        self.assertEqual(len(signal.hash_urls), 4)
+        self.assertEqual(signal.title_bow, ["common", "game"])
@@ -7,8 +7,11 @@ from unittest.mock import patch
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.cache import caches
 from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django_celery_beat.models import IntervalSchedule, PeriodicTask
 
@@ -34,6 +37,7 @@ from games.models import (
 
 from .edit import run_edit
 from .gameinfo import GameInfo, GameUrl
+from .manual_reconcile import choices_payload
 from .models import (
     EditPipeline,
     GameEdit,
@@ -802,6 +806,54 @@ class HistoryReconcileViewTest(TestCase):
         self.assertContains(response, "reconcile.js")
         self.assertContains(response, "reconcile-data")
 
+    def test_reconcile_page_loads_cluster_in_fixed_queries(self):
+        history = self._history()
+        self._metadata(history.game)
+        tag = GameTag.objects.get()
+
+        def page_queries(count):
+            ids = []
+            for i in range(count):
+                other = self._history(f"Other {i}")
+                other.game.tags.add(tag)
+                self._source(other, f"https://example.com/{other.pk}")
+                ids.append(str(other.game_id))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    f"/curation/{history.pk}/reconcile/",
+                    {"games": ",".join(ids)},
+                )
+            return len(queries), response.context["payload"]["columns"]
+
+        self.client.get(f"/curation/{history.pk}/reconcile/")
+        small, _ = page_queries(1)
+        large, columns = page_queries(4)
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(columns), 5)
+        self.assertEqual(
+            columns[0],
+            self._column(history, client_id=columns[0]["client_id"]),
+        )
+        self.assertEqual(columns[-1]["title"], "Other 3")
+        self.assertEqual(columns[-1]["tags"], [[tag.category_id, tag.id]])
+        self.assertEqual(len(columns[-1]["sources"]), 1)
+
+    def test_reconcile_choices_are_cached_until_dictionaries_change(self):
+        caches["default"].clear()
+        alias = PersonalityAlias.objects.create(name="Old name")
+        choices_payload()
+
+        # Only the fingerprint of the cached editor dictionaries.
+        with self.assertNumQueries(2):
+            choices_payload()
+
+        alias.name = "New name"
+        alias.save()
+        PersonalityAlias.objects.bulk_create([PersonalityAlias(name="Bulk")])
+        names = [a["name"] for a in choices_payload()["authors"]["authors"]]
+        self.assertEqual(names, ["Bulk", "New name"])
+
     def test_reconcile_moves_source_to_new_game_and_copies_metadata(self):
         history = self._history()
         self._metadata(history.game)
@@ -1784,6 +1836,16 @@ class TasksViewTest(TestCase):
         self.assertRedirects(response, "/curation/tasks/")
         delay.assert_called_once_with()
 
+    @patch("curation.views.check_links.delay")
+    def test_check_links_button_starts_task_with_run_limit(self, delay):
+        response = self.client.post(
+            "/curation/tasks/",
+            {"action": "run_check_links", "run_limit": "50"},
+        )
+
+        self.assertRedirects(response, "/curation/tasks/")
+        delay.assert_called_once_with(limit=50)
+
     @patch("curation.views.edit_sources.delay")
     def test_edit_sources_button_starts_task_with_pipeline_and_limit(
         self, delay
@@ -20,7 +20,12 @@ from django.db.models import (
     When,
 )
 from django.db.models.functions import Coalesce, TruncMonth
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.timezone import now
@@ -28,13 +33,14 @@ from django_celery_beat.models import IntervalSchedule, PeriodicTask
 
 from core.tasks import fetch_feeds
 from games.importer.discord import PostNewGameToDiscord
-from games.models import Game
+from games.models import URL, Game
+from games.tasks import check_links
 
 from . import openrouter
 from .diff import build_diff
 from .gameinfo import GameInfo, parse
 from .manual_reconcile import (
-    column_for_game,
+    columns_for_games,
     initial_payload,
     save_reconcile_payload,
 )
@@ -52,6 +58,7 @@ from .models import (
     SourceDiscoveryStatus,
 )
 from .providers import REGISTERED_PROVIDERS
+from .reconcile import refresh_reconcile_signals
 from .tasks import (
     discover_sources,
     edit_sources,
@@ -71,6 +78,8 @@ FETCH_FEEDS_TASK_NAME = "Fetch feeds"
 FETCH_FEEDS_TASK = "core.tasks.fetch_feeds"
 EDIT_SOURCES_TASK_NAME = "Edit sources"
 EDIT_SOURCES_TASK = "curation.tasks.edit_sources"
+CHECK_LINKS_TASK_NAME = "Check links"
+CHECK_LINKS_TASK = "games.tasks.check_links"
 INTERVAL_PERIODS = [
     (IntervalSchedule.MINUTES, "минут"),
     (IntervalSchedule.HOURS, "часов"),
@@ -264,6 +273,10 @@ def _tasks_post(request):
         pipeline = _pipeline_from_post(request.POST)
         edit_sources.delay(limit=limit, pipeline_id=pipeline.pk)
         messages.success(request, "Задание на обработку очереди запущено.")
+    elif action == "run_check_links":
+        limit = _positive_int(request.POST.get("run_limit"), default=2000)
+        check_links.delay(limit=limit)
+        messages.success(request, "Задание на проверку ссылок запущено.")
     elif action == "save_fetch_sources":
         limit = _positive_int(request.POST.get("periodic_limit"), default=5)
         _save_periodic_task(
@@ -316,6 +329,15 @@ def _tasks_post(request):
             kwargs={"limit": limit, "pipeline_id": pipeline.pk},
         )
         messages.success(request, "Расписание обработки очереди сохранено.")
+    elif action == "save_check_links":
+        limit = _positive_int(request.POST.get("periodic_limit"), default=2000)
+        _save_periodic_task(
+            CHECK_LINKS_TASK_NAME,
+            CHECK_LINKS_TASK,
+            request.POST,
+            kwargs={"limit": limit},
+        )
+        messages.success(request, "Расписание проверки ссылок сохранено.")
     else:
         return HttpResponseBadRequest("Unknown action.")
     return redirect("curation_tasks")
@@ -376,6 +398,17 @@ def _render_tasks(request):
                 default_periodic_limit=5,
                 default_run_limit=5,
             ),
+            "check_links": _periodic_task_config(
+                CHECK_LINKS_TASK_NAME,
+                default_every=1,
+                default_period=IntervalSchedule.HOURS,
+                default_periodic_limit=2000,
+                default_run_limit=2000,
+            ),
+            "broken_links": URL.objects
+            .filter(is_broken=True, gameurl__isnull=False)
+            .distinct()
+            .count(),
             "edit_pipelines": EditPipeline.objects.order_by("id"),
         },
     )
@@ -465,6 +498,12 @@ def _positive_int(value, *, default):
     return parsed if parsed > 0 else default
 
 
+def _game_ids(value):
+    """Game ids of a comma-separated query parameter, junk skipped."""
+    ids = (_positive_int(x, default=None) for x in (value or "").split(","))
+    return [x for x in ids if x is not None]
+
+
 def llm_trajectories(request):
     aggregates = {
         "count": Count("id"),
@@ -1329,6 +1368,7 @@ def _accept_edit(edit, history, before, user):
     if created_game:
         fields.append("game")
     history.save(update_fields=fields)
+    refresh_reconcile_signals([history.pk])
     if created_game:
         PostNewGameToDiscord(game.id)
 
@@ -1445,11 +1485,15 @@ def history_reconcile(request, history_id):
         "curation/history_reconcile.html",
         {
             "history": history,
-            "payload": initial_payload(history),
+            "payload": initial_payload(
+                history, _game_ids(request.GET.get("games"))
+            ),
         },
     )
 
 
 def reconcile_game_json(request, game_id):
-    game = get_object_or_404(Game, pk=game_id)
-    return JsonResponse(column_for_game(game))
+    columns = columns_for_games([game_id])
+    if not columns:
+        raise Http404("Game not found.")
+    return JsonResponse(columns[0])
@@ -6,9 +6,10 @@ import {UrlList} from './editor/urlList';
 import {Attributions} from './editor/attributions';
 import {getCookie, getJSON} from './editor/util';
 import type {
+  EditorDictionaries,
   GameInfo,
   GameData,
-  ImportResult,
+  ImportJob,
   AuthorTypes,
   TagTypes,
   Pair,
@@ -22,6 +23,11 @@ let tags: PairSelector;
 let links: UrlList;
 let attributions: Attributions;
 
+// Imports run in the background; this is how often the job is polled, and
+// how long to keep polling before giving up on it.
+const IMPORT_POLL_MS = 1000;
+const IMPORT_TIMEOUT_MS = 15 * 60 * 1000;
+
 function buildAuthors(data: AuthorTypes): PairSelector {
   const idToCat: Record<number, string> = {};
   const idToVal: Record<number, string> = {};
@@ -137,14 +143,35 @@ async function importGame(): Promise<void> {
     return;
   }
   warning.style.display = 'none';
-  const data = await getJSON<ImportResult>('/json/import/', {url});
-  if (data.error) {
-    warning.style.display = '';
-    warning.textContent = data.error;
-    return;
+  const button = $<HTMLButtonElement>('#import_button');
+  const importLabel = button.textContent;
+  button.disabled = true;
+  try {
+    let job = await getJSON<ImportJob>('/json/import/', {url});
+    const deadline = Date.now() + IMPORT_TIMEOUT_MS;
+    while (job.state === 'PENDING' || job.state === 'RUNNING') {
+      if (Date.now() > deadline) {
+        warning.style.display = '';
+        warning.textContent = 'Импорт занимает слишком долго.';
+        return;
+      }
+      const done = job.urls_checked ?? 0;
+      const total = done + (job.urls_pending ?? 0);
+      button.textContent = `Импорт… (${done}/${total})`;
+      await new Promise(resolve => setTimeout(resolve, IMPORT_POLL_MS));
+      job = await getJSON<ImportJob>(`/json/import/${job.job_id}/`);
+    }
+    if (job.error || !job.result) {
+      warning.style.display = '';
+      warning.textContent = job.error ?? 'Не удалось импортировать игру.';
+      return;
+    }
+    updateFields(job.result);
+    $<HTMLInputElement>('#import_url').value = '';
+  } finally {
+    button.disabled = false;
+    button.textContent = importLabel;
   }
-  updateFields(data);
-  $<HTMLInputElement>('#import_url').value = '';
 }
 
 async function init(): Promise<void> {
@@ -158,11 +185,17 @@ async function init(): Promise<void> {
   $('#import_button').addEventListener('click', importGame);
   $('#submit').addEventListener('click', submit);
 
-  const params = gameId() ? {game_id: gameId()} : undefined;
+  const params: Record<string, string> = {dictionaries: '0'};
+  if (gameId()) params.game_id = gameId();
   const data = await getJSON<GameInfo>('/json/gameinfo/', params);
-  authors = buildAuthors(data.authortypes);
-  tags = buildTags(data.tagtypes);
-  links = new UrlList($('#links'), data.linktypes.categories);
+  // Versioned, so the browser serves it from cache until choices change.
+  const dicts = await getJSON<EditorDictionaries>(
+    '/json/editor-dictionaries/',
+    {v: data.dictionaries_version},
+  );
+  authors = buildAuthors(dicts.authortypes);
+  tags = buildTags(dicts.tagtypes);
+  links = new UrlList($('#links'), dicts.linktypes.categories);
   if (data.gamedata) updateFields(data.gamedata);
 }
 
@@ -39,12 +39,28 @@ export interface GameData {
   links?: Link[];
 }
 
-export interface GameInfo {
+// Author/tag/link choices, served by /json/editor-dictionaries/?v=<version>.
+export interface EditorDictionaries {
+  version: string;
   authortypes: AuthorTypes;
   tagtypes: TagTypes;
   linktypes: LinkTypes;
+}
+
+// /json/gameinfo/?dictionaries=0 only names the dictionaries version.
+export interface GameInfo {
+  dictionaries_version: string;
   gamedata?: GameData;
 }
 
-// /json/import/ returns either GameData fields or an error.
-export type ImportResult = GameData & {error?: string};
+// /json/import/ starts a background import, /json/import/<job_id>/ reports
+// on it. `partial` holds what has been gathered so far while the job runs.
+export interface ImportJob {
+  job_id?: number;
+  state?: 'PENDING' | 'RUNNING' | 'DONE' | 'FAILED';
+  urls_checked?: number;
+  urls_pending?: number;
+  partial?: GameData;
+  result?: GameData;
+  error?: string;
+}
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_delete
 
 
 class GamesConfig(AppConfig):
     name = "games"
+
+    def ready(self):
+        from .dictionaries import (
+            EDITOR_DICTIONARIES_MODELS,
+            InvalidateEditorDictionaries,
+        )
+        from .game_details import DETAILS_DEPENDENCIES, BumpDependentGames
+
+        for model in DETAILS_DEPENDENCIES:
+            post_save.connect(BumpDependentGames, sender=model)
+            pre_delete.connect(BumpDependentGames, sender=model)
+        for model in EDITOR_DICTIONARIES_MODELS:
+            post_save.connect(InvalidateEditorDictionaries, sender=model)
+            post_delete.connect(InvalidateEditorDictionaries, sender=model)
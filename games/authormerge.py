@@ -0,0 +1,259 @@
+"""Bulk personality merges and alias moves.
+
+An AuthorMergePlan collects what should happen to personalities and their
+aliases: whole personalities merged into others, aliases renamed, split off
+to another or a fresh personality, folded into another alias or deleted, and
+alias names redirected for future imports. DescribeAuthorMerges() previews a
+plan with a couple of lookups, ApplyAuthorMerges() executes it with a fixed
+number of set-based statements, however many authors it touches. The
+moderator author actions build single-author plans, the mergeauthors command
+applies a batch of personality merges at once.
+"""
+
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+
+from .authorstats import RefreshingAuthorStats
+from .dictionaries import InvalidateEditorDictionaries
+from .models import (
+    Game,
+    GameAuthor,
+    Personality,
+    PersonalityAlias,
+    PersonalityAliasRedirect,
+    PersonalityUrl,
+)
+
+# AuthorMergePlan.reassign target that asks for a new personality page.
+NEW_PERSONALITY = 0
+
+
+@dataclass
+class AuthorMergePlan:
+    # personality id -> id of the personality it is merged into.
+    personalities: dict[int, int] = field(default_factory=dict)
+    # alias id -> new alias name.
+    renames: dict[int, str] = field(default_factory=dict)
+    # alias id -> id of its new personality, or NEW_PERSONALITY.
+    reassign: dict[int, int] = field(default_factory=dict)
+    # alias id -> id of the alias that takes over its credits. The alias
+    # itself is deleted.
+    moves: dict[int, int] = field(default_factory=dict)
+    # alias ids deleted together with their credits.
+    deletes: set[int] = field(default_factory=set)
+    # alias name -> alias id to redirect it to, or None to drop it.
+    redirects: dict[str, int | None] = field(default_factory=dict)
+
+
+def _Resolve(mapping, key):
+    """Follows merge chains (a -> b -> c) to their final target."""
+    seen = {key}
+    while key in mapping:
+        key = mapping[key]
+        if key in seen:
+            raise ValueError("Циклическое объединение: #%d" % key)
+        seen.add(key)
+    return key
+
+
+def _Remap(field_name, mapping):
+    return Case(*[
+        When(**{field_name: k}, then=Value(v)) for k, v in mapping.items()
+    ])
+
+
+def _AliasIds(plan):
+    return (
+        set(plan.renames)
+        | set(plan.reassign)
+        | set(plan.moves)
+        | set(plan.moves.values())
+        | plan.deletes
+    )
+
+
+def DescribeAuthorMerges(plan):
+    """Human-readable list of what ApplyAuthorMerges(plan) would do."""
+    aliases = PersonalityAlias.objects.in_bulk(_AliasIds(plan))
+    personalities = Personality.objects.in_bulk(
+        set(plan.personalities)
+        | set(plan.personalities.values())
+        | set(plan.reassign.values()) - {NEW_PERSONALITY}
+    )
+
+    def Name(objs, id):
+        return objs[id].name if id in objs else "#%d" % id
+
+    log = []
+    for src, dst in plan.personalities.items():
+        log.append(
+            "Автор [%s] будет объединён с [%s]"
+            % (
+                Name(personalities, src),
+                Name(personalities, _Resolve(plan.personalities, dst)),
+            )
+        )
+    redirects = dict(plan.redirects)
+    changed = set(plan.renames) | set(plan.reassign) | set(plan.moves)
+    for id in sorted(changed | plan.deletes):
+        name = Name(aliases, id)
+        if id in plan.renames:
+            log.append(
+                "[%s] будет переименован в [%s]" % (name, plan.renames[id])
+            )
+        if id in plan.reassign:
+            if plan.reassign[id] == NEW_PERSONALITY:
+                log.append(
+                    "Для псведонима [%s] будет создана новая "
+                    "свежая страница автора." % name
+                )
+            else:
+                log.append(
+                    "[%s] будет присоединён к автору [%s]"
+                    % (name, Name(personalities, plan.reassign[id]))
+                )
+        if id in plan.moves:
+            log.append(
+                "Псевдоним [%s] подмешается в [%s]"
+                % (name, Name(aliases, _Resolve(plan.moves, id)))
+            )
+        elif id in plan.deletes:
+            log.append("Псевдоним [%s] будет удалён" % name)
+        else:
+            continue
+        if redirects.pop(plan.renames.get(id, name), False) is not False:
+            log.append(
+                "(и это будет автоматически происходить с"
+                " этим псевдонимом в будущем)"
+            )
+    for name, id in redirects.items():
+        if id is None:
+            log.append("Псевдоним [%s] будет удаляться при импорте" % name)
+        else:
+            log.append(
+                "Псевдоним [%s] будет подмешиваться в [%s] при импорте"
+                % (name, Name(aliases, _Resolve(plan.moves, id)))
+            )
+    return log
+
+
+def _AffectedGameIds(plan):
+    personality_ids = set(plan.personalities) | set(
+        plan.personalities.values()
+    )
+    return set(
+        GameAuthor.objects.filter(
+            Q(author__in=_AliasIds(plan))
+            | Q(author__personality__in=personality_ids)
+        ).values_list("game_id", flat=True)
+    )
+
+
+def _MergedBio(*bios):
+    return "\n\n".join(x for x in bios if x)
+
+
+def _MergePersonalities(plan):
+    targets = {
+        src: _Resolve(plan.personalities, src) for src in plan.personalities
+    }
+    persons = Personality.objects.in_bulk(set(targets) | set(targets.values()))
+    merged = {}
+    for src, dst in targets.items():
+        if src in persons and dst in persons:
+            merged.setdefault(dst, [persons[dst].bio]).append(persons[src].bio)
+    updated = []
+    for dst, bios in merged.items():
+        bio = _MergedBio(*bios)
+        if bio != (persons[dst].bio or ""):
+            persons[dst].bio = bio
+            updated.append(persons[dst])
+    Personality.objects.bulk_update(updated, ["bio"])
+    for model in [PersonalityAlias, PersonalityUrl]:
+        model.objects.filter(personality__in=targets).update(
+            personality=_Remap("personality", targets)
+        )
+    Personality.objects.filter(pk__in=targets).delete()
+
+
+def _ReassignAliases(plan):
+    reassign = dict(plan.reassign)
+    if fresh := sorted(k for k, v in reassign.items() if v == NEW_PERSONALITY):
+        first = PersonalityAlias.objects.get(pk=fresh[0])
+        new_pers = Personality.objects.create(
+            name=plan.renames.get(first.id, first.name)
+        )
+        for id in fresh:
+            reassign[id] = new_pers.id
+    PersonalityAlias.objects.filter(pk__in=reassign).update(
+        personality=_Remap("pk", reassign)
+    )
+
+
+def _DropDuplicateCredits(game_ids):
+    """Keeps one credit per game, role and person."""
+    earlier = GameAuthor.objects.filter(
+        game=OuterRef("game"), role=OuterRef("role"), pk__lt=OuterRef("pk")
+    )
+    GameAuthor.objects.filter(game__in=game_ids).filter(
+        Exists(earlier.filter(author=OuterRef("author")))
+        | Exists(
+            earlier.filter(
+                author__personality__isnull=False,
+                author__personality=OuterRef("author__personality"),
+            )
+        )
+    ).delete()
+
+
+def ApplyAuthorMerges(plan):
+    game_ids = _AffectedGameIds(plan)
+    personality_ids = {
+        v for v in plan.reassign.values() if v != NEW_PERSONALITY
+    } | set(plan.personalities.values())
+    with (
+        transaction.atomic(),
+        RefreshingAuthorStats(*game_ids, personality_ids=personality_ids),
+    ):
+        if plan.renames:
+            aliases = PersonalityAlias.objects.in_bulk(plan.renames)
+            for id, alias in aliases.items():
+                alias.name = plan.renames[id]
+            PersonalityAlias.objects.bulk_update(aliases.values(), ["name"])
+        if plan.reassign:
+            _ReassignAliases(plan)
+        if plan.personalities:
+            _MergePersonalities(plan)
+        if plan.moves:
+            moves = {src: _Resolve(plan.moves, src) for src in plan.moves}
+            GameAuthor.objects.filter(author__in=moves).update(
+                author=_Remap("author", moves)
+            )
+            PersonalityAlias.objects.filter(pk__in=moves).delete()
+        if deletes := plan.deletes - set(plan.moves):
+            PersonalityAlias.objects.filter(pk__in=deletes).delete()
+        if plan.redirects:
+            PersonalityAliasRedirect.objects.bulk_create(
+                [
+                    PersonalityAliasRedirect(
+                        name=name,
+                        hidden_for_id=(
+                            _Resolve(plan.moves, id)
+                            if id is not None
+                            else None
+                        ),
+                    )
+                    for name, id in plan.redirects.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=["hidden_for"],
+            )
+        _DropDuplicateCredits(game_ids)
+        Game.BumpRevision(*game_ids)
+    if plan.renames:
+        # Renames are bulk updates, which skip the signals that refresh the
+        # editor dictionaries and the reconcile choices built from them.
+        InvalidateEditorDictionaries()
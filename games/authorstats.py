@@ -0,0 +1,116 @@
+"""Materialized author statistics.
+
+PersonalityStats rows hold what author pages and author sorting need (game
+counts per role, honor, release span, vote count), so that those become
+plain indexed reads instead of scans over all votes. Code that changes
+votes or game credits wraps the change into RefreshingAuthorStats, which
+recomputes the rows of everyone credited on the touched games before or
+after the change.
+"""
+
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from .models import GameAuthor, GameVote, Personality, PersonalityStats
+from .tools import HonorFromGameVotes
+
+REBUILD_BATCH_SIZE = 500
+
+AuthorStatsModels = namedtuple(
+    "AuthorStatsModels", "Personality GameAuthor GameVote PersonalityStats"
+)
+# Migrations pass their historical models instead.
+MODELS = AuthorStatsModels(Personality, GameAuthor, GameVote, PersonalityStats)
+
+
+def BuildAuthorStats(personality_ids, models=MODELS):
+    """Unsaved PersonalityStats rows of the given personalities."""
+    stats = {
+        pid: models.PersonalityStats(personality_id=pid, role_counts={})
+        for pid in personality_ids
+    }
+
+    credits = models.GameAuthor.objects.filter(
+        author__personality__in=personality_ids
+    )
+    for x in (
+        credits
+        .values("author__personality", "role__symbolic_id")
+        .annotate(games=Count("game", distinct=True))
+        .order_by()
+    ):
+        row = stats[x["author__personality"]]
+        row.role_counts[x["role__symbolic_id"] or ""] = x["games"]
+    for x in (
+        credits
+        .filter(role__symbolic_id="author")
+        .values("author__personality")
+        .annotate(
+            first=Min("game__release_date"), last=Max("game__release_date")
+        )
+        .order_by()
+    ):
+        row = stats[x["author__personality"]]
+        row.first_release = x["first"]
+        row.last_release = x["last"]
+
+    # Same rows as ComputeHonors() walks, restricted to these authors.
+    votes = defaultdict(lambda: defaultdict(list))
+    for author, game_id, rating in models.GameVote.objects.filter(
+        game__gameauthor__role__symbolic_id="author",
+        game__gameauthor__author__personality__in=personality_ids,
+    ).values_list(
+        "game__gameauthor__author__personality", "game_id", "star_rating"
+    ):
+        votes[author][game_id].append(rating)
+
+    for row in stats.values():
+        row.game_count = row.role_counts.get("author", 0)
+        games = votes.get(row.personality_id)
+        if games:
+            row.vote_count = sum(len(x) for x in games.values())
+            row.honor = HonorFromGameVotes(games)
+    return list(stats.values())
+
+
+def RefreshAuthorStats(personality_ids, models=MODELS):
+    personality_ids = set(
+        models.Personality.objects.filter(id__in=personality_ids).values_list(
+            "id", flat=True
+        )
+    )
+    if not personality_ids:
+        return
+    rows = BuildAuthorStats(personality_ids, models)
+    with transaction.atomic():
+        models.PersonalityStats.objects.filter(
+            personality_id__in=personality_ids
+        ).delete()
+        models.PersonalityStats.objects.bulk_create(rows)
+
+
+def RebuildAuthorStats(models=MODELS):
+    ids = list(models.Personality.objects.values_list("id", flat=True))
+    for i in range(0, len(ids), REBUILD_BATCH_SIZE):
+        RefreshAuthorStats(ids[i : i + REBUILD_BATCH_SIZE], models)
+
+
+def PersonalityIdsOfGames(game_ids):
+    return set(
+        GameAuthor.objects.filter(
+            game__in=game_ids, author__personality__isnull=False
+        ).values_list("author__personality", flat=True)
+    )
+
+
+@contextmanager
+def RefreshingAuthorStats(*game_ids, personality_ids=()):
+    """Refreshes stats of everyone credited on the games around a change."""
+    before = PersonalityIdsOfGames(game_ids)
+    yield
+    RefreshAuthorStats(
+        before | PersonalityIdsOfGames(game_ids) | set(personality_ids)
+    )
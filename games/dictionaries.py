@@ -0,0 +1,143 @@
+"""Author, tag and link choices of the game editor and of reconcile.
+
+They are built once and cached under a fingerprint made of a cache version
+and the row counts of the largest tables. Saves and deletes of any of
+EDITOR_DICTIONARIES_MODELS bump the version through signals; code that
+changes them in bulk calls InvalidateEditorDictionaries() itself.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.db.models import Count, Max
+
+from core.cacheversions import BumpCacheVersion, GetCacheVersion
+
+from .models import (
+    GameAuthorRole,
+    GameTag,
+    GameTagCategory,
+    GameURLCategory,
+    PersonalityAlias,
+)
+
+EDITOR_DICTIONARIES_TIMEOUT = 60 * 60
+EDITOR_DICTIONARIES_MODELS = [
+    GameAuthorRole,
+    PersonalityAlias,
+    GameTagCategory,
+    GameTag,
+    GameURLCategory,
+]
+EDITOR_DICTIONARIES_VERSION = "editor-dictionaries"
+
+
+def authors():
+    return {
+        "roles": [
+            {"title": title, "id": id}
+            for id, title in GameAuthorRole.objects.order_by(
+                "order", "title"
+            ).values_list("id", "title")
+        ],
+        "authors": [
+            {"name": name, "id": id}
+            for id, name in PersonalityAlias.objects.order_by(
+                "name"
+            ).values_list("id", "name")
+        ],
+        "value": [],
+    }
+
+
+def tags():
+    res = {"categories": [], "value": []}
+    by_category = {}
+    for x in GameTagCategory.objects.order_by("order", "name"):
+        val = {
+            "id": x.id,
+            "name": x.name,
+            "allow_new_tags": x.allow_new_tags,
+            "tags": [],
+        }
+        by_category[x.id] = val
+        res["categories"].append(val)
+    for id, category_id, name in GameTag.objects.order_by("name").values_list(
+        "id", "category_id", "name"
+    ):
+        by_category[category_id]["tags"].append({"id": id, "name": name})
+    return res
+
+
+def linktypes():
+    res = {"categories": []}
+    for x in GameURLCategory.objects.order_by("order", "title"):
+        res["categories"].append({
+            "id": x.id,
+            "title": x.title,
+            "uploadable": x.allow_cloning,
+        })
+    return res
+
+
+def InvalidateEditorDictionaries(**kwargs):
+    """Signal receiver for writes to any of EDITOR_DICTIONARIES_MODELS."""
+    BumpCacheVersion(EDITOR_DICTIONARIES_VERSION)
+
+
+def _EditorDictionariesFingerprint():
+    # Bulk writes skip the save/delete signals; row counts and newest ids
+    # still catch the inserts and deletes among them.
+    return "-".join([
+        GetCacheVersion(EDITOR_DICTIONARIES_VERSION),
+        *(
+            str(x or 0)
+            for model in (PersonalityAlias, GameTag)
+            for x in model.objects.aggregate(Count("id"), Max("id")).values()
+        ),
+    ])
+
+
+def AllEditorDictionaries():
+    """Choices of every user, cached until any of them changes."""
+    key = "editor-dictionaries:%s" % _EditorDictionariesFingerprint()
+    cache = caches["default"]
+    res = cache.get(key)
+    if res is None:
+        res = {
+            "authortypes": authors(),
+            "tagtypes": tags(),
+            "linktypes": linktypes(),
+            "category_perms": dict(
+                GameTagCategory.objects.values_list("id", "show_in_edit_perm")
+            ),
+        }
+        res["version"] = hashlib.sha256(
+            json.dumps(res, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        cache.set(key, res, EDITOR_DICTIONARIES_TIMEOUT)
+    return res
+
+
+def EditorDictionaries(request):
+    """Author, tag and link choices of the game editor, with their version.
+
+    The version changes whenever the content visible to this user does.
+    """
+    res = AllEditorDictionaries()
+    perms = res.pop("category_perms")
+    res["tagtypes"]["categories"] = [
+        x
+        for x in res["tagtypes"]["categories"]
+        if request.perm(perms[x["id"]])
+    ]
+    res["version"] = "%s-%s" % (
+        res["version"],
+        hashlib.sha256(
+            ",".join(
+                str(x["id"]) for x in res["tagtypes"]["categories"]
+            ).encode()
+        ).hexdigest()[:8],
+    )
+    return res
@@ -1,3 +1,4 @@
+import hashlib
 import json
 from collections import defaultdict
 from dataclasses import dataclass, field
@@ -6,14 +7,22 @@ from statistics import mean
 from typing import Tuple
 
 from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max, Q, prefetch_related_objects
 from django.urls import reverse
 
-from contest.models import GameListEntry
+from contest.models import Competition, GameList, GameListEntry
 from contest.views import FormatHead
 from core.views import BuildPackageUserFingerprint
 from moder.actions import GetModerActions
 
-from .models import Game, GameCommentVote, GameTagCategory
+from .models import (
+    Game,
+    GameCommentVote,
+    GameTag,
+    GameTagCategory,
+    PersonalityAlias,
+)
 from .search import BaseXWriter
 from .tools import (
     ExtractYoutubeId,
@@ -21,11 +30,39 @@ from .tools import (
     FormatTime,
     PartitionItems,
     RenderMarkdown,
+    RenderMarkdownBatch,
     StarsFromRating,
 )
 
 logger = getLogger("web")
 
+GAME_DETAILS_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Models shown on the game page besides the game's own rows, with the lookup
+# from Game to them. Writes to them bump the revision of the games they show
+# on, see BumpDependentGames.
+DETAILS_DEPENDENCIES = {
+    GameTag: "tags",
+    GameTagCategory: "tags__category",
+    PersonalityAlias: "gameauthor__author",
+    GameListEntry: "gamelistentry",
+    GameList: "gamelistentry__gamelist",
+    Competition: "gamelistentry__gamelist__competition",
+}
+
+
+def BumpDependentGames(sender, instance, **kwargs):
+    """Signal receiver for writes to any of DETAILS_DEPENDENCIES.
+
+    Connected to pre_delete rather than post_delete, as by then the rows
+    linking the instance to its games are gone.
+    """
+    Game.BumpRevision(
+        *Game.objects.filter(**{
+            DETAILS_DEPENDENCIES[sender]: instance
+        }).values_list("id", flat=True)
+    )
+
 
 def AnnotateMedia(media):
     res = []
@@ -54,30 +91,64 @@ def AnnotateMedia(media):
     return res
 
 
-def GetCommentVotes(vote_set, user, comment):
-    likes = vote_set.filter(vote=1).count()
-    dislikes = vote_set.filter(vote=-1).count()
-    own_vote = 0
-
-    if user and not user.is_authenticated:
-        user = None
-    allow_vote = (
-        user is not None and comment.user != user and not comment.is_deleted
-    )
+def _CommentVoteAggregates(user):
+    aggregates = {
+        "likes": Count("id", filter=Q(vote=1)),
+        "dislikes": Count("id", filter=Q(vote=-1)),
+    }
+    if user is not None:
+        aggregates["own_vote"] = Max("vote", filter=Q(user=user))
+    return aggregates
 
-    try:
-        own_vote = vote_set.get(user=user).vote
-    except GameCommentVote.DoesNotExist:
-        pass
 
+def _CommentLikes(
+    user, author_id, is_deleted, likes=0, dislikes=0, own_vote=None
+):
+    allow_vote = user is not None and author_id != user.id and not is_deleted
     return {
         "likes": likes,
         "dislikes": dislikes,
         "allow_vote": allow_vote,
-        "own_vote": own_vote,
+        "own_vote": own_vote or 0,
     }
 
 
+def GetCommentVotes(vote_set, user, comment):
+    if user and not user.is_authenticated:
+        user = None
+    votes = vote_set.aggregate(**_CommentVoteAggregates(user))
+    return _CommentLikes(user, comment.user_id, comment.is_deleted, **votes)
+
+
+def BuildCommentThreads(comments):
+    """Orders comments the way the game page shows them.
+
+    Every thread starts with its top-level comment and is followed by all its
+    replies regardless of depth. `comments` must be in creation order, which
+    is then kept both between and within threads. Replies to comments that
+    are missing (or form a loop) start threads of their own.
+    """
+    by_id = {c["id"]: c for c in comments}
+    root_of = {}
+    for comment in comments:
+        path = {}
+        x = comment
+        while x["id"] not in root_of:
+            path[x["id"]] = x
+            parent = by_id.get(x["parent_id"])
+            if parent is None or parent["id"] in path:
+                root_of[x["id"]] = x["id"]
+            else:
+                x = parent
+        for comment_id in path:
+            root_of[comment_id] = root_of[x["id"]]
+
+    threads = {}
+    for comment in comments:
+        threads.setdefault(root_of[comment["id"]], []).append(comment)
+    return [x for thread in threads.values() for x in thread]
+
+
 @dataclass
 class GameTagDetails:
     tags: list = field(default_factory=list)
@@ -91,27 +162,59 @@ class GameTagDetails:
 
 
 class GameDetailsBuilder:
+    """Builds the game page.
+
+    Everything that is the same for all visitors is built once per game
+    revision and kept in the cache (see GetSharedDict); votes, permissions
+    and other per-user bits are laid over it on every request.
+    """
+
     def __init__(self, game_id, request):
-        self.game = (
-            Game.objects
-            .prefetch_related(
-                "gameauthor_set__role",
-                "gameauthor_set__author",
-                "gameurl_set__category",
-                "gameurl_set__url",
-                "description_attributions",
-                "tags__category",
-            )
-            .select_related()
-            .get(id=game_id)
-        )
+        self.game = Game.objects.select_related().get(id=game_id)
         self.request = request
         request.perm.Ensure(self.game.view_perm)
+        self.user = request.user if request.user.is_authenticated else None
+
+    def GetETag(self):
+        """Validator of the page as rendered for the current request."""
+        if self.request.perm("(alias curation_admin)"):
+            # The navigation bar of curators shows a live counter.
+            return None
+        return hashlib.sha256(
+            repr((
+                settings.VERSION,
+                settings.SITE_ID,
+                self.game.id,
+                self.game.revision,
+                self.user.id if self.user else None,
+                # Set order depends on the hash seed of the process.
+                sorted(self.request.perm.tokens),
+                self.request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+            )).encode()
+        ).hexdigest()
+
+    def GetSharedDict(self):
+        # Creation time guards against ids reused after a database restore.
+        key = "game-details:%d:%d:%s" % (
+            self.game.id,
+            self.game.revision,
+            self.game.creation_time.timestamp(),
+        )
+        cache = caches["game-pages"]
+        res = cache.get(key)
+        if res is None:
+            res = self.BuildSharedDict()
+            cache.set(key, res, GAME_DETAILS_CACHE_TIMEOUT)
+        return res
 
-    def GetGameDict(self):
-        release_date = FormatDate(self.game.release_date)
-        last_edit_date = FormatDate(self.game.edit_time)
-        added_date = FormatDate(self.game.creation_time)
+    def BuildSharedDict(self):
+        prefetch_related_objects(
+            [self.game],
+            "gameauthor_set__role",
+            "gameauthor_set__author",
+            "gameurl_set__category",
+            "gameurl_set__url",
+        )
         authors, participants = PartitionItems(
             self.game.gameauthor_set.all(),
             [("author",)],
@@ -126,54 +229,50 @@ class GameDetailsBuilder:
                 ("download_direct", "download_landing"),
             ],
         )
-        media = AnnotateMedia(media)
-        attributions = list(
-            self.game.description_attributions.order_by("name")
-        )
-        md = RenderMarkdown(self.game.description)
-        metadata = self.GetTagsForDetails()
-        votes = self.GetGameScore()
-        comments = self.GetGameComments()
-        competitions = self.GetCompetitions()
-        loonchator_links = []
-        for x in self.game.package_set.all():
-            loonchator_links.append(
-                "%s://rungame/%s"
-                % (
-                    ("ersatzplut-debug" if settings.DEBUG else "ersatzplut"),
-                    BuildPackageUserFingerprint(
-                        (
-                            self.request.user
-                            if self.request.user.is_authenticated
-                            else None
-                        ),
-                        x.id,
-                    ),
-                )
-            )
         return {
-            "comment_perm": self.request.perm(self.game.comment_perm),
-            "vote_perm": self.request.perm(self.game.vote_perm),
-            "added_date": added_date,
+            "added_date": FormatDate(self.game.creation_time),
             "authors": authors,
             "participants": participants,
-            "game": self.game,
-            "moder_actions": GetModerActions(self.request, "Game", self.game),
-            "last_edit_date": last_edit_date,
-            "markdown": md,
-            "description_attributions": attributions,
-            "release_date": release_date,
-            "metadata": metadata,
+            "last_edit_date": FormatDate(self.game.edit_time),
+            "markdown": RenderMarkdown(self.game.description),
+            "description_attributions": list(
+                self.game.description_attributions.order_by("name")
+            ),
+            "release_date": FormatDate(self.game.release_date),
+            "tags": self.GetTags(),
             "links": links,
-            "media": media,
+            "media": AnnotateMedia(media),
             "online": online,
             "download": download,
-            "votes": votes,
-            "comments": comments,
-            "loonchator_links": loonchator_links,
-            "competitions": competitions,
+            "votes": self.GetSharedGameScore(),
+            "comments": self.GetSharedComments(),
+            "competitions": self.GetCompetitions(),
+            "package_ids": list(
+                self.game.package_set.values_list("id", flat=True)
+            ),
         }
 
+    def GetGameDict(self):
+        res = dict(self.GetSharedDict())
+        res.update({
+            "comment_perm": self.request.perm(self.game.comment_perm),
+            "vote_perm": self.request.perm(self.game.vote_perm),
+            "game": self.game,
+            "moder_actions": GetModerActions(self.request, "Game", self.game),
+            "metadata": self.GetTagsForDetails(res.pop("tags")),
+            "votes": self.GetGameScore(res["votes"]),
+            "comments": self.GetGameComments(res["comments"]),
+            "loonchator_links": [
+                "%s://rungame/%s"
+                % (
+                    ("ersatzplut-debug" if settings.DEBUG else "ersatzplut"),
+                    BuildPackageUserFingerprint(self.user, package_id),
+                )
+                for package_id in res.pop("package_ids")
+            ],
+        })
+        return res
+
     def GetCompetitions(self):
         comps = GameListEntry.objects.filter(
             game=self.game, gamelist__competition__isnull=False
@@ -191,25 +290,27 @@ class GameDetailsBuilder:
             res.append(item)
         return res
 
-    def GetTagsForDetails(self) -> GameTagDetails:
+    def GetTags(self):
+        tags = list(
+            self.game.tags.select_related("category").order_by(
+                "category__order", "name"
+            )
+        )
+        for tag in tags:
+            writer = BaseXWriter()
+            writer.addHeader(2, tag.category.id)
+            writer.addSet([tag.id])
+            tag.search_query = f"{reverse('list_games')}?q={writer.GetStr()}"
+        return tags
+
+    def GetTagsForDetails(self, tags) -> GameTagDetails:
         primary_sids = {"version", "language", "platform", "age"}
         grouped = defaultdict(list)
 
-        queryset = self.game.tags.select_related("category").order_by(
-            "category__order", "name"
-        )
-
-        for tag in queryset:
+        for tag in tags:
             cat = tag.category
             if not self.request.perm(cat.show_in_details_perm):
                 continue
-
-            # Augment tag
-            writer = BaseXWriter()
-            writer.addHeader(2, cat.id)
-            writer.addSet([tag.id])
-            tag.search_query = f"{reverse('list_games')}?q={writer.GetStr()}"
-
             grouped[cat].append(tag)
 
         details = GameTagDetails()
@@ -240,73 +341,82 @@ class GameDetailsBuilder:
     # - user_hours
     # - user_mins
     # - user_score
-    def GetGameScore(self):
-        user = self.request.user
-        res = {"user_played": False}
-        if user and not user.is_authenticated:
-            user = None
-        played_votes = []
-        res["user_hours"] = ""
-
-        for v in self.game.gamevote_set.all():
-            played_votes.append(v.star_rating)
-            if v.user == user:
-                res["user_played"] = True
-                res["user_score"] = v.star_rating
-
-        res["played_count"] = len(played_votes)
+    def GetSharedGameScore(self):
+        played_votes = list(
+            self.game.gamevote_set.values_list("star_rating", flat=True)
+        )
+        res = {"played_count": len(played_votes)}
         if played_votes:
             avg = mean(played_votes)
             res["avg_rating"] = ("%3.1f" % avg).replace(".", ",")
             res["stars"] = StarsFromRating(avg)
+        return res
 
+    def GetGameScore(self, shared=None):
+        if shared is None:
+            shared = self.GetSharedGameScore()
+        res = dict(shared, user_played=False, user_hours="")
+        if self.user:
+            vote = self.game.gamevote_set.filter(user=self.user).first()
+            if vote:
+                res["user_played"] = True
+                res["user_score"] = vote.star_rating
         return res
 
     # Returns repeated:
     # user__name
     # parent__id
     #
-    def GetGameComments(self):
-        res = []
-        for v in self.game.gamecomment_set.select_related(
-            "user"
-        ).prefetch_related("gamecommentvote_set"):
-            likes = GetCommentVotes(
-                v.gamecommentvote_set, self.request.user, v
+    def GetSharedComments(self):
+        votes = {
+            x.pop("comment_id"): x
+            for x in GameCommentVote.objects
+            .filter(comment__game=self.game)
+            .values("comment_id")
+            .annotate(**_CommentVoteAggregates(None))
+            .order_by()
+        }
+        comments = list(
+            self.game.gamecomment_set.select_related("user").order_by(
+                "creation_time", "id"
             )
+        )
+        texts = RenderMarkdownBatch([v.text for v in comments])
+        res = []
+        for v, text in zip(comments, texts):
             res.append({
                 "id": v.id,
-                "user_id": v.user.id if v.user else None,
+                "user_id": v.user_id,
                 "username": v.GetUsername(),
-                "parent_id": v.parent.id if v.parent else None,
+                "parent_id": v.parent_id,
                 "created": FormatTime(v.creation_time),
                 "created_raw": v.creation_time,
                 "edited": FormatTime(v.edit_time),
-                "text": RenderMarkdown(v.text),
+                "text": text,
                 "is_deleted": v.is_deleted,
-                "likes": likes,
+                "votes": votes.get(v.id, {}),
             })
-
-        parent_to_cluster = {}
-        clusters = []
-
-        while res:
-            swap = []
-            for v in res:
-                if not v["parent_id"]:
-                    parent_to_cluster[v["id"]] = len(clusters)
-                    clusters.append([v])
-                elif v["parent_id"] in parent_to_cluster:
-                    clusters[parent_to_cluster[v["parent_id"]]].append(v)
-                    parent_to_cluster[v["id"]] = parent_to_cluster[
-                        v["parent_id"]
-                    ]
-                else:
-                    swap.append(v)
-            res = swap
-
-        clusters.sort(key=lambda x: x[0]["created_raw"])
-        for x in clusters:
-            x[1:] = sorted(x[1:], key=lambda t: t["created_raw"])
-
-        return [x for y in clusters for x in y]
+        return BuildCommentThreads(res)
+
+    def GetGameComments(self, shared=None):
+        if shared is None:
+            shared = self.GetSharedComments()
+        own_votes = {}
+        if self.user:
+            own_votes = dict(
+                GameCommentVote.objects.filter(
+                    comment__game=self.game, user=self.user
+                ).values_list("comment_id", "vote")
+            )
+        res = []
+        for comment in shared:
+            comment = dict(comment)
+            comment["likes"] = _CommentLikes(
+                self.user,
+                comment["user_id"],
+                comment["is_deleted"],
+                own_vote=own_votes.get(comment["id"]),
+                **comment.pop("votes"),
+            )
+            res.append(comment)
+        return res
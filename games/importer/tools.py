@@ -1,4 +1,6 @@
 import re
+from collections import defaultdict
+from functools import lru_cache
 from urllib.parse import quote, urljoin, urlparse, urlsplit, urlunsplit
 
 from .enrichment import enricher
@@ -136,8 +138,6 @@ URL_CATEGORIZER_RULES = [  # hostname, path, query, slug, desc
 
 
 def QuoteUtf8(s):
-    if s is str:
-        s = s.encode("utf-8")
     return quote(s, safe="/+=&?%:@;!#$*()_-")
 
 
@@ -156,24 +156,12 @@ def CategorizeUrl(url, desc="", category=None, base=None):
         desc = ""
     if base:
         url = urljoin(base, url)
-    purl = urlparse(url)
     cat_slug = "unknown"
 
-    for host, path, query, slug, ddesc in URL_CATEGORIZER_RULES:
-        if host:
-            if host.startswith("@"):
-                if not purl.hostname or not re.match(host[1:], purl.hostname):
-                    continue
-            elif host != purl.hostname:
-                continue
-        if path and not re.match(path, purl.path):
-            continue
-        if query and not re.match(query, purl.query):
-            continue
-        cat_slug = slug
+    if matched := GAME_URL_RULES.Match(url):
+        cat_slug, ddesc = matched
         if not desc:
             desc = ddesc
-        break
 
     if cat_slug == "unknown":
         desc_lower = desc.lower()
@@ -226,24 +214,12 @@ AUTHOR_URL_CATEGORIZER_RULES = [  # hostname, path, query, slug, desc
 def CategorizeAuthorUrl(url, desc="", category=None, base=None):
     if base:
         url = urljoin(base, url)
-    purl = urlparse(url)
     cat_slug = "other"
 
-    for host, path, query, slug, ddesc in AUTHOR_URL_CATEGORIZER_RULES:
-        if host:
-            if host.startswith("@"):
-                if purl.hostname and not re.match(host[1:], purl.hostname):
-                    continue
-            elif host != purl.hostname:
-                continue
-        if path and not re.match(path, purl.path):
-            continue
-        if query and not re.match(query, purl.query):
-            continue
-        cat_slug = slug
+    if matched := AUTHOR_URL_RULES.Match(url):
+        cat_slug, ddesc = matched
         if not desc:
             desc = ddesc
-        break
 
     if cat_slug == "other":
         if desc.lower() == "интервью":
@@ -261,12 +237,96 @@ def CategorizeAuthorUrl(url, desc="", category=None, base=None):
     return {"urlcat_slug": cat_slug, "description": desc, "url": url}
 
 
+class UrlRuleSet:
+    """Categorizer rules (hostname, path, query, slug, desc) indexed by host.
+
+    A rule with a plain hostname is only tried for that host. Rules without
+    a hostname or with an "@regex" one are merged in, in the original rule
+    order, the first time a host is seen, so the first matching rule is the
+    same one a linear scan would find. Results are memoized per url.
+    """
+
+    def __init__(self, rules, match_missing_host):
+        self.rules = rules
+        # Whether "@regex" rules apply to urls without a hostname.
+        self.match_missing_host = match_missing_host
+        self.by_host = defaultdict(list)
+        self.generic = []
+        for index, (host, path, query, slug, desc) in enumerate(rules):
+            rule = (
+                index,
+                re.compile(path) if path else None,
+                re.compile(query) if query else None,
+                slug,
+                desc,
+            )
+            if not host:
+                self.generic.append((None, rule))
+            elif host.startswith("@"):
+                self.generic.append((re.compile(host[1:]), rule))
+            else:
+                self.by_host[host].append(rule)
+        self.RulesForHost = lru_cache(maxsize=4096)(self.RulesForHost)
+        self.Match = lru_cache(maxsize=65536)(self.Match)
+
+    def RulesForHost(self, hostname):
+        rules = list(self.by_host.get(hostname, []))
+        for host_re, rule in self.generic:
+            if host_re is not None:
+                if hostname is None:
+                    if not self.match_missing_host:
+                        continue
+                elif not host_re.match(hostname):
+                    continue
+            rules.append(rule)
+        rules.sort(key=lambda x: x[0])
+        return tuple(rules)
+
+    def Match(self, url):
+        """Returns (slug, desc) of the first matching rule, or None."""
+        purl = urlparse(url)
+        for _, path, query, slug, desc in self.RulesForHost(purl.hostname):
+            if path and not path.match(purl.path):
+                continue
+            if query and not query.match(purl.query):
+                continue
+            return (slug, desc)
+        return None
+
+    def MatchLinear(self, url):
+        """Match() as a plain scan over the rules, to check it against."""
+        purl = urlparse(url)
+        for host, path, query, slug, desc in self.rules:
+            if host:
+                if host.startswith("@"):
+                    if purl.hostname is None:
+                        if not self.match_missing_host:
+                            continue
+                    elif not re.match(host[1:], purl.hostname):
+                        continue
+                elif host != purl.hostname:
+                    continue
+            if path and not re.match(path, purl.path):
+                continue
+            if query and not re.match(query, purl.query):
+                continue
+            return (slug, desc)
+        return None
+
+
+GAME_URL_RULES = UrlRuleSet(URL_CATEGORIZER_RULES, match_missing_host=False)
+AUTHOR_URL_RULES = UrlRuleSet(
+    AUTHOR_URL_CATEGORIZER_RULES, match_missing_host=True
+)
+
+
 def SimilarEnough(w1, w2):
     s1 = GetBagOfWords(w1)
     s2 = GetBagOfWords(w2)
     return ComputeSimilarity(s1, s2) > MIN_SIMILARITY
 
 
+@lru_cache(maxsize=65536)
 def HashizeUrl(url):
     url = QuoteUtf8(url)
     purl = urlsplit(url, allow_fragments=False)
@@ -308,66 +368,19 @@ class Importer:
                 return x.ImportAuthor(url)
         return {"error": "Ссылка на неизвестный ресурс."}
 
-    def Import(self, *seed_url):
+    def Import(self, *seed_url, progress=None):
+        """Imports seed_url and the familiar urls found along the way.
+
+        If given, progress(checked, pending, results) is called after every
+        fetched url with the number of urls done, the number still queued
+        and the per-url results kept so far (see MergeImports).
+        """
         url_errors = dict()
         urls_checked = set()
         urls_to_check = set(seed_url)
         res = []
         title = None
 
-        s_urls = set()
-        s_tags = set()
-        s_auth = set()
-
-        def MergeImport(y, x):
-            for z in ["title", "release_date", "error"]:
-                if z not in y and z in x:
-                    y[z] = x[z]
-
-            if "desc" in x:
-                if "desc" in y:
-                    y["desc"] += "\n\n---\n\n"
-                else:
-                    y["desc"] = ""
-                y["desc"] += x["desc"]
-
-            if "urls" in x:
-                x["urls"] = [z for z in x["urls"] if z["urlcat_slug"]]
-
-            for setz, field, extractor in [
-                (
-                    s_urls,
-                    "urls",
-                    lambda xx: (HashizeUrl(xx["url"]), xx["urlcat_slug"]),
-                ),
-                (
-                    s_tags,
-                    "tags",
-                    lambda xx: (
-                        xx.get("tag_slug"),
-                        xx.get("tag"),
-                        xx.get("cat_slug"),
-                    ),
-                ),
-                (
-                    s_auth,
-                    "authors",
-                    lambda v: (
-                        v.get("role_slug"),
-                        v.get("role_slug"),
-                        v.get("name"),
-                    ),
-                ),
-            ]:
-                if field in x:
-                    if field not in y:
-                        y[field] = []
-                    for z in x[field]:
-                        if extractor(z) in setz:
-                            continue
-                        setz.add(extractor(z))
-                        y[field].append(z)
-
         while urls_to_check:
             url = urls_to_check.pop()
             url_hash = HashizeUrl(url)
@@ -401,18 +414,77 @@ class Importer:
                         if self.IsFamiliarUrl(x["url"], x["urlcat_slug"]):
                             urls_to_check.add(x["url"])
 
-        res.sort(key=lambda x: x["priority"], reverse=True)
-
-        r = {}
-        for x in res:
-            MergeImport(r, x)
-        if "title" in r and "error" in r:
-            del r["error"]
+            if progress:
+                progress(len(urls_checked), len(urls_to_check), res)
 
+        r = MergeImports(res)
         enricher.Enrich(r)
         return (r, url_errors)
 
 
+def MergeImports(results):
+    """Merges per-url import results, highest priority first."""
+    s_urls = set()
+    s_tags = set()
+    s_auth = set()
+
+    def MergeImport(y, x):
+        for z in ["title", "release_date", "error"]:
+            if z not in y and z in x:
+                y[z] = x[z]
+
+        if "desc" in x:
+            if "desc" in y:
+                y["desc"] += "\n\n---\n\n"
+            else:
+                y["desc"] = ""
+            y["desc"] += x["desc"]
+
+        if "urls" in x:
+            x["urls"] = [z for z in x["urls"] if z["urlcat_slug"]]
+
+        for setz, field, extractor in [
+            (
+                s_urls,
+                "urls",
+                lambda xx: (HashizeUrl(xx["url"]), xx["urlcat_slug"]),
+            ),
+            (
+                s_tags,
+                "tags",
+                lambda xx: (
+                    xx.get("tag_slug"),
+                    xx.get("tag"),
+                    xx.get("cat_slug"),
+                ),
+            ),
+            (
+                s_auth,
+                "authors",
+                lambda v: (
+                    v.get("role_slug"),
+                    v.get("role_slug"),
+                    v.get("name"),
+                ),
+            ),
+        ]:
+            if field in x:
+                if field not in y:
+                    y[field] = []
+                for z in x[field]:
+                    if extractor(z) in setz:
+                        continue
+                    setz.add(extractor(z))
+                    y[field].append(z)
+
+    r = {}
+    for x in sorted(results, key=lambda x: x["priority"], reverse=True):
+        MergeImport(r, x)
+    if "title" in r and "error" in r:
+        del r["error"]
+    return r
+
+
 # Schema:
 # title: title
 # desc: description, markdown-formatted
@@ -0,0 +1,108 @@
+"""Background game imports for the editor.
+
+The editor starts an ImportJob, a worker runs Importer.Import for it and
+stores progress together with what has been gathered so far, and the editor
+polls the job until it is done. A job whose worker stopped reporting for
+IMPORT_JOB_STALE_AFTER (lost task, killed worker) is failed when polled.
+"""
+
+from datetime import timedelta
+from logging import getLogger
+
+from django.utils import timezone
+
+from .importer import Importer
+from .importer.tools import MergeImports
+from .models import ImportJob
+from .tasks import run_import
+from .updater import Importer2Json
+
+logger = getLogger("worker")
+
+IMPORT_JOB_RETENTION = timedelta(days=7)
+IMPORT_JOB_STALE_AFTER = timedelta(minutes=10)
+
+
+def StartImportJob(user, url):
+    ImportJob.objects.filter(
+        creation_time__lt=timezone.now() - IMPORT_JOB_RETENTION
+    ).delete()
+    now = timezone.now()
+    job = ImportJob.objects.create(
+        user=user, url=url, creation_time=now, update_time=now
+    )
+    run_import.delay(job.id)
+    return job
+
+
+def _UpdateJob(job, **fields):
+    for k, v in fields.items():
+        setattr(job, k, v)
+    job.update_time = timezone.now()
+    job.save(update_fields=[*fields, "update_time"])
+
+
+def RunImportJob(job_id):
+    job = ImportJob.objects.get(id=job_id)
+    if job.state != ImportJob.State.PENDING:
+        return job
+    _UpdateJob(job, state=ImportJob.State.RUNNING)
+
+    def Progress(checked, pending, results):
+        _UpdateJob(
+            job,
+            urls_checked=checked,
+            urls_pending=pending,
+            partial=Importer2Json(MergeImports(results)),
+        )
+
+    try:
+        raw_import, _ = Importer().Import(job.url, progress=Progress)
+        if "error" in raw_import:
+            _UpdateJob(
+                job, state=ImportJob.State.FAILED, error=raw_import["error"]
+            )
+        else:
+            _UpdateJob(
+                job,
+                state=ImportJob.State.DONE,
+                urls_pending=0,
+                result=Importer2Json(raw_import),
+            )
+    except Exception:
+        logger.exception("Import of %s failed", job.url)
+        _UpdateJob(
+            job,
+            state=ImportJob.State.FAILED,
+            error="Не удалось импортировать игру.",
+        )
+    return job
+
+
+def FailStaleImportJob(job):
+    if job.state not in (ImportJob.State.PENDING, ImportJob.State.RUNNING):
+        return
+    if job.update_time >= timezone.now() - IMPORT_JOB_STALE_AFTER:
+        return
+    logger.warning("Import job %d of %s went stale", job.id, job.url)
+    _UpdateJob(
+        job,
+        state=ImportJob.State.FAILED,
+        error="Импорт не отвечает, попробуйте ещё раз.",
+    )
+
+
+def ImportJobJson(job):
+    res = {
+        "job_id": job.id,
+        "state": job.state,
+        "urls_checked": job.urls_checked,
+        "urls_pending": job.urls_pending,
+    }
+    if job.state == ImportJob.State.DONE:
+        res["result"] = job.result
+    elif job.state == ImportJob.State.FAILED:
+        res["error"] = job.error
+    elif job.partial is not None:
+        res["partial"] = job.partial
+    return res
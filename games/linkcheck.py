@@ -0,0 +1,161 @@
+"""Bulk link-health checker for game URLs.
+
+Picks the URLs that are due for a check (never checked, or checked longer
+than ``recheck_after`` ago), most popular games first, probes them
+concurrently with at most ``per_host`` requests in flight against any single
+host, and writes the outcome back with batched ``bulk_update`` calls. A
+failed probe is retried once after ``retry_delay`` seconds, so that a single
+hiccup of a host doesn't mark its links broken.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import chain, zip_longest
+from logging import getLogger
+from threading import BoundedSemaphore, Lock
+from time import sleep
+from urllib.parse import urlparse
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from core.crawler import FetchUrlStatus
+
+from .models import URL, Game
+
+logger = getLogger("crawler")
+
+RECHECK_AFTER = timedelta(days=30)
+UPDATE_BATCH_SIZE = 500
+UPDATE_FIELDS = ["is_broken", "last_checked", "check_status"]
+CHECK_ATTEMPTS = 2
+RETRY_DELAY = 10
+
+
+@dataclass(frozen=True)
+class LinkCheckStats:
+    checked: int
+    ok: int
+    broken: int
+
+
+class _HostLimiter:
+    def __init__(self, per_host: int):
+        self.per_host = max(per_host, 1)
+        self.semaphores: dict[str, BoundedSemaphore] = {}
+        self.lock = Lock()
+
+    def get(self, host: str) -> BoundedSemaphore:
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = BoundedSemaphore(self.per_host)
+            return self.semaphores[host]
+
+
+def _host(url: URL) -> str:
+    return (urlparse(url.original_url).hostname or "").lower()
+
+
+def _interleave_by_host(urls: list[URL]) -> list[URL]:
+    """Round-robin over hosts so workers don't queue up behind one host."""
+    by_host: dict[str, list[URL]] = defaultdict(list)
+    for url in urls:
+        by_host[_host(url)].append(url)
+    return [
+        url
+        for url in chain.from_iterable(zip_longest(*by_host.values()))
+        if url is not None
+    ]
+
+
+def due_urls(recheck_after: timedelta = RECHECK_AFTER):
+    """Remote game URLs due for a check, most important first."""
+    return (
+        URL.objects
+        .filter(is_uploaded=False, gameurl__isnull=False)
+        .filter(
+            Q(last_checked__isnull=True)
+            | Q(last_checked__lt=timezone.now() - recheck_after)
+        )
+        .annotate(popularity=Count("gameurl__game__gamevote", distinct=True))
+        .order_by(
+            "-popularity",
+            F("last_checked").asc(nulls_first=True),
+            "id",
+        )
+    )
+
+
+def _probe(url: URL, limiter: _HostLimiter, timeout: float) -> int | None:
+    with limiter.get(_host(url)):
+        try:
+            return FetchUrlStatus(url.original_url, timeout=timeout)
+        except Exception as exc:
+            logger.info("Link check failed for %s: %s", url.original_url, exc)
+            return None
+
+
+def _check(
+    url: URL, limiter: _HostLimiter, timeout: float, retry_delay: float
+) -> URL:
+    for attempt in range(CHECK_ATTEMPTS):
+        if attempt:
+            sleep(retry_delay)
+        status = _probe(url, limiter, timeout)
+        if status is not None and status < 400:
+            break
+    url.check_status = status
+    url.is_broken = status is None or status >= 400
+    url.last_checked = timezone.now()
+    return url
+
+
+def run_linkcheck(
+    limit: int | None = None,
+    threads: int = 16,
+    per_host: int = 2,
+    timeout: float = 30,
+    recheck_after: timedelta = RECHECK_AFTER,
+    retry_delay: float = RETRY_DELAY,
+) -> LinkCheckStats:
+    urls = due_urls(recheck_after).only("id", "original_url", "is_broken")
+    if limit is not None:
+        urls = urls[:limit]
+    urls = _interleave_by_host(list(urls))
+    logger.info("Checking %d links", len(urls))
+
+    was_broken = {url.id: url.is_broken for url in urls}
+    limiter = _HostLimiter(per_host)
+    checked: list[URL] = []
+    ok = broken = 0
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as executor:
+        for url in executor.map(
+            lambda u: _check(u, limiter, timeout, retry_delay), urls
+        ):
+            checked.append(url)
+            if url.is_broken:
+                broken += 1
+            else:
+                ok += 1
+            if len(checked) >= UPDATE_BATCH_SIZE:
+                URL.objects.bulk_update(checked, UPDATE_FIELDS)
+                checked = []
+    if checked:
+        URL.objects.bulk_update(checked, UPDATE_FIELDS)
+    if flipped := [u.id for u in urls if u.is_broken != was_broken[u.id]]:
+        Game.BumpRevision(
+            *Game.objects
+            .filter(gameurl__url__in=flipped)
+            .values_list("id", flat=True)
+            .distinct()
+        )
+
+    stats = LinkCheckStats(checked=ok + broken, ok=ok, broken=broken)
+    logger.info(
+        "Link check complete: %d checked, %d broken",
+        stats.checked,
+        stats.broken,
+    )
+    return stats
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from games.authormerge import (
+    ApplyAuthorMerges,
+    AuthorMergePlan,
+    DescribeAuthorMerges,
+)
+
+
+class Command(BaseCommand):
+    help = "Merge personalities in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "merges",
+            nargs="*",
+            help="source_id:target_id pairs",
+        )
+        parser.add_argument(
+            "--file",
+            help="File with one 'source_id target_id' pair per line",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print what would be merged",
+        )
+
+    def handle(self, *args, **options):
+        pairs = [x.split(":") for x in options["merges"]]
+        if options["file"]:
+            with open(options["file"]) as f:
+                pairs += [x.split() for x in f if x.strip()]
+        plan = AuthorMergePlan()
+        for pair in pairs:
+            try:
+                src, dst = map(int, pair)
+            except ValueError:
+                raise CommandError("Bad merge: %s" % " ".join(pair))
+            plan.personalities[src] = dst
+        if not plan.personalities:
+            raise CommandError("Nothing to merge")
+
+        try:
+            for line in DescribeAuthorMerges(plan):
+                self.stdout.write(line)
+            if not options["dry_run"]:
+                ApplyAuthorMerges(plan)
+        except ValueError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0023_alter_game_id_alter_gameauthor_id_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="url",
+            name="content_hash",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=64, null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0024_url_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="url",
+            name="check_status",
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="url",
+            name="last_checked",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import json
+
+from django.db import migrations
+
+
+def create_check_links_task(apps, schema_editor):
+    IntervalSchedule = apps.get_model("django_celery_beat", "IntervalSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+
+    schedule, _ = IntervalSchedule.objects.get_or_create(
+        every=1,
+        period="hours",
+    )
+    PeriodicTask.objects.update_or_create(
+        name="Check links",
+        defaults={
+            "interval": schedule,
+            "task": "games.tasks.check_links",
+            "args": json.dumps([]),
+            "kwargs": json.dumps({"limit": 2000}),
+            "enabled": False,
+        },
+    )
+
+
+def delete_check_links_task(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(name="Check links").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0025_url_last_checked"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_check_links_task,
+            delete_check_links_task,
+        ),
+    ]
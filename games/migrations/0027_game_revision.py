@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0026_check_links_task"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="revision",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
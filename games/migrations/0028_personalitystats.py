@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0027_game_revision"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PersonalityStats",
+            fields=[
+                (
+                    "personality",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="games.personality",
+                    ),
+                ),
+                ("game_count", models.IntegerField(db_index=True, default=0)),
+                ("role_counts", models.JSONField(default=dict)),
+                ("vote_count", models.IntegerField(default=0)),
+                ("honor", models.FloatField(db_index=True, default=0.0)),
+                ("first_release", models.DateField(blank=True, null=True)),
+                (
+                    "last_release",
+                    models.DateField(blank=True, db_index=True, null=True),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def build_personality_stats(apps, schema_editor):
+    from games.authorstats import AuthorStatsModels, RebuildAuthorStats
+
+    RebuildAuthorStats(
+        AuthorStatsModels(
+            apps.get_model("games", "Personality"),
+            apps.get_model("games", "GameAuthor"),
+            apps.get_model("games", "GameVote"),
+            apps.get_model("games", "PersonalityStats"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0028_personalitystats"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            build_personality_stats, migrations.RunPython.noop
+        ),
+    ]
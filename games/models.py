@@ -12,6 +12,13 @@ class Game(models.Model):
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def BumpRevision(*game_ids):
+        """Invalidates cached pages of the games, see GameDetailsBuilder."""
+        Game.objects.filter(id__in=game_ids).update(
+            revision=models.F("revision") + 1
+        )
+
     title = models.CharField(_("Title"), max_length=255)
     description = models.TextField(_("Description"), null=True, blank=True)
     description_attributions = models.ManyToManyField(
@@ -44,6 +51,8 @@ class Game(models.Model):
         null=True,
         blank=True,
     )
+    # Bumped by everything that changes the game page.
+    revision = models.PositiveIntegerField(default=0, editable=False)
 
     # -(GameContestEntry)
     # (LoadLog) // For computing popularity
@@ -89,6 +98,11 @@ class URL(models.Model):
     creation_date = models.DateTimeField()
     use_count = models.IntegerField(default=0)
     file_size = models.IntegerField(null=True, blank=True)
+    content_hash = models.CharField(
+        null=True, blank=True, max_length=64, db_index=True
+    )
+    last_checked = models.DateTimeField(null=True, blank=True, db_index=True)
+    check_status = models.SmallIntegerField(null=True, blank=True)
     creator = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -219,6 +233,28 @@ class Personality(models.Model):
     )
 
 
+class PersonalityStats(models.Model):
+    """Per-author numbers kept up to date by games/authorstats.py."""
+
+    class Meta:
+        default_permissions = ()
+
+    personality = models.OneToOneField(
+        Personality,
+        primary_key=True,
+        related_name="stats",
+        on_delete=models.CASCADE,
+    )
+    # Games credited with the "author" role.
+    game_count = models.IntegerField(default=0, db_index=True)
+    # Games per role symbolic_id, including "author".
+    role_counts = models.JSONField(default=dict)
+    vote_count = models.IntegerField(default=0)
+    honor = models.FloatField(default=0.0, db_index=True)
+    first_release = models.DateField(null=True, blank=True)
+    last_release = models.DateField(null=True, blank=True, db_index=True)
+
+
 class PersonalityUrl(models.Model):
     class Meta:
         default_permissions = ()
@@ -382,3 +418,33 @@ class GameCommentVote(models.Model):
     )
     vote_time = models.DateTimeField()
     vote = models.SmallIntegerField()
+
+
+class ImportJob(models.Model):
+    """A game import from the editor, run in the background by a worker."""
+
+    class Meta:
+        default_permissions = ()
+
+    class State(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RUNNING = "RUNNING", _("Running")
+        DONE = "DONE", _("Done")
+        FAILED = "FAILED", _("Failed")
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.CASCADE
+    )
+    url = models.CharField(_("URL"), max_length=2048)
+    state = models.CharField(
+        _("State"), max_length=16, choices=State, default=State.PENDING
+    )
+    creation_time = models.DateTimeField(_("Created"), db_index=True)
+    update_time = models.DateTimeField(_("Updated"))
+    urls_checked = models.IntegerField(default=0)
+    urls_pending = models.IntegerField(default=0)
+    # Importer2Json of what has been gathered so far, then of the final
+    # merged and enriched import.
+    partial = models.JSONField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
@@ -1,6 +1,6 @@
 import re
 
-from django.db.models import Count, Q, prefetch_related_objects
+from django.db.models import Case, Count, Q, When, prefetch_related_objects
 from django.utils import timezone
 
 from .models import (
@@ -14,7 +14,6 @@ from .models import (
 )
 from .tools import (
     ComputeGameRating,
-    ComputeHonors,
     FormatDate,
     SnippetFromList,
 )
@@ -764,22 +763,15 @@ class SB_AuthorSorting(SearchBit):
         if self.method == self.GAME_COUNT:
             return query.order_by(("-" if self.desc else "") + "game_count")
 
-        return query
-
-    def NeedsFullSet(self):
-        return self.method in [self.HONOUR]
-
-    def ModifyResult(self, authors):
-        honors = ComputeHonors()
-        for x in authors:
-            x.honor = honors.get(x.id, 0.0)
         if self.method == self.HONOUR:
-            authors.sort(
-                key=lambda x: (self.desc != (x.honor == 0.0), x.honor),
-                reverse=self.desc,
+            # Authors without honor go last in both directions.
+            return query.order_by(
+                Case(When(stats__honor__gt=0, then=0), default=1),
+                ("-" if self.desc else "") + "stats__honor",
+                "id",
             )
 
-        return authors
+        return query
 
     def IsActive(self):
         return True
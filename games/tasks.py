@@ -1,12 +1,16 @@
+import os
+import os.path
 import re
 from logging import getLogger
 from urllib.parse import unquote
 
 from celery import shared_task
 from django.conf import settings
+from django.core.files import File
 
-from core.crawler import FetchUrlToFileLike
-from games.models import URL
+from core.crawler import FetchUrlToFile
+from games.linkcheck import run_linkcheck
+from games.models import URL, Game
 
 logger = getLogger("crawler")
 
@@ -23,26 +27,119 @@ def come_up_with_filename(metadata):
     return "unknown"
 
 
+class _SpooledFile(File):
+    """A finished download; the storage moves it into place, not copies."""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def _partial_download_path(url_id):
+    dirname = os.path.join(settings.TMP_DIR, "backups")
+    os.makedirs(dirname, exist_ok=True)
+    return os.path.join(dirname, "%d.part" % url_id)
+
+
+def _remove_partial_download(url_id):
+    part = _partial_download_path(url_id)
+    for path in [part, "%s.json" % part]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _bump_linked_games(url_id):
+    """Invalidates pages of games showing the url's backup or broken mark."""
+    Game.BumpRevision(
+        *Game.objects
+        .filter(gameurl__url=url_id)
+        .values_list("id", flat=True)
+        .distinct()
+    )
+
+
+def _find_stored_copy(content_hash, fs):
+    for local_filename, local_url in URL.objects.filter(
+        content_hash=content_hash,
+        is_uploaded=False,
+        local_filename__isnull=False,
+    ).values_list("local_filename", "local_url"):
+        if fs.exists(local_filename):
+            return local_filename, local_url
+    return None
+
+
+def backup_url(url):
+    """Streams url into BACKUPS_FS, sharing storage between identical files.
+
+    Files are stored under a directory derived from their sha256, and a URL
+    whose content is already backed up just references the existing file. An
+    interrupted download is left in TMP_DIR and resumed on the next attempt.
+    """
+    part = _partial_download_path(url.id)
+    metadata = FetchUrlToFile(url.original_url, part)
+    content_hash = metadata["sha256"]
+    fs = settings.BACKUPS_FS
+
+    if stored := _find_stored_copy(content_hash, fs):
+        os.remove(part)
+        filename, local_url = stored
+        logger.info("Same content already stored as %s", filename)
+    else:
+        name = "%s/%s/%s" % (
+            content_hash[:2],
+            content_hash[2:10],
+            come_up_with_filename(metadata),
+        )
+        with _SpooledFile(open(part, "rb"), name=part) as f:
+            filename = fs.save(name, f, max_length=80)
+        if os.path.exists(part):
+            os.remove(part)
+        local_url = fs.url(filename)
+        logger.info("Stored as %s", filename)
+
+    url.local_url = local_url
+    url.local_filename = filename
+    url.original_filename = metadata["filename"]
+    url.content_type = metadata["content-type"]
+    url.content_hash = content_hash
+    url.file_size = metadata["size"]
+    url.save()
+    _bump_linked_games(url.id)
+
+
 @shared_task(bind=True, max_retries=3, retry_backoff=True)
 def clone_file(self, url_id):
     url = URL.objects.get(id=url_id)
     try:
         logger.info("Url is id %d, URL %s", url.id, url.original_url)
-        f = FetchUrlToFileLike(url.original_url)
-        fs = settings.BACKUPS_FS
-        filename = fs.save(come_up_with_filename(f.metadata), f, max_length=64)
-        logger.info("Stored as %s", filename)
-
-        url.local_url = fs.url(filename)
-        url.local_filename = filename
-        url.original_filename = f.metadata["filename"]
-        url.content_type = f.metadata["content-type"]
-        url.file_size = fs.size(filename)
-        url.save()
+        backup_url(url)
     except Exception as exc:
         if self.request.retries >= self.max_retries:
             logger.warning("Found broken link at url: %s", url.original_url)
             url.is_broken = True
             url.save(update_fields=["is_broken"])
+            _bump_linked_games(url.id)
+            _remove_partial_download(url.id)
             raise
         raise self.retry(exc=exc)
+
+
+@shared_task
+def clone_files(url_ids):
+    for url_id in url_ids:
+        clone_file.delay(url_id)
+
+
+@shared_task
+def check_links(limit=None, threads=16, per_host=2):
+    return run_linkcheck(
+        limit=limit, threads=threads, per_host=per_host
+    ).__dict__
+
+
+@shared_task
+def run_import(job_id):
+    # games.importjob needs games.tools, which imports this module.
+    from games.importjob import RunImportJob
+
+    return RunImportJob(job_id).state
@@ -0,0 +1,181 @@
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from curation.manual_reconcile import choices_payload
+from games.authormerge import (
+    NEW_PERSONALITY,
+    ApplyAuthorMerges,
+    AuthorMergePlan,
+    DescribeAuthorMerges,
+)
+from games.dictionaries import AllEditorDictionaries
+from games.models import (
+    Game,
+    GameAuthor,
+    GameAuthorRole,
+    Personality,
+    PersonalityAlias,
+    PersonalityAliasRedirect,
+    PersonalityStats,
+)
+
+
+class AuthorMergeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initifdb", stdout=StringIO(), stderr=StringIO())
+
+    def setUp(self):
+        self.role = GameAuthorRole.objects.get(symbolic_id="author")
+
+    def person(self, name, bio=None):
+        person = Personality.objects.create(name=name, bio=bio)
+        alias = PersonalityAlias.objects.create(name=name, personality=person)
+        return person, alias
+
+    def game(self, *aliases):
+        game = Game.objects.create(title="Game", creation_time=now())
+        for alias in aliases:
+            GameAuthor.objects.create(game=game, author=alias, role=self.role)
+        return game
+
+    def credits(self, game):
+        return sorted(
+            GameAuthor.objects.filter(game=game).values_list(
+                "author__name", flat=True
+            )
+        )
+
+    def test_batch_merges_personalities(self):
+        alice, alice_alias = self.person("Alice", bio="First")
+        alice2, alice2_alias = self.person("Alice 2", bio="Second")
+        alice3, alice3_alias = self.person("Alice 3")
+        bob, bob_alias = self.person("Bob")
+        shared = self.game(alice_alias, alice2_alias, bob_alias)
+        self.game(alice3_alias)
+        revisions = dict(Game.objects.values_list("id", "revision"))
+
+        call_command(
+            "mergeauthors",
+            "%d:%d" % (alice3.id, alice2.id),
+            "%d:%d" % (alice2.id, alice.id),
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(
+            list(Personality.objects.order_by("id")), [alice, bob]
+        )
+        alice.refresh_from_db()
+        self.assertEqual(alice.bio, "First\n\nSecond")
+        self.assertEqual(
+            set(alice.personalityalias_set.values_list("name", flat=True)),
+            {"Alice", "Alice 2", "Alice 3"},
+        )
+        self.assertEqual(self.credits(shared), ["Alice", "Bob"])
+        self.assertEqual(
+            PersonalityStats.objects.get(personality=alice).game_count, 2
+        )
+        for id, revision in Game.objects.values_list("id", "revision"):
+            self.assertGreater(revision, revisions[id])
+
+    def test_merge_query_count_does_not_depend_on_batch_size(self):
+        def merge_queries(count):
+            target, target_alias = self.person("Target")
+            plan = AuthorMergePlan()
+            for i in range(count):
+                person, alias = self.person("Dup %d" % i)
+                self.game(target_alias, alias)
+                plan.personalities[person.id] = target.id
+            with CaptureQueriesContext(connection) as queries:
+                ApplyAuthorMerges(plan)
+            return len(queries)
+
+        self.assertEqual(merge_queries(1), merge_queries(5))
+
+    def test_alias_moves_renames_and_splits(self):
+        person, main = self.person("Main")
+        moved = PersonalityAlias.objects.create(
+            name="Moved", personality=person
+        )
+        deleted = PersonalityAlias.objects.create(
+            name="Deleted", personality=person
+        )
+        split = PersonalityAlias.objects.create(
+            name="Split", personality=person
+        )
+        game = self.game(main, moved, deleted)
+        other = self.game(moved, split)
+        plan = AuthorMergePlan(
+            renames={main.id: "Main Name"},
+            reassign={split.id: NEW_PERSONALITY},
+            moves={moved.id: main.id},
+            deletes={deleted.id},
+            redirects={"Moved": main.id, "Deleted": None},
+        )
+
+        with self.assertNumQueries(1):
+            log = DescribeAuthorMerges(plan)
+        self.assertEqual(
+            log,
+            [
+                "[Main] будет переименован в [Main Name]",
+                "Псевдоним [Moved] подмешается в [Main]",
+                "(и это будет автоматически происходить с"
+                " этим псевдонимом в будущем)",
+                "Псевдоним [Deleted] будет удалён",
+                "(и это будет автоматически происходить с"
+                " этим псевдонимом в будущем)",
+                "Для псведонима [Split] будет создана новая "
+                "свежая страница автора.",
+            ],
+        )
+
+        ApplyAuthorMerges(plan)
+
+        self.assertEqual(self.credits(game), ["Main Name"])
+        self.assertEqual(self.credits(other), ["Main Name", "Split"])
+        split.refresh_from_db()
+        self.assertEqual(split.personality.name, "Split")
+        self.assertNotEqual(split.personality_id, person.id)
+        self.assertEqual(
+            dict(
+                PersonalityAliasRedirect.objects.values_list(
+                    "name", "hidden_for"
+                )
+            ),
+            {"Moved": main.id, "Deleted": None},
+        )
+
+    def test_renames_refresh_cached_choices(self):
+        caches["default"].clear()
+        _, alias = self.person("Old Name")
+        AllEditorDictionaries()
+        choices_payload()
+
+        ApplyAuthorMerges(AuthorMergePlan(renames={alias.id: "New Name"}))
+
+        for authors in [
+            AllEditorDictionaries()["authortypes"]["authors"],
+            choices_payload()["authors"]["authors"],
+        ]:
+            names = [x["name"] for x in authors]
+            self.assertIn("New Name", names)
+            self.assertNotIn("Old Name", names)
+
+    def test_merge_cycle_is_rejected(self):
+        alice, _ = self.person("Alice")
+        bob, _ = self.person("Bob")
+
+        with self.assertRaises(ValueError):
+            ApplyAuthorMerges(
+                AuthorMergePlan(
+                    personalities={alice.id: bob.id, bob.id: alice.id}
+                )
+            )
+        self.assertEqual(Personality.objects.count(), 2)
@@ -0,0 +1,149 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from games.authorstats import RebuildAuthorStats, RefreshingAuthorStats
+from games.models import (
+    Game,
+    GameAuthor,
+    GameAuthorRole,
+    GameVote,
+    Personality,
+    PersonalityAlias,
+    PersonalityStats,
+)
+from games.search import MakeAuthorSearch, SB_AuthorSorting
+from games.tools import ComputeHonors
+from moder.actions.games_action import GameCloneAction, GameDeleteAction
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initifdb", stdout=StringIO(), stderr=StringIO())
+
+    def setUp(self):
+        self.author_role = GameAuthorRole.objects.get(symbolic_id="author")
+        self.other_role = GameAuthorRole.objects.exclude(
+            symbolic_id="author"
+        ).first()
+        self.voters = [
+            get_user_model().objects.create_user(
+                username="voter%d" % i, email="voter%d@example.com" % i
+            )
+            for i in range(4)
+        ]
+
+    def person(self, name):
+        person = Personality.objects.create(name=name)
+        alias = PersonalityAlias.objects.create(name=name, personality=person)
+        return person, alias
+
+    def game(self, alias, ratings=(), role=None, release_date=None):
+        game = Game.objects.create(
+            title="Game", creation_time=now(), release_date=release_date
+        )
+        GameAuthor.objects.create(
+            game=game, author=alias, role=role or self.author_role
+        )
+        for user, rating in zip(self.voters, ratings):
+            GameVote.objects.create(
+                game=game, user=user, star_rating=rating, creation_time=now()
+            )
+        return game
+
+    def test_rebuild_matches_live_computation(self):
+        alice, alice_alias = self.person("Alice")
+        bob, bob_alias = self.person("Bob")
+        self.game(alice_alias, [5, 4, 5], release_date=date(2010, 1, 1))
+        self.game(alice_alias, [2], release_date=date(2015, 1, 1))
+        shared = self.game(bob_alias, [3, 4])
+        GameAuthor.objects.create(
+            game=shared, author=alice_alias, role=self.other_role
+        )
+
+        RebuildAuthorStats()
+
+        honors = ComputeHonors()
+        alice_stats = PersonalityStats.objects.get(personality=alice)
+        self.assertAlmostEqual(alice_stats.honor, honors[alice.id])
+        self.assertAlmostEqual(bob.stats.honor, honors[bob.id])
+        self.assertEqual(alice_stats.game_count, 2)
+        self.assertEqual(alice_stats.vote_count, 4)
+        self.assertEqual(
+            alice_stats.role_counts,
+            {"author": 2, self.other_role.symbolic_id: 1},
+        )
+        self.assertEqual(alice_stats.first_release, date(2010, 1, 1))
+        self.assertEqual(alice_stats.last_release, date(2015, 1, 1))
+
+    def test_credit_changes_refresh_old_and_new_authors(self):
+        alice, alice_alias = self.person("Alice")
+        bob, bob_alias = self.person("Bob")
+        game = self.game(alice_alias, [5])
+        RebuildAuthorStats()
+
+        with RefreshingAuthorStats(game.id):
+            GameAuthor.objects.filter(game=game).update(author=bob_alias)
+
+        self.assertEqual(
+            PersonalityStats.objects.get(personality=alice).game_count, 0
+        )
+        self.assertEqual(
+            PersonalityStats.objects.get(personality=bob).game_count, 1
+        )
+
+    def test_game_clone_and_delete_refresh_authors(self):
+        alice, alice_alias = self.person("Alice")
+        game = self.game(alice_alias, [5])
+        RebuildAuthorStats()
+
+        GameCloneAction(None, game).DoAction(None, None, execute=True)
+        self.assertEqual(
+            PersonalityStats.objects.get(personality=alice).game_count, 2
+        )
+
+        for x in Game.objects.all():
+            GameDeleteAction(None, x).DoAction(None, None, execute=True)
+        self.assertEqual(
+            PersonalityStats.objects.get(personality=alice).game_count, 0
+        )
+
+    def test_vote_refreshes_honor(self):
+        alice, alice_alias = self.person("Alice")
+        game = self.game(alice_alias)
+        RebuildAuthorStats()
+        self.assertEqual(alice.stats.honor, 0.0)
+        self.client.force_login(self.voters[0])
+
+        self.client.post(
+            reverse("vote_game"), {"game_id": game.id, "score": 5}
+        )
+
+        self.assertAlmostEqual(
+            PersonalityStats.objects.get(personality=alice).honor,
+            ComputeHonors(alice.id),
+        )
+
+    def test_honor_sorting_keeps_authors_without_honor_last(self):
+        low, low_alias = self.person("Low")
+        high, high_alias = self.person("High")
+        none, _ = self.person("None")
+        self.game(low_alias, [1])
+        self.game(high_alias, [5, 5])
+        RebuildAuthorStats()
+
+        def order(desc):
+            search = MakeAuthorSearch(lambda perm: True)
+            sorting = search.id_to_bit[SB_AuthorSorting.TYPE_ID]
+            sorting.method = SB_AuthorSorting.HONOUR
+            sorting.desc = desc
+            return list(search.Search(start=0, limit=10))
+
+        self.assertEqual(order(desc=True), [high, low, none])
+        self.assertEqual(order(desc=False), [low, high, none])
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import os.path
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from games.models import URL, Game, GameURL, GameURLCategory
+from games.tasks import backup_url, clone_file
+
+LARGE_FILE = os.urandom(3 * 1024 * 1024 + 17)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves LARGE_FILE under any path, honouring single open-ended ranges.
+
+    Under ``/shifted/`` ranges are answered from the start of the file.
+    """
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("Range"))
+        body = LARGE_FILE
+        status = 200
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") in (None, '"v1"'):
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if self.path.startswith("/shifted/"):
+                start = 0
+            body = LARGE_FILE[start:]
+            status = 206
+        self.send_response(status)
+        if status == 206:
+            self.send_header(
+                "Content-Range",
+                "bytes %d-%d/%d"
+                % (start, len(LARGE_FILE) - 1, len(LARGE_FILE)),
+            )
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BackupUrlTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = "http://127.0.0.1:%d" % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.fs = FileSystemStorage(os.path.join(self.root, "backups"), "/b/")
+        settings = override_settings(
+            BACKUPS_FS=self.fs, TMP_DIR=os.path.join(self.root, "tmp")
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def make_url(self, path):
+        return URL.objects.create(
+            original_url=self.base_url + path,
+            creation_date=timezone.now(),
+            ok_to_clone=True,
+        )
+
+    def link_game(self, url):
+        category = GameURLCategory.objects.create(
+            symbolic_id="download_direct", title="Download"
+        )
+        game = Game.objects.create(title="Game", creation_time=timezone.now())
+        GameURL.objects.create(game=game, url=url, category=category)
+        return game
+
+    def make_part(self, url, content, validator):
+        part = os.path.join(self.root, "tmp", "backups", "%d.part" % url.id)
+        os.makedirs(os.path.dirname(part))
+        with open(part, "wb") as f:
+            f.write(content)
+        with open(part + ".json", "w") as f:
+            f.write(
+                '{"url": "%s", "validator": "\\"%s\\""}'
+                % (url.original_url, validator)
+            )
+        return part
+
+    def test_stores_file_under_content_hash(self):
+        url = self.make_url("/files/game.zip")
+        game = self.link_game(url)
+
+        backup_url(url)
+
+        game.refresh_from_db()
+        self.assertEqual(game.revision, 1)
+
+        url.refresh_from_db()
+        digest = hashlib.sha256(LARGE_FILE).hexdigest()
+        self.assertEqual(url.content_hash, digest)
+        self.assertEqual(url.file_size, len(LARGE_FILE))
+        self.assertEqual(
+            url.local_filename, "%s/%s/game.zip" % (digest[:2], digest[2:10])
+        )
+        self.assertEqual(url.local_url, "/b/" + url.local_filename)
+        with self.fs.open(url.local_filename) as f:
+            self.assertEqual(f.read(), LARGE_FILE)
+
+    def test_identical_content_is_stored_once(self):
+        first = self.make_url("/a/game.zip")
+        second = self.make_url("/b/other.zip")
+
+        backup_url(first)
+        backup_url(second)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.local_filename, first.local_filename)
+        self.assertEqual(second.local_url, first.local_url)
+        stored = [
+            os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(self.fs.location)
+            for name in names
+        ]
+        self.assertEqual(len(stored), 1)
+
+    def test_resumes_partial_download_with_range(self):
+        url = self.make_url("/files/game.zip")
+        part = self.make_part(url, LARGE_FILE[:1000000], "v1")
+
+        backup_url(url)
+
+        url.refresh_from_db()
+        self.assertEqual(self.server.requests, ["bytes=1000000-"])
+        self.assertEqual(
+            url.content_hash, hashlib.sha256(LARGE_FILE).hexdigest()
+        )
+        with self.fs.open(url.local_filename) as f:
+            self.assertEqual(f.read(), LARGE_FILE)
+        self.assertFalse(os.path.exists(part))
+        self.assertFalse(os.path.exists(part + ".json"))
+
+    def test_restarts_when_remote_file_changed(self):
+        url = self.make_url("/files/game.zip")
+        self.make_part(url, b"stale prefix of an older upload", "v0")
+
+        backup_url(url)
+
+        url.refresh_from_db()
+        self.assertEqual(url.file_size, len(LARGE_FILE))
+        with self.fs.open(url.local_filename) as f:
+            self.assertEqual(f.read(), LARGE_FILE)
+
+    def test_restarts_when_server_sends_another_range(self):
+        url = self.make_url("/shifted/game.zip")
+        self.make_part(url, LARGE_FILE[:1000000], "v1")
+
+        backup_url(url)
+
+        url.refresh_from_db()
+        self.assertEqual(self.server.requests, ["bytes=1000000-", None])
+        with self.fs.open(url.local_filename) as f:
+            self.assertEqual(f.read(), LARGE_FILE)
+
+    def test_gives_up_without_leaving_partial_download(self):
+        url = URL.objects.create(
+            original_url="http://127.0.0.1:1/game.zip",
+            creation_date=timezone.now(),
+            ok_to_clone=True,
+        )
+        part = self.make_part(url, b"prefix", "v1")
+        game = self.link_game(url)
+
+        with self.assertLogs("celery.app.trace", "ERROR"):
+            result = clone_file.apply(args=[url.id], retries=3)
+
+        self.assertTrue(result.failed())
+        url.refresh_from_db()
+        self.assertTrue(url.is_broken)
+        game.refresh_from_db()
+        self.assertEqual(game.revision, 1)
+        self.assertFalse(os.path.exists(part))
+        self.assertFalse(os.path.exists(part + ".json"))
@@ -0,0 +1,139 @@
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+
+from games.game_details import BuildCommentThreads, GameDetailsBuilder
+from games.models import Game, GameComment, GameCommentVote
+
+START = datetime(2024, 1, 1)
+
+
+def _comment(comment_id, parent_id=None):
+    return {
+        "id": comment_id,
+        "parent_id": parent_id,
+        "created_raw": START + timedelta(minutes=comment_id),
+    }
+
+
+class BuildCommentThreadsTest(TestCase):
+    def ids(self, comments):
+        return [c["id"] for c in BuildCommentThreads(comments)]
+
+    def test_replies_follow_their_thread(self):
+        comments = [
+            _comment(1),
+            _comment(2),
+            _comment(3, parent_id=1),
+            _comment(4, parent_id=2),
+            _comment(5, parent_id=3),
+            _comment(6),
+            _comment(7, parent_id=1),
+        ]
+
+        self.assertEqual(self.ids(comments), [1, 3, 5, 7, 2, 4, 6])
+
+    def test_orphans_and_loops_start_threads(self):
+        comments = [
+            _comment(1, parent_id=99),
+            _comment(2, parent_id=3),
+            _comment(3, parent_id=2),
+            _comment(4, parent_id=1),
+        ]
+
+        self.assertEqual(sorted(self.ids(comments)), [1, 2, 3, 4])
+        self.assertEqual(self.ids(comments)[:2], [1, 4])
+
+    def test_deep_thread_benchmark(self):
+        size = 20000
+        chain = [_comment(1)] + [
+            _comment(i, parent_id=i - 1) for i in range(2, size + 1)
+        ]
+        wide = [_comment(1)] + [
+            _comment(i, parent_id=1 if i % 2 else i - 1)
+            for i in range(2, size + 1)
+        ]
+
+        started = time.monotonic()
+        self.assertEqual(self.ids(chain), list(range(1, size + 1)))
+        self.assertEqual(self.ids(wide), list(range(1, size + 1)))
+        self.assertLess(time.monotonic() - started, 5)
+
+
+class GameCommentsTest(TestCase):
+    def setUp(self):
+        self.game = Game.objects.create(title="Game", creation_time=START)
+        users = get_user_model().objects
+        self.author = users.create(username="author", email="a@example.com")
+        self.reader = users.create(username="reader", email="r@example.com")
+
+    def builder(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        request.perm = Mock()
+        return GameDetailsBuilder(self.game.id, request)
+
+    def make_thread(self, size):
+        comments = GameComment.objects.bulk_create(
+            GameComment(
+                game=self.game,
+                user=self.author,
+                creation_time=START + timedelta(minutes=i),
+                text="comment %d" % i,
+            )
+            for i in range(size)
+        )
+        for i, comment in enumerate(comments[1:], 1):
+            comment.parent = comments[(i - 1) // 2]
+        GameComment.objects.bulk_update(comments, ["parent"])
+        return comments
+
+    def test_votes_are_aggregated(self):
+        first, second = self.make_thread(2)
+        GameCommentVote.objects.bulk_create([
+            GameCommentVote(
+                comment=first, user=self.reader, vote=1, vote_time=START
+            ),
+            GameCommentVote(
+                comment=first, user=self.author, vote=-1, vote_time=START
+            ),
+        ])
+
+        comments = self.builder(self.reader).GetGameComments()
+
+        self.assertEqual([c["id"] for c in comments], [first.id, second.id])
+        self.assertEqual(
+            comments[0]["likes"],
+            {"likes": 1, "dislikes": 1, "allow_vote": True, "own_vote": 1},
+        )
+        self.assertEqual(
+            comments[1]["likes"],
+            {"likes": 0, "dislikes": 0, "allow_vote": True, "own_vote": 0},
+        )
+        own = self.builder(self.author).GetGameComments()
+        self.assertEqual(own[0]["likes"]["own_vote"], -1)
+        self.assertFalse(own[0]["likes"]["allow_vote"])
+        anonymous = self.builder(AnonymousUser()).GetGameComments()
+        self.assertFalse(anonymous[0]["likes"]["allow_vote"])
+
+    def test_large_thread_uses_constant_queries(self):
+        comments = self.make_thread(2000)
+        GameCommentVote.objects.bulk_create(
+            GameCommentVote(
+                comment=c, user=self.reader, vote=1, vote_time=START
+            )
+            for c in comments[::3]
+        )
+        builder = self.builder(self.reader)
+
+        with self.assertNumQueries(3):
+            result = builder.GetGameComments()
+
+        self.assertEqual(len(result), 2000)
+        self.assertEqual(
+            sum(c["likes"]["likes"] for c in result), len(comments[::3])
+        )
@@ -0,0 +1,147 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from games.models import GameTag, GameTagCategory, PersonalityAlias
+from games.views import ALIAS_COMPLETE_LIMIT
+
+
+class EditorDictionariesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initifdb", stdout=StringIO(), stderr=StringIO())
+
+    def setUp(self):
+        caches["default"].clear()
+        self.user = get_user_model().objects.create_user(
+            username="user", email="user@example.com", password="pw"
+        )
+        self.client.force_login(self.user)
+        self.url = reverse("json_editor_dictionaries")
+
+    def add_tags(self, count):
+        start = GameTagCategory.objects.count()
+        for i in range(start, start + count):
+            category = GameTagCategory.objects.create(
+                symbolic_id="extra%d" % i, name="Extra %d" % i
+            )
+            GameTag.objects.create(category=category, name="Tag %d" % i)
+
+    def queries(self):
+        caches["default"].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return len(queries), response.json()
+
+    def test_fixed_number_of_queries(self):
+        self.add_tags(1)
+        small, _ = self.queries()
+
+        self.add_tags(10)
+        PersonalityAlias.objects.bulk_create(
+            PersonalityAlias(name="Alias %d" % i) for i in range(50)
+        )
+        large, response = self.queries()
+
+        self.assertEqual(small, large)
+        names = [x["name"] for x in response["authortypes"]["authors"]]
+        self.assertIn("Alias 42", names)
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+    def test_etag_and_versioned_caching(self):
+        response = self.client.get(self.url)
+        version = response.json()["version"]
+        self.assertEqual(response["ETag"], '"%s"' % version)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH='"%s"' % version
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, {"v": version})
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+    def test_version_changes_with_new_alias(self):
+        gameinfo = reverse("json_gameinfo")
+        before = self.client.get(gameinfo, {"dictionaries": "0"}).json()
+        self.assertNotIn("authortypes", before)
+
+        PersonalityAlias.objects.create(name="Newcomer")
+
+        after = self.client.get(gameinfo, {"dictionaries": "0"}).json()
+        self.assertNotEqual(
+            before["dictionaries_version"], after["dictionaries_version"]
+        )
+        dictionaries = self.client.get(
+            self.url, {"v": after["dictionaries_version"]}
+        ).json()
+        self.assertIn(
+            "Newcomer",
+            [x["name"] for x in dictionaries["authortypes"]["authors"]],
+        )
+
+    def test_version_changes_with_renames(self):
+        alias = PersonalityAlias.objects.create(name="Old name")
+        before = self.client.get(self.url).json()["version"]
+
+        alias.name = "New name"
+        alias.save()
+        renamed = self.client.get(self.url).json()
+        self.assertNotEqual(renamed["version"], before)
+        self.assertIn(
+            "New name",
+            [x["name"] for x in renamed["authortypes"]["authors"]],
+        )
+
+        category = GameTagCategory.objects.get(symbolic_id="tag")
+        category.name = "Renamed"
+        category.save()
+        self.assertNotEqual(
+            self.client.get(self.url).json()["version"], renamed["version"]
+        )
+
+    def test_hidden_categories_are_filtered_per_user(self):
+        GameTagCategory.objects.create(
+            symbolic_id="secret", name="Secret", show_in_edit_perm="@admin"
+        )
+
+        response = self.client.get(self.url).json()
+
+        self.assertNotIn(
+            "Secret",
+            [x["name"] for x in response["tagtypes"]["categories"]],
+        )
+
+    def test_alias_prefix_complete(self):
+        for name in ["Anna", "anastasia", "Boris", "Anna-Maria"]:
+            PersonalityAlias.objects.create(name=name)
+
+        response = self.client.get(
+            reverse("json_alias_complete"), {"q": "an", "limit": "2"}
+        )
+
+        self.assertEqual(
+            [x["name"] for x in response.json()["authors"]],
+            ["Anna", "Anna-Maria"],
+        )
+
+    def test_alias_complete_checks_limit(self):
+        url = reverse("json_alias_complete")
+        for limit in ["many", "0", "-5"]:
+            with self.assertLogs("django.security", "ERROR"):
+                response = self.client.get(url, {"q": "an", "limit": limit})
+            self.assertEqual(response.status_code, 400)
+
+        for i in range(ALIAS_COMPLETE_LIMIT + 5):
+            PersonalityAlias.objects.create(name="Anna %02d" % i)
+        response = self.client.get(url, {"q": "an", "limit": "1000"})
+        self.assertEqual(len(response.json()["authors"]), ALIAS_COMPLETE_LIMIT)
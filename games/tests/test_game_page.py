@@ -0,0 +1,97 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from games.game_details import GameDetailsBuilder
+from games.models import Game, GameComment, GameTag, GameTagCategory, GameVote
+
+
+class GamePageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initifdb", stdout=StringIO(), stderr=StringIO())
+
+    def setUp(self):
+        caches["default"].clear()
+        caches["game-pages"].clear()
+        self.user = get_user_model().objects.create_user(
+            username="user", email="user@example.com", password="pw"
+        )
+        self.game = Game.objects.create(
+            title="Cached Game", description="*Shared*", creation_time=now()
+        )
+        self.page = reverse("show_game", args=[self.game.id])
+
+    def test_shared_part_is_built_once_per_revision(self):
+        other = get_user_model().objects.create_user(
+            username="other", email="other@example.com", password="pw"
+        )
+        GameVote.objects.create(
+            game=self.game,
+            user=other,
+            star_rating=4,
+            creation_time=now(),
+            edit_time=now(),
+        )
+        with patch.object(
+            GameDetailsBuilder,
+            "BuildSharedDict",
+            autospec=True,
+            side_effect=GameDetailsBuilder.BuildSharedDict,
+        ) as build:
+            self.client.get(self.page)
+            self.client.force_login(other)
+            response = self.client.get(self.page)
+            self.assertEqual(build.call_count, 1)
+
+            Game.BumpRevision(self.game.id)
+            self.client.get(self.page)
+            self.assertEqual(build.call_count, 2)
+
+        votes = response.context["votes"]
+        self.assertTrue(votes["user_played"])
+        self.assertEqual(votes["user_score"], 4)
+        self.assertEqual(votes["played_count"], 1)
+
+    def test_tag_rename_changes_the_page(self):
+        tag = GameTag.objects.create(
+            category=GameTagCategory.objects.get(symbolic_id="tag"),
+            name="Old name",
+        )
+        self.game.tags.add(tag)
+        self.assertContains(self.client.get(self.page), "Old name")
+
+        tag.name = "New name"
+        tag.save()
+        self.assertContains(self.client.get(self.page), "New name")
+
+    def test_not_modified_until_game_changes(self):
+        self.client.force_login(self.user)
+        self.client.get(self.page)
+        response = self.client.get(self.page)
+        etag = response["ETag"]
+
+        response = self.client.get(self.page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(
+            reverse("comment_game"),
+            {"game_id": self.game.id, "text": "Fresh comment"},
+        )
+        response = self.client.get(self.page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "Fresh comment")
+        self.assertEqual(GameComment.objects.get().game, self.game)
+
+    def test_etag_depends_on_user(self):
+        anonymous = self.client.get(self.page)["ETag"]
+        self.client.force_login(self.user)
+
+        self.assertNotEqual(self.client.get(self.page)["ETag"], anonymous)
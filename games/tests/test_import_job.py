@@ -0,0 +1,148 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from games.importer import Importer
+from games.importjob import IMPORT_JOB_STALE_AFTER, RunImportJob, _UpdateJob
+from games.models import GameURLCategory, ImportJob
+
+PAGES = {
+    "http://ifwiki.test/game": {
+        "title": "Тестовая игра",
+        "desc": "С вики",
+        "priority": 10,
+        "urls": [
+            {
+                "url": "http://forum.test/game",
+                "urlcat_slug": "game_page",
+                "description": "Форум",
+            }
+        ],
+    },
+    "http://forum.test/game": {
+        "title": "Тестовая игра",
+        "desc": "С форума",
+    },
+}
+
+
+def _Dispatch(self, url):
+    return dict(PAGES[url])
+
+
+class ImportJobTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command("initifdb", stdout=StringIO(), stderr=StringIO())
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="user", email="user@example.com", password="pw"
+        )
+        self.client.force_login(self.user)
+        for name, value in [
+            ("DispatchImport", _Dispatch),
+            ("IsFamiliarUrl", lambda self, url, cat: True),
+        ]:
+            patcher = patch.object(Importer, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start(self, url):
+        with patch("games.importjob.run_import.delay") as delay:
+            response = self.client.get(reverse("import"), {"url": url})
+        job_id = response.json()["job_id"]
+        delay.assert_called_once_with(job_id)
+        self.assertEqual(response.json()["state"], "PENDING")
+        return job_id
+
+    def status(self, job_id):
+        return self.client.get(reverse("import_status", args=[job_id])).json()
+
+    def test_runs_in_background_and_reports_result(self):
+        job_id = self.start("http://ifwiki.test/game")
+        progress = []
+
+        def Snapshot(update_job):
+            def Update(job, **fields):
+                update_job(job, **fields)
+                progress.append(self.status(job_id))
+
+            return Update
+
+        with patch("games.importjob._UpdateJob", Snapshot(_UpdateJob)):
+            RunImportJob(job_id)
+
+        self.assertEqual(
+            [
+                (p["state"], p["urls_checked"], p["urls_pending"])
+                for p in progress
+            ],
+            [
+                ("RUNNING", 0, 0),
+                ("RUNNING", 1, 1),
+                ("RUNNING", 2, 0),
+                ("DONE", 2, 0),
+            ],
+        )
+        self.assertEqual(progress[1]["partial"]["desc"], "С вики")
+        result = self.status(job_id)["result"]
+        self.assertEqual(result["title"], "Тестовая игра")
+        self.assertEqual(result["desc"], "С вики\n\n---\n\nС форума")
+        self.assertEqual(
+            result["links"],
+            [
+                [
+                    GameURLCategory.objects.get(symbolic_id="game_page").id,
+                    "Форум",
+                    "http://forum.test/game",
+                ]
+            ],
+        )
+
+    def test_import_error_fails_job(self):
+        PAGES["http://unknown.test/"] = {"error": "Ссылка на неизвестный"}
+        self.addCleanup(PAGES.pop, "http://unknown.test/")
+        job_id = self.start("http://unknown.test/")
+
+        RunImportJob(job_id)
+
+        self.assertEqual(
+            self.status(job_id),
+            {
+                "job_id": job_id,
+                "state": "FAILED",
+                "urls_checked": 1,
+                "urls_pending": 0,
+                "error": "Ссылка на неизвестный",
+            },
+        )
+
+    def test_stale_job_fails_when_polled(self):
+        job_id = self.start("http://ifwiki.test/game")
+        self.assertEqual(self.status(job_id)["state"], "PENDING")
+
+        ImportJob.objects.filter(id=job_id).update(
+            update_time=timezone.now() - IMPORT_JOB_STALE_AFTER
+        )
+
+        status = self.status(job_id)
+        self.assertEqual(status["state"], "FAILED")
+        self.assertIn("error", status)
+
+    def test_jobs_are_private(self):
+        job_id = self.start("http://ifwiki.test/game")
+        other = get_user_model().objects.create_user(
+            username="other", email="other@example.com", password="pw"
+        )
+        self.client.force_login(other)
+
+        response = self.client.get(reverse("import_status", args=[job_id]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(ImportJob.objects.get().state, "PENDING")
@@ -0,0 +1,181 @@
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from games.linkcheck import _interleave_by_host, due_urls, run_linkcheck
+from games.models import URL, Game, GameURL, GameURLCategory, GameVote
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    """``/<code>`` answers with that code; ``/nohead`` rejects HEAD.
+
+    ``/flaky`` answers 503 to its first two requests and 200 afterwards.
+    """
+
+    def status(self):
+        path = self.path.split("?")[0]
+        if path == "/flaky":
+            return 503 if len(self.server.requests) <= 2 else 200
+        return 200 if path == "/nohead" else int(path.strip("/"))
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path))
+        if self.path == "/nohead":
+            self.send_response(405)
+        else:
+            self.send_response(self.status())
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        code = self.status()
+        self.send_response(code)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LinkCheckTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StatusHandler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = "http://127.0.0.1:%d" % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.category = GameURLCategory.objects.create(
+            symbolic_id="download_direct", title="Download"
+        )
+
+    def link(self, url, votes=0, **kwargs):
+        game = Game.objects.create(title=url, creation_time=timezone.now())
+        url = URL.objects.create(
+            original_url=url, creation_date=timezone.now(), **kwargs
+        )
+        GameURL.objects.create(game=game, url=url, category=self.category)
+        for i in range(votes):
+            user = get_user_model().objects.create(
+                username="voter%d-%d" % (url.id, i),
+                email="voter%d-%d@example.com" % (url.id, i),
+            )
+            GameVote.objects.create(
+                game=game,
+                user=user,
+                star_rating=5,
+                creation_time=timezone.now(),
+            )
+        return url
+
+    def test_records_status_and_broken_flag(self):
+        ok = self.link(self.base_url + "/200")
+        missing = self.link(self.base_url + "/404", is_broken=False)
+
+        stats = run_linkcheck(threads=4, retry_delay=0)
+
+        self.assertEqual((stats.checked, stats.ok, stats.broken), (2, 1, 1))
+        ok.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(ok.check_status, 200)
+        self.assertFalse(ok.is_broken)
+        self.assertIsNotNone(ok.last_checked)
+        self.assertEqual(missing.check_status, 404)
+        self.assertTrue(missing.is_broken)
+
+    def test_falls_back_to_get_when_head_is_rejected(self):
+        url = self.link(self.base_url + "/nohead", is_broken=True)
+
+        run_linkcheck()
+
+        url.refresh_from_db()
+        self.assertEqual(url.check_status, 200)
+        self.assertFalse(url.is_broken)
+        self.assertEqual(
+            self.server.requests, [("HEAD", "/nohead"), ("GET", "/nohead")]
+        )
+
+    def test_failure_is_retried(self):
+        url = self.link(self.base_url + "/flaky")
+
+        stats = run_linkcheck(retry_delay=0)
+
+        self.assertEqual((stats.ok, stats.broken), (1, 0))
+        url.refresh_from_db()
+        self.assertEqual(url.check_status, 200)
+        self.assertFalse(url.is_broken)
+        self.assertEqual(
+            self.server.requests,
+            [("HEAD", "/flaky"), ("GET", "/flaky"), ("HEAD", "/flaky")],
+        )
+
+    def test_unreachable_host_is_broken(self):
+        url = self.link("http://127.0.0.1:1/200")
+
+        run_linkcheck(timeout=5, retry_delay=0)
+
+        url.refresh_from_db()
+        self.assertIsNone(url.check_status)
+        self.assertTrue(url.is_broken)
+        self.assertIsNotNone(url.last_checked)
+
+    def test_due_urls_prefers_popular_games_and_skips_fresh_checks(self):
+        quiet = self.link(self.base_url + "/200?quiet")
+        popular = self.link(self.base_url + "/200?popular", votes=2)
+        self.link(self.base_url + "/200?fresh", last_checked=timezone.now())
+        stale = self.link(
+            self.base_url + "/200?stale",
+            votes=1,
+            last_checked=timezone.now() - timedelta(days=90),
+        )
+        URL.objects.create(
+            original_url=self.base_url + "/200?orphan",
+            creation_date=timezone.now(),
+        )
+
+        self.assertEqual(list(due_urls()), [popular, stale, quiet])
+
+    def test_writes_results_in_bulk(self):
+        for i in range(5):
+            self.link(self.base_url + "/200?%d" % i)
+
+        with self.assertNumQueries(2):
+            stats = run_linkcheck(threads=2)
+
+        self.assertEqual(stats.ok, 5)
+        self.assertEqual(URL.objects.filter(check_status=200).count(), 5)
+
+    def test_interleave_by_host(self):
+        urls = [
+            URL(original_url=u)
+            for u in [
+                "http://a.org/1",
+                "http://a.org/2",
+                "http://a.org/3",
+                "http://b.org/1",
+            ]
+        ]
+
+        self.assertEqual(
+            [u.original_url for u in _interleave_by_host(urls)],
+            [
+                "http://a.org/1",
+                "http://b.org/1",
+                "http://a.org/2",
+                "http://a.org/3",
+            ],
+        )
@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import markdown
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from games.tools import (
+    MARKDOWN_EXTENSIONS,
+    RenderMarkdown,
+    RenderMarkdownBatch,
+)
+
+TEXTS = [
+    "# Title\n\nSome *text* with a [link](http://example.com).",
+    'Title: meta\n\nBody with "quotes" -- and [[WikiLink]].',
+    "| a | b |\n|---|---|\n| 1 | 2 |\n\nFootnote[^1].\n\n[^1]: Note.",
+    "++inserted++ and ~~deleted~~",
+]
+
+
+class _Provider:
+    def __init__(self):
+        self.calls = 0
+
+    def render_counter(self):
+        self.calls += 1
+        return "<b>%d</b>" % self.calls
+
+
+class RenderMarkdownTest(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_matches_fresh_renderer(self):
+        for text in TEXTS + TEXTS:
+            self.assertEqual(
+                RenderMarkdown(text),
+                markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS),
+            )
+
+    def test_empty_content(self):
+        self.assertEqual(RenderMarkdown(""), "")
+        self.assertEqual(RenderMarkdown(None), "")
+        self.assertEqual(
+            RenderMarkdownBatch(["", "*a*"]), ["", "<p><em>a</em></p>"]
+        )
+
+    def test_renders_each_text_once(self):
+        with patch(
+            "games.tools._RenderMarkdownUncached", wraps=lambda x: x.upper()
+        ) as render:
+            first = RenderMarkdownBatch(TEXTS + [TEXTS[0]])
+            second = RenderMarkdownBatch(TEXTS)
+            single = RenderMarkdown(TEXTS[1])
+
+        self.assertEqual(render.call_count, len(TEXTS))
+        self.assertEqual(first[: len(TEXTS)], second)
+        self.assertEqual(single, TEXTS[1].upper())
+
+    def test_snippets_are_not_cached(self):
+        provider = _Provider()
+
+        self.assertIn("<b>1</b>", RenderMarkdown("{{counter}}", provider))
+        self.assertIn("<b>2</b>", RenderMarkdown("{{counter}}", provider))
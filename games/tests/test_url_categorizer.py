@@ -1,6 +1,19 @@
 import unittest
 
-from games.importer.tools import CategorizeUrl
+from django.test import TestCase
+from django.utils import timezone
+
+from core.management.commands.batchjob import BenchmarkUrlCategorizer
+from games.importer.tools import (
+    AUTHOR_URL_CATEGORIZER_RULES,
+    AUTHOR_URL_RULES,
+    GAME_URL_RULES,
+    URL_CATEGORIZER_RULES,
+    CategorizeAuthorUrl,
+    CategorizeUrl,
+    HashizeUrl,
+)
+from games.models import URL
 
 
 class TestUrlCategorizer(unittest.TestCase):
@@ -25,3 +38,94 @@ class TestUrlCategorizer(unittest.TestCase):
         result = CategorizeUrl("https://vkvideo.ru/video-1_456")
 
         self.assertEqual(result["urlcat_slug"], "video")
+
+
+def _SampleUrls():
+    hosts = {
+        host
+        .lstrip("@")
+        .replace(r"\.", ".")
+        .replace(".*", "x")
+        .replace("+", "")
+        for rules in (URL_CATEGORIZER_RULES, AUTHOR_URL_CATEGORIZER_RULES)
+        for host, *_ in rules
+    } | {"example.com", "kril.ifiction.ru", "www.ifwiki.ru"}
+    paths = [
+        "",
+        "/",
+        "/files/game.zip",
+        "/screenshots/1.png",
+        "/poster.JPG",
+        "/game.php",
+        "/urq/forum/files/x.qst",
+        "/online/view/12",
+        "/online/mitril/download/1/pdf/",
+        "/download/game",
+        "/forum/topic",
+        "/instead-em/game",
+        "/posts/1",
+        "/tools/aero/game",
+        "/download.php",
+        "/comments.php",
+        "/%D0%A3%D1%87%D0%B0%D1%81%D1%82%D0%BD%D0%B8%D0%BA%D0%B8/x",
+    ]
+    queries = ["", "?a=dd_download", "?id=1"]
+    urls = ["relative/path.zip", "/local.png", "mailto:someone@example.com"]
+    for host in sorted(hosts):
+        for path in paths:
+            for query in queries:
+                urls.append("http://%s%s%s" % (host, path, query))
+    return urls
+
+
+class TestIndexedUrlRules(unittest.TestCase):
+    def test_same_result_as_linear_scan(self):
+        for rules in (GAME_URL_RULES, AUTHOR_URL_RULES):
+            for url in _SampleUrls():
+                self.assertEqual(
+                    rules.Match(url), rules.MatchLinear(url), (rules, url)
+                )
+
+    def test_generic_rules_keep_their_precedence(self):
+        self.assertEqual(
+            CategorizeUrl("http://ifwiki.ru/files/screenshot.png")[
+                "urlcat_slug"
+            ],
+            "screenshot",
+        )
+        self.assertEqual(
+            CategorizeUrl("http://ifwiki.ru/files/game.zip")["urlcat_slug"],
+            "download_direct",
+        )
+        self.assertEqual(
+            CategorizeUrl("https://someone.github.io/game")["urlcat_slug"],
+            "play_online",
+        )
+
+    def test_author_host_regex_applies_to_relative_urls(self):
+        self.assertEqual(
+            CategorizeAuthorUrl("/")["urlcat_slug"], "personal_page"
+        )
+        self.assertEqual(CategorizeUrl("/")["urlcat_slug"], "unknown")
+
+    def test_memoized_results_are_not_shared(self):
+        first = CategorizeUrl("https://vkvideo.ru/video-1_456")
+        first["description"] = "changed"
+
+        second = CategorizeUrl("https://vkvideo.ru/video-1_456")
+
+        self.assertEqual(second["description"], "Видео игры")
+        self.assertEqual(
+            HashizeUrl("http://ifwiki.ru/Игра#top"),
+            "//ifwiki.ru/%D0%98%D0%B3%D1%80%D0%B0#top",
+        )
+
+
+class BenchmarkUrlCategorizerTest(TestCase):
+    def test_no_mismatches_over_url_table(self):
+        URL.objects.bulk_create(
+            URL(original_url=url, creation_date=timezone.now())
+            for url in _SampleUrls()[:200]
+        )
+
+        self.assertEqual(BenchmarkUrlCategorizer(), 0)
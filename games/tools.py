@@ -1,17 +1,21 @@
+import hashlib
 import re
 import statistics
+import threading
 from urllib.parse import parse_qs, urlparse
 from xml.etree import ElementTree as etree
 
 import markdown
 from django import template
+from django.core.cache import caches
+from django.db import transaction
 from django.db.models import F
 from django.utils import timezone
 from markdown.blockprocessors import BlockProcessor
 from markdown.extensions import Extension
 from markdown.util import AtomicString
 
-from games.tasks import clone_file
+from games.tasks import clone_file, clone_files
 
 from .models import URL, GameURL, GameVote
 
@@ -196,6 +200,20 @@ def ComputeGameRating(votes):
     return ds
 
 
+def HonorFromGameVotes(games):
+    """Honor of an author from star ratings of their games.
+
+    `games` maps game id to the list of its star ratings.
+    """
+    gams = []
+    for votes in games.values():
+        gams.append(DiscountRating(sum(votes) / len(votes), len(votes)))
+    gams.sort()
+    games_to_consider = len(gams) - int(len(gams) * 0.26)
+    sms = sum(gams[-games_to_consider:]) / games_to_consider
+    return DiscountRating(sms, len(games), P1=2.3, P2=0.2, P3=2.4)
+
+
 def ComputeHonors(author=None):
     xs = dict()
     votes = GameVote.objects.filter(
@@ -212,15 +230,7 @@ def ComputeHonors(author=None):
             x.star_rating
         )
 
-    res = dict()
-    for a, games in xs.items():
-        gams = []
-        for votes in games.values():
-            gams.append(DiscountRating(sum(votes) / len(votes), len(votes)))
-        gams.sort()
-        games_to_consider = len(gams) - int(len(gams) * 0.26)
-        sms = sum(gams[-games_to_consider:]) / games_to_consider
-        res[a] = DiscountRating(sms, len(games), P1=2.3, P2=0.2, P3=2.4)
+    res = {a: HonorFromGameVotes(games) for a, games in xs.items()}
     if author:
         return res.get(author, 0.0)
     else:
@@ -302,17 +312,68 @@ class MarkdownSnippet(Extension):
         md.parser.blockprocessors.register(processor, "snippets", 200)
 
 
+MARKDOWN_EXTENSIONS = [
+    "markdown.extensions.extra",
+    "markdown.extensions.meta",
+    "markdown.extensions.smarty",
+    "markdown.extensions.wikilinks",
+    "markdown_del_ins",
+]
+MARKDOWN_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+# Rendered html is keyed by source text, so bump this when the output of the
+# same text changes (extension options, snippet syntax etc).
+MARKDOWN_CACHE_VERSION = "%s:%s:1" % (
+    markdown.__version__,
+    ",".join(MARKDOWN_EXTENSIONS),
+)
+
+_markdown_renderers = threading.local()
+
+
+def _MarkdownCacheKey(content):
+    digest = hashlib.sha256(
+        (MARKDOWN_CACHE_VERSION + "\0" + content).encode()
+    ).hexdigest()
+    return "markdown:" + digest
+
+
+def _RenderMarkdownUncached(content):
+    # Building a Markdown instance with all the extensions costs more than
+    # converting a typical comment, so every thread keeps one around.
+    md = getattr(_markdown_renderers, "md", None)
+    if md is None:
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        _markdown_renderers.md = md
+    return md.reset().convert(content)
+
+
+def RenderMarkdownBatch(contents):
+    """Same as RenderMarkdown for a list of texts, with one cache roundtrip."""
+    keys = {x: _MarkdownCacheKey(x) for x in contents if x}
+    cache = caches["default"]
+    cached = cache.get_many(keys.values())
+    missing = {}
+    for content, key in keys.items():
+        if key not in cached:
+            cached[key] = missing[key] = _RenderMarkdownUncached(content)
+    if missing:
+        cache.set_many(missing, MARKDOWN_CACHE_TIMEOUT)
+    return [cached[keys[x]] if x else "" for x in contents]
+
+
 def RenderMarkdown(content, snippet_provider=None):
-    extensions = [
-        "markdown.extensions.extra",
-        "markdown.extensions.meta",
-        "markdown.extensions.smarty",
-        "markdown.extensions.wikilinks",
-        "markdown_del_ins",
-    ]
+    if not content:
+        return ""
     if snippet_provider:
-        extensions.append(MarkdownSnippet(snippet_provider))
-    return markdown.markdown(content, extensions=extensions) if content else ""
+        # Snippets are rendered from live data, so the result is not cached
+        # here. Callers that cache such documents defer the snippets
+        # themselves, see contest.views.RenderCompetitionDocument.
+        return markdown.markdown(
+            content,
+            extensions=MARKDOWN_EXTENSIONS
+            + [MarkdownSnippet(snippet_provider)],
+        )
+    return RenderMarkdownBatch([content])[0]
 
 
 def CreateUrl(url, *, ok_to_clone, creator=None):
@@ -330,6 +391,34 @@ def CreateUrl(url, *, ok_to_clone, creator=None):
     return u
 
 
+def CreateUrls(urls):
+    """Bulk CreateUrl: takes {original_url: ok_to_clone}.
+
+    Returns {original_url: URL}. Backups of urls that became clonable are
+    queued as a single task once the transaction commits.
+    """
+    found = {}
+    for u in URL.objects.filter(original_url__in=list(urls)).order_by("-id"):
+        found[u.original_url] = u
+    now = timezone.now()
+    found.update(
+        (u.original_url, u)
+        for u in URL.objects.bulk_create(
+            URL(original_url=x, creation_date=now)
+            for x in urls
+            if x not in found
+        )
+    )
+    to_clone = [u for x, u in found.items() if urls[x] and not u.ok_to_clone]
+    if to_clone:
+        for u in to_clone:
+            u.ok_to_clone = True
+        URL.objects.bulk_update(to_clone, ["ok_to_clone"])
+        ids = [u.id for u in to_clone]
+        transaction.on_commit(lambda: clone_files.delay(ids))
+    return found
+
+
 def GetIpAddr(request):
     x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
     if x_forwarded_for:
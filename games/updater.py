@@ -6,6 +6,7 @@ from django.utils import timezone
 
 from games.tools import CreateUrl
 
+from .authorstats import RefreshingAuthorStats
 from .importer import Importer
 from .models import (
     URL,
@@ -376,7 +377,9 @@ def UpdateGame(request, j, update_edit_time=True, kill_existing_urls=True):
         kill_existing=kill_existing_urls,
     )
     UpdateGameTags(request, g, j.get("tags", []), "game_id" in j)
-    UpdateGameAuthors(request, g, j.get("authors", []), "game_id" in j)
+    with RefreshingAuthorStats(g.id):
+        UpdateGameAuthors(request, g, j.get("authors", []), "game_id" in j)
+    Game.BumpRevision(g.id)
 
     return g.id
 
@@ -33,6 +33,16 @@ urlpatterns = [
     path("author/<int:author_id>/", views.show_author, name="show_author"),
     # API
     path("json/gameinfo/", views.json_gameinfo, name="json_gameinfo"),
+    path(
+        "json/editor-dictionaries/",
+        views.json_editor_dictionaries,
+        name="json_editor_dictionaries",
+    ),
+    path(
+        "json/alias-complete/",
+        views.json_alias_complete,
+        name="json_alias_complete",
+    ),
     path("json/commentvote/", views.json_commentvote, name="json_commentvote"),
     path(
         "json/categorizeurl/",
@@ -41,6 +51,11 @@ urlpatterns = [
     ),
     path("json/upload/", views.upload, name="upload"),
     path("json/import/", views.doImport, name="import"),
+    path(
+        "json/import/<int:job_id>/",
+        views.import_status,
+        name="import_status",
+    ),
     path("json/search/", views.json_search, name="json_search"),
     path(
         "json/author-search/",
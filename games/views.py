@@ -8,14 +8,15 @@ from django import forms
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import SuspiciousOperation
-from django.db import models
-from django.db.models import Count, OuterRef, Subquery
+from django.db.models import Count
 from django.db.models.functions import Coalesce
 from django.http import Http404
 from django.http.response import JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 from core.snippets import RenderSnippets
@@ -24,33 +25,32 @@ from ifdb.permissioner import perm_required
 from moder.actions import GetModerActions
 from moder.userlog import LogAction
 
+from .authorstats import PersonalityIdsOfGames, RefreshAuthorStats
+from .dictionaries import EditorDictionaries
 from .game_details import GameDetailsBuilder, GetCommentVotes, StarsFromRating
-from .importer import Importer
 from .importer.tools import CategorizeUrl
+from .importjob import FailStaleImportJob, ImportJobJson, StartImportJob
 from .models import (
     URL,
     Game,
     GameAuthor,
-    GameAuthorRole,
     GameComment,
     GameCommentVote,
-    GameTag,
-    GameTagCategory,
     GameURL,
     GameURLCategory,
     GameVote,
+    ImportJob,
     InterpretedGameUrl,
     Personality,
     PersonalityAlias,
+    PersonalityStats,
 )
 from .search import EncodeSearch, MakeAuthorSearch, MakeSearch
 from .tools import (
     ComputeGameRating,
-    ComputeHonors,
     RenderMarkdown,
     SnippetFromList,
 )
-from .updater import Importer2Json
 
 PERM_ADD_GAME = "@auth"  # Also for file upload, game import, vote
 PERM_ACCEPT_GAME_ADD = "(alias curation_admin)"
@@ -171,6 +171,8 @@ def vote_game(request):
     obj.edit_time = timezone.now()
     obj.star_rating = int(request.POST.get("score"))
     obj.save()
+    Game.BumpRevision(game.id)
+    RefreshAuthorStats(PersonalityIdsOfGames([game.id]))
 
     LogAction(
         request,
@@ -314,6 +316,7 @@ def comment_game(request):
     comment.creation_time = timezone.now()
     comment.text = request.POST.get("text", None)
     comment.save()
+    Game.BumpRevision(game.id)
 
     LogAction(
         request,
@@ -358,6 +361,7 @@ def json_commentvote(request):
             vote.save()
         else:
             vote.delete()
+        Game.BumpRevision(comment.game_id)
         LogAction(
             request,
             "gam-comment-like",
@@ -379,10 +383,20 @@ def json_commentvote(request):
 def show_game(request, game_id):
     try:
         g = GameDetailsBuilder(game_id, request)
-        LogAction(request, "gam-view", is_mutation=False, obj=g.game)
-        return render(request, "games/game.html", g.GetGameDict())
     except Game.DoesNotExist:
         raise Http404()
+    LogAction(request, "gam-view", is_mutation=False, obj=g.game)
+    etag = g.GetETag()
+    if etag:
+        etag = quote_etag(etag)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+    response = render(request, "games/game.html", g.GetGameDict())
+    if etag:
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 def show_author(request, author_id):
@@ -403,7 +417,8 @@ def show_author(request, author_id):
         if a.bio:
             res["bio"] = RenderMarkdown(a.bio)
 
-        res["honor"] = ComputeHonors(int(author_id))
+        stats = PersonalityStats.objects.filter(personality=a).first()
+        res["honor"] = stats.honor if stats else 0.0
         res["honor_stars"] = StarsFromRating(res["honor"])
         res["honor_str"] = "%.1f" % res["honor"]
         res["moder_actions"] = GetModerActions(request, "Personality", a)
@@ -613,47 +628,8 @@ def upload(request):
 ########################
 
 
-def authors(request):
-    res = {"roles": [], "authors": [], "value": []}
-    for x in GameAuthorRole.objects.order_by("order", "title").all():
-        res["roles"].append({"title": x.title, "id": x.id})
-
-    for x in PersonalityAlias.objects.order_by("name").all():
-        res["authors"].append({"name": x.name, "id": x.id})
-
-    return res
-
-
-def tags(request):
-    res = {"categories": [], "value": []}
-    for x in GameTagCategory.objects.order_by("order", "name"):
-        if not request.perm(x.show_in_edit_perm):
-            continue
-        val = {
-            "id": x.id,
-            "name": x.name,
-            "allow_new_tags": x.allow_new_tags,
-            "tags": [],
-        }
-        # TODO(crem) Optimize this.
-        for y in GameTag.objects.filter(category=x).order_by("name"):
-            val["tags"].append({
-                "id": y.id,
-                "name": y.name,
-            })
-        res["categories"].append(val)
-    return res
-
-
-def linktypes(request):
-    res = {"categories": []}
-    for x in GameURLCategory.objects.all():
-        res["categories"].append({
-            "id": x.id,
-            "title": x.title,
-            "uploadable": x.allow_cloning,
-        })
-    return res
+EDITOR_DICTIONARIES_MAX_AGE = 365 * 24 * 60 * 60
+ALIAS_COMPLETE_LIMIT = 20
 
 
 def BuildJsonGameInfo(request, game_id):
@@ -690,15 +666,64 @@ def BuildJsonGameInfo(request, game_id):
 
 def json_gameinfo(request):
     game_id = request.GET.get("game_id", None)
-    res = {
-        "authortypes": authors(request),
-        "tagtypes": tags(request),
-        "linktypes": linktypes(request),
-        "gamedata": BuildJsonGameInfo(request, game_id),
-    }
+    dictionaries = EditorDictionaries(request)
+    if request.GET.get("dictionaries") == "0":
+        # The editor fetches them separately from json_editor_dictionaries,
+        # which the browser keeps cached while the version stays the same.
+        res = {"dictionaries_version": dictionaries["version"]}
+    else:
+        res = {
+            "authortypes": dictionaries["authortypes"],
+            "tagtypes": dictionaries["tagtypes"],
+            "linktypes": dictionaries["linktypes"],
+            "dictionaries_version": dictionaries["version"],
+        }
+    res["gamedata"] = BuildJsonGameInfo(request, game_id)
     return JsonResponse(res)
 
 
+def json_editor_dictionaries(request):
+    res = EditorDictionaries(request)
+    etag = quote_etag(res["version"])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(res)
+    response["ETag"] = etag
+    if request.GET.get("v") == res["version"]:
+        # Versioned URLs never change their content.
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=EDITOR_DICTIONARIES_MAX_AGE,
+            immutable=True,
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def json_alias_complete(request):
+    prefix = request.GET.get("q", "").strip()
+    try:
+        limit = int(request.GET.get("limit", ALIAS_COMPLETE_LIMIT))
+    except ValueError:
+        raise SuspiciousOperation
+    if limit <= 0:
+        raise SuspiciousOperation
+    limit = min(limit, ALIAS_COMPLETE_LIMIT)
+    if not prefix:
+        return JsonResponse({"authors": []})
+    return JsonResponse({
+        "authors": [
+            {"id": id, "name": name}
+            for id, name in PersonalityAlias.objects
+            .filter(name__istartswith=prefix)
+            .order_by("name", "id")
+            .values_list("id", "name")[:limit]
+        ]
+    })
+
+
 def json_categorizeurl(request):
     url = request.GET.get("url")
     desc = request.GET.get("desc") or ""
@@ -730,20 +755,8 @@ def json_author_search(request):
         start=start,
         limit=limit,
         annotate={
-            "game_count": Coalesce(
-                Subquery(
-                    GameAuthor.objects
-                    .filter(
-                        role__symbolic_id="author",
-                        author__personality=OuterRef("pk"),
-                    )
-                    .values("author__personality")
-                    .annotate(cnt=Count("game", distinct=True))
-                    .values("cnt"),
-                    output_field=models.IntegerField(),
-                ),
-                0,
-            ),
+            "game_count": Coalesce("stats__game_count", 0),
+            "honor": Coalesce("stats__honor", 0.0),
         },
     )
 
@@ -826,8 +839,18 @@ def json_search(request):
 
 @perm_required(PERM_ADD_GAME)
 def doImport(request):
-    importer = Importer()
-    (raw_import, _) = importer.Import(request.GET.get("url"))
-    if "error" in raw_import:
-        return JsonResponse({"error": raw_import["error"]})
-    return JsonResponse(Importer2Json(raw_import))
+    url = request.GET.get("url")
+    if not url:
+        return JsonResponse({"error": "Не указан URL."})
+    job = StartImportJob(request.user, url)
+    return JsonResponse(ImportJobJson(job))
+
+
+def import_status(request, job_id):
+    request.perm.Ensure(PERM_ADD_GAME)
+    try:
+        job = ImportJob.objects.get(id=job_id, user=request.user)
+    except ImportJob.DoesNotExist:
+        raise Http404()
+    FailStaleImportJob(job)
+    return JsonResponse(ImportJobJson(job))
@@ -353,6 +353,9 @@ AUTH_PASSWORD_VALIDATORS = [
 # - CACHE_MAX_ENTRIES: max entries for file-based cache
 # - CACHE_LOCATION_TOR: separate location for tor-ips cache
 # - CACHE_MAX_ENTRIES_TOR: max entries for tor-ips cache
+# - CACHE_LOCATION_VERSIONS: separate location for the versions cache
+# - CACHE_LOCATION_GAME_PAGES: separate location for the game-pages cache
+# - CACHE_MAX_ENTRIES_GAME_PAGES: max entries for game-pages cache
 CACHE_BACKEND = os.environ.get(
     "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
 )
@@ -391,6 +394,41 @@ CACHES = {
         if "filebased" in CACHE_BACKEND
         else {},
     },
+    # Versions of cached data, see core/cacheversions.py. A handful of keys
+    # per competition, never culled in practice.
+    "versions": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get(
+            "CACHE_LOCATION_VERSIONS",
+            "/home/ifdb/tmp/django_cache_versions"
+            if not DEBUG
+            else os.path.join(BASE_DIR, "tmp/django_cache_versions"),
+        ),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 100000}
+        if "filebased" in CACHE_BACKEND
+        else {},
+    },
+    # Shared part of game pages, one entry per game viewed within a day, see
+    # games/game_details.py. Kept apart so they don't cull markdown and
+    # listings out of the default cache.
+    "game-pages": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get(
+            "CACHE_LOCATION_GAME_PAGES",
+            "/home/ifdb/tmp/django_cache_game_pages"
+            if not DEBUG
+            else os.path.join(BASE_DIR, "tmp/django_cache_game_pages"),
+        ),
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(
+                os.environ.get("CACHE_MAX_ENTRIES_GAME_PAGES", "10000")
+            ),
+        }
+        if "filebased" in CACHE_BACKEND
+        else {},
+    },
 }
 
 
@@ -420,11 +458,35 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
-CELERY_IMPORTS = ["core.tasks", "curation.tasks", "games.tasks"]
+CELERY_IMPORTS = [
+    "core.tasks",
+    "curation.tasks",
+    "games.tasks",
+    "moder.tasks",
+]
+
+# Non-mutating UserLog rows (page views, searches) are buffered in-process
+# and written in bulk by a background thread, see moder/userlog.py.
+USERLOG_BUFFERED = True
+USERLOG_BUFFER_SIZE = 200
+USERLOG_FLUSH_SECONDS = 10
+
+# Raw UserLog rows are rolled up into daily counters and deleted once older
+# than this, see moder/rollup.py. None keeps them forever.
+USERLOG_RETENTION_DAYS = 180
+USERLOG_PURGE_CHUNK_SIZE = 5000
 
 if "test" in sys.argv:
     CELERY_BROKER_URL = "memory://"
     CELERY_RESULT_BACKEND = "cache+memory://"
+    USERLOG_BUFFERED = False
+    CACHES = {
+        name: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": name,
+        }
+        for name in CACHES
+    }
 
 AUTH_USER_MODEL = "core.User"
 FILE_UPLOAD_PERMISSIONS = 0o644
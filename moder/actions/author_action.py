@@ -5,13 +5,13 @@ from django.db.models import Count
 from django.template.loader import render_to_string
 from django.urls import reverse
 
-from games.models import (
-    GameAuthor,
-    Personality,
-    PersonalityAlias,
-    PersonalityAliasRedirect,
-    PersonalityUrl,
+from games.authormerge import (
+    NEW_PERSONALITY,
+    ApplyAuthorMerges,
+    AuthorMergePlan,
+    DescribeAuthorMerges,
 )
+from games.models import Personality, PersonalityAlias, PersonalityUrl
 from moder.actions.tools import ModerAction, RegisterAction
 
 
@@ -174,98 +174,34 @@ class AliasEditAction(AuthorAction):
     def GetForm(self, var):
         return self.Form(self.obj, var)
 
-    def DoAction(self, action, form, execute):
+    def GetPlan(self, form):
         def F(field, id):
             return form.get("%s%d" % (field, id))
 
-        log = []
-        new_pers = None
+        plan = AuthorMergePlan()
         for x in PersonalityAlias.objects.filter(personality=self.obj):
             curalias = F("alias", x.id)
-            curid = x.id
             if x.name != curalias:
-                if execute:
-                    x.name = curalias
-                    x.save()
-                else:
-                    log.append(
-                        "[%s] будет переименован в [%s]" % (x.name, curalias)
-                    )
-
+                plan.renames[x.id] = curalias
             if x.personality_id != F("personality", x.id):
-                if F("personality", x.id):
-                    if execute:
-                        x.personality_id = F("personality", x.id)
-                        x.save()
-                    else:
-                        log.append(
-                            "[%s] будет присоединён к автору [%s]"
-                            % (
-                                x.name,
-                                Personality.objects.get(
-                                    pk=F("personality", x.id)
-                                ),
-                            )
-                        )
-                else:
-                    if execute:
-                        if not new_pers:
-                            new_pers = Personality()
-                            new_pers.name = x.name
-                            new_pers.save()
-                        x.personality_id = new_pers.id
-                        x.save()
-                    else:
-                        log.append(
-                            "Для псведонима [%s] будет создана новая "
-                            "свежая страница автора." % x.name
-                        )
-
+                plan.reassign[x.id] = F("personality", x.id) or NEW_PERSONALITY
             if x.id != F("moveto", x.id):
-                moveto = F("moveto", x.id)
-                if execute:
-                    for y in GameAuthor.objects.filter(author=x.id):
-                        y.author_id = moveto
-                        y.save()
-                    x.delete()
-                else:
-                    log.append(
-                        "Псевдоним [%s] подмешается в [%s]"
-                        % (
-                            x.name,
-                            PersonalityAlias.objects.get(
-                                pk=F("moveto", x.id)
-                            ).name,
-                        )
-                    )
-                if F("alwaysmove", curid):
-                    if execute:
-                        PersonalityAliasRedirect.objects.create(
-                            name=curalias, hidden_for_id=moveto
-                        )
-                    else:
-                        log.append(
-                            "(и это будет автоматически происходить с"
-                            " этим псевдонимом в будущем)"
-                        )
+                plan.moves[x.id] = F("moveto", x.id)
+                if F("alwaysmove", x.id):
+                    plan.redirects[curalias] = F("moveto", x.id)
             elif F("delete", x.id):
-                if execute:
-                    x.delete()
-                else:
-                    log.append("Псевдоним [%s] будет удалён" % x.name)
-                if F("alwaysdelete", curid):
-                    if execute:
-                        PersonalityAliasRedirect.objects.create(name=curalias)
-                    else:
-                        log.append(
-                            "(и это будет автоматически происходить с"
-                            " этим псевдонимом в будущем)"
-                        )
+                plan.deletes.add(x.id)
+                if F("alwaysdelete", x.id):
+                    plan.redirects[curalias] = None
+        return plan
 
+    def DoAction(self, action, form, execute):
+        plan = self.GetPlan(form)
         if execute:
+            ApplyAuthorMerges(plan)
             return "Done!"
         else:
-            return "<br>".join([escape(x) for x in log])
+            return "<br>".join([escape(x) for x in DescribeAuthorMerges(plan)])
 
 
 @RegisterAction
@@ -287,37 +223,11 @@ class AuthorCombineAction(AuthorAction):
 
     def DoAction(self, action, form, execute):
         fro = Personality.objects.get(pk=form["other_pers"])
+        if fro.id == self.obj.id:
+            return "Нельзя объединить автора с самим собой."
         if not execute:
             return "Будем объединять с %s " % fro
-        to = self.obj
-
-        newbio = ""
-        for x in [to.bio, fro.bio]:
-            val = x or ""
-            if newbio and val:
-                newbio += "\n\n"
-            newbio += val
-
-        if newbio:
-            to.bio = newbio
-        to.save()
-
-        for y in [PersonalityUrl, PersonalityAlias]:
-            for x in y.objects.filter(personality=fro):
-                x.personality = to
-                x.save()
-
-        fro.delete()
-
-        games = set()
-        for x in PersonalityAlias.objects.filter(personality=to):
-            for y in GameAuthor.objects.filter(author=x):
-                val = (y.role_id, y.game_id)
-                if val in games:
-                    y.delete()
-                else:
-                    games.add(val)
-
+        ApplyAuthorMerges(AuthorMergePlan(personalities={fro.id: self.obj.id}))
         return "Done!"
 
 
@@ -1,7 +1,9 @@
 from html import escape
 
+from django.db import transaction
 from django.urls import reverse
 
+from games.authorstats import RefreshingAuthorStats
 from games.models import Game, GameAuthor, GameURL
 from moder.actions.tools import ModerAction, RegisterAction
 
@@ -52,10 +54,15 @@ class GameCloneAction(GameAction):
 
             # TODO(crem) Interpreted game url
 
-        for x in GameAuthor.objects.filter(game=fro):
-            x.pk = None
-            x.game = to
-            x.save()
+        with RefreshingAuthorStats(to.id):
+            for x in GameAuthor.objects.filter(game=fro):
+                x.pk = None
+                x.game = to
+                x.save()
+
+        # The clone keeps the creation time, which the game page cache keys
+        # on along with the id and revision.
+        Game.BumpRevision(to.id)
 
         return GenLinkButton(
             "Ссылка на клон",
@@ -97,7 +104,11 @@ class GameDeleteAction(GameAction):
 
     def DoAction(self, action, form, execute):
         if execute:
-            self.obj.delete()
+            with (
+                transaction.atomic(),
+                RefreshingAuthorStats(self.obj.id),
+            ):
+                self.obj.delete()
             return "Удалено!"
         else:
             return "Удалить эту игру?"
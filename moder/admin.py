@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import UserLog
+from .models import UserLog, UserLogDaily, UserLogUserDaily
 
 
 @admin.register(UserLog)
@@ -17,3 +17,26 @@ class UserLogAdmin(admin.ModelAdmin):
     search_fields = ["action", "user", "ip_addr", "timestamp", "is_mutation"]
     list_filter = ["action"]
     raw_id_fields = ["user"]
+
+
+@admin.register(UserLogDaily)
+class UserLogDailyAdmin(admin.ModelAdmin):
+    list_display = [
+        "date",
+        "action",
+        "obj_type",
+        "obj_id",
+        "count",
+        "user_count",
+        "anonymous_count",
+    ]
+    list_filter = ["action"]
+    date_hierarchy = "date"
+
+
+@admin.register(UserLogUserDaily)
+class UserLogUserDailyAdmin(admin.ModelAdmin):
+    list_display = ["date", "action", "user", "count"]
+    list_filter = ["action"]
+    date_hierarchy = "date"
+    raw_id_fields = ["user"]
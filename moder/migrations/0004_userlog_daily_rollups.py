@@ -0,0 +1,86 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("moder", "0003_alter_userlog_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userlog",
+            name="timestamp",
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.CreateModel(
+            name="UserLogDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(db_index=True)),
+                ("action", models.CharField(max_length=32)),
+                (
+                    "obj_type",
+                    models.CharField(blank=True, max_length=32, null=True),
+                ),
+                ("obj_id", models.IntegerField(blank=True, null=True)),
+                ("count", models.IntegerField()),
+                ("user_count", models.IntegerField()),
+                ("anonymous_count", models.IntegerField()),
+            ],
+            options={
+                "default_permissions": (),
+                "indexes": [
+                    models.Index(
+                        fields=["obj_type", "obj_id", "date"],
+                        name="moder_userl_obj_typ_35ce66_idx",
+                    )
+                ],
+                "unique_together": {("date", "action", "obj_type", "obj_id")},
+            },
+        ),
+        migrations.CreateModel(
+            name="UserLogUserDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(db_index=True)),
+                ("action", models.CharField(max_length=32)),
+                ("count", models.IntegerField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "indexes": [
+                    models.Index(
+                        fields=["user", "date"],
+                        name="moder_userl_user_id_57c68e_idx",
+                    )
+                ],
+                "unique_together": {("date", "action", "user")},
+            },
+        ),
+    ]
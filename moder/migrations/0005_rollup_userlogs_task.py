@@ -0,0 +1,39 @@
+import json
+
+from django.db import migrations
+
+
+def create_rollup_task(apps, schema_editor):
+    IntervalSchedule = apps.get_model("django_celery_beat", "IntervalSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+
+    schedule, _ = IntervalSchedule.objects.get_or_create(
+        every=1,
+        period="days",
+    )
+    PeriodicTask.objects.update_or_create(
+        name="Roll up user logs",
+        defaults={
+            "interval": schedule,
+            "task": "moder.tasks.rollup_userlogs",
+            "args": json.dumps([]),
+            "kwargs": json.dumps({}),
+            "enabled": False,
+        },
+    )
+
+
+def delete_rollup_task(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(name="Roll up user logs").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("moder", "0004_userlog_daily_rollups"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rollup_task, delete_rollup_task),
+    ]
@@ -15,7 +15,7 @@ class UserLog(models.Model):
     action = models.CharField(max_length=32)
     ip_addr = models.CharField(max_length=50, null=True, blank=True)
     session = models.CharField(max_length=32, null=True, blank=True)
-    timestamp = models.DateTimeField()
+    timestamp = models.DateTimeField(db_index=True)
     perm = models.TextField(null=True, blank=True)
     is_mutation = models.BooleanField()
     obj_type = models.CharField(max_length=32, null=True, blank=True)
@@ -26,3 +26,36 @@ class UserLog(models.Model):
     after = models.TextField(null=True, blank=True)
     useragent = models.TextField(null=True, blank=True)
     note = models.TextField(null=True, blank=True)
+
+
+class UserLogDaily(models.Model):
+    """UserLog rows of one day, counted per action and object."""
+
+    class Meta:
+        default_permissions = ()
+        unique_together = (("date", "action", "obj_type", "obj_id"),)
+        indexes = [models.Index(fields=["obj_type", "obj_id", "date"])]
+
+    date = models.DateField(db_index=True)
+    action = models.CharField(max_length=32)
+    obj_type = models.CharField(max_length=32, null=True, blank=True)
+    obj_id = models.IntegerField(null=True, blank=True)
+    count = models.IntegerField()
+    user_count = models.IntegerField()
+    anonymous_count = models.IntegerField()
+
+
+class UserLogUserDaily(models.Model):
+    """UserLog rows of one day, counted per action and logged-in user."""
+
+    class Meta:
+        default_permissions = ()
+        unique_together = (("date", "action", "user"),)
+        indexes = [models.Index(fields=["user", "date"])]
+
+    date = models.DateField(db_index=True)
+    action = models.CharField(max_length=32)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    count = models.IntegerField()
@@ -0,0 +1,110 @@
+"""Daily UserLog rollups and retention.
+
+Every finished day of UserLog is counted into UserLogDaily (per action and
+object) and UserLogUserDaily (per action and user). Raw rows of views are
+kept for ``USERLOG_RETENTION_DAYS`` and deleted in chunks afterwards, but
+never before their day has been rolled up; mutations are kept for good.
+"""
+
+from datetime import datetime, time, timedelta
+from logging import getLogger
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .models import UserLog, UserLogDaily, UserLogUserDaily
+
+logger = getLogger("worker")
+
+# A day is rolled up this long after it ends. Web processes buffer logs for
+# up to USERLOG_FLUSH_SECONDS, and the last of them must be in by then.
+ROLLUP_LAG = timedelta(hours=1)
+
+
+def _day_range(day):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def RollupDay(day):
+    """(Re)builds rollup rows of a single day, returns the number of logs."""
+    start, end = _day_range(day)
+    logs = UserLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    per_object = [
+        UserLogDaily(date=day, **x)
+        for x in logs
+        .values("action", "obj_type", "obj_id")
+        .annotate(
+            count=Count("id"),
+            user_count=Count("user", distinct=True),
+            anonymous_count=Count("id", filter=Q(user__isnull=True)),
+        )
+        .order_by()
+    ]
+    per_user = [
+        UserLogUserDaily(date=day, **x)
+        for x in logs
+        .filter(user__isnull=False)
+        .values("action", "user_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    ]
+    with transaction.atomic():
+        UserLogDaily.objects.filter(date=day).delete()
+        UserLogUserDaily.objects.filter(date=day).delete()
+        UserLogDaily.objects.bulk_create(per_object, batch_size=1000)
+        UserLogUserDaily.objects.bulk_create(per_user, batch_size=1000)
+    return sum(x.count for x in per_object)
+
+
+def RolledUpUntil():
+    """First day which doesn't have its rollup yet."""
+    last = UserLogDaily.objects.aggregate(x=Max("date"))["x"]
+    if last is not None:
+        return last + timedelta(days=1)
+    first = UserLog.objects.aggregate(x=Min("timestamp"))["x"]
+    if first is None:
+        return None
+    return first.date()
+
+
+def RollupUserLogs(today=None):
+    """Rolls up all finished days which are not rolled up yet."""
+    today = today or (timezone.now() - ROLLUP_LAG).date()
+    day = RolledUpUntil()
+    days = 0
+    while day is not None and day < today:
+        count = RollupDay(day)
+        logger.info("Rolled up %d user logs of %s", count, day)
+        day += timedelta(days=1)
+        days += 1
+    return days
+
+
+def PurgeUserLogs(today=None, retention_days=None, chunk_size=None):
+    """Deletes raw UserLog rows which are both rolled up and expired."""
+    today = today or timezone.now().date()
+    if retention_days is None:
+        retention_days = settings.USERLOG_RETENTION_DAYS
+    chunk_size = chunk_size or settings.USERLOG_PURGE_CHUNK_SIZE
+    rolled_up = RolledUpUntil()
+    if retention_days is None or rolled_up is None:
+        return 0
+    cutoff, _ = _day_range(
+        min(today - timedelta(days=retention_days), rolled_up)
+    )
+    deleted = 0
+    while True:
+        ids = list(
+            UserLog.objects
+            .filter(timestamp__lt=cutoff, is_mutation=False)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        deleted += UserLog.objects.filter(id__in=ids).delete()[0]
+    logger.info("Purged %d user logs older than %s", deleted, cutoff)
+    return deleted
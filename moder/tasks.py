@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .rollup import PurgeUserLogs, RollupUserLogs
+
+
+@shared_task
+def rollup_userlogs():
+    return {"days": RollupUserLogs(), "purged": PurgeUserLogs()}
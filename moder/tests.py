@@ -1 +1,182 @@
-# Create your tests here.
+from datetime import date, datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase, override_settings
+
+from ifdb.permissioner import Permissioner
+
+from .models import UserLog, UserLogDaily, UserLogUserDaily
+from .rollup import PurgeUserLogs, RollupUserLogs
+from .userlog import LogAction, UserLogBuffer
+
+
+class UserLogBufferTest(TestCase):
+    def setUp(self):
+        self.buffer = UserLogBuffer(max_size=1000, max_delay=3600)
+        patcher = patch("moder.userlog._buffer", self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self):
+        request = RequestFactory().get("/", HTTP_USER_AGENT="test-agent")
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        with patch("ifdb.permissioner.IsTor", return_value=False):
+            request.perm = Permissioner(request)
+        return request
+
+    @override_settings(USERLOG_BUFFERED=True)
+    def test_views_are_buffered_until_flush(self):
+        request = self.request()
+        for _ in range(3):
+            LogAction(request, "gam-view", is_mutation=False, obj_id=7)
+
+        self.assertFalse(UserLog.objects.exists())
+        with self.assertNumQueries(1):
+            self.buffer.flush()
+        self.assertEqual(
+            list(UserLog.objects.values_list("action", "obj_id")),
+            [("gam-view", 7)] * 3,
+        )
+        self.assertEqual(self.buffer.records, [])
+
+    @override_settings(USERLOG_BUFFERED=True)
+    def test_mutations_are_written_immediately(self):
+        LogAction(self.request(), "gam-vote", is_mutation=True, obj_id=7)
+
+        self.assertEqual(UserLog.objects.get().action, "gam-vote")
+        self.assertEqual(self.buffer.records, [])
+
+    def test_buffer_size_wakes_flusher(self):
+        buffer = UserLogBuffer(max_size=2, max_delay=3600)
+        with patch.object(buffer, "_run"):
+            buffer.add(UserLog())
+            self.assertFalse(buffer.wakeup.is_set())
+            buffer.add(UserLog())
+        self.assertTrue(buffer.wakeup.is_set())
+
+
+class UserLogRollupTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            username="reader", email="reader@example.com"
+        )
+
+    def log(
+        self,
+        timestamp,
+        action="gam-view",
+        user=None,
+        obj_id=1,
+        is_mutation=False,
+    ):
+        UserLog.objects.create(
+            timestamp=timestamp,
+            action=action,
+            user=user,
+            obj_type="Game",
+            obj_id=obj_id,
+            is_mutation=is_mutation,
+        )
+
+    def test_rolls_up_finished_days(self):
+        self.log(datetime(2024, 5, 1, 10))
+        self.log(datetime(2024, 5, 1, 11), user=self.user)
+        self.log(datetime(2024, 5, 1, 12), user=self.user)
+        self.log(datetime(2024, 5, 1, 13), obj_id=2)
+        self.log(datetime(2024, 5, 3, 9), user=self.user)
+        self.log(datetime(2024, 5, 4, 9))
+
+        self.assertEqual(RollupUserLogs(today=date(2024, 5, 4)), 3)
+
+        self.assertEqual(
+            set(
+                UserLogDaily.objects.values_list(
+                    "date",
+                    "obj_id",
+                    "count",
+                    "user_count",
+                    "anonymous_count",
+                )
+            ),
+            {
+                (date(2024, 5, 1), 1, 3, 1, 1),
+                (date(2024, 5, 1), 2, 1, 0, 1),
+                (date(2024, 5, 3), 1, 1, 1, 0),
+            },
+        )
+        self.assertEqual(
+            set(UserLogUserDaily.objects.values_list("date", "user", "count")),
+            {
+                (date(2024, 5, 1), self.user.id, 2),
+                (date(2024, 5, 3), self.user.id, 1),
+            },
+        )
+
+    def test_rollup_is_incremental(self):
+        self.log(datetime(2024, 5, 1, 10))
+        RollupUserLogs(today=date(2024, 5, 2))
+        self.log(datetime(2024, 5, 2, 10))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(RollupUserLogs(today=date(2024, 5, 2)), 0)
+        self.assertEqual(RollupUserLogs(today=date(2024, 5, 3)), 1)
+        self.assertEqual(
+            list(
+                UserLogDaily.objects.order_by("date").values_list(
+                    "date", "count"
+                )
+            ),
+            [(date(2024, 5, 1), 1), (date(2024, 5, 2), 1)],
+        )
+
+    def test_purge_keeps_recent_and_unrolled_logs(self):
+        for day in range(1, 11):
+            self.log(datetime(2024, 5, day, 10))
+        self.log(datetime(2024, 5, 1, 11), action="gam-edit", is_mutation=True)
+        RollupUserLogs(today=date(2024, 5, 4))
+
+        deleted = PurgeUserLogs(
+            today=date(2024, 5, 11), retention_days=5, chunk_size=2
+        )
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(
+            list(
+                UserLog.objects.order_by("timestamp").values_list(
+                    "timestamp", flat=True
+                )[:2]
+            ),
+            [datetime(2024, 5, 1, 11), datetime(2024, 5, 4, 10)],
+        )
+        self.assertEqual(
+            UserLogDaily.objects.values("date").distinct().count(), 3
+        )
+
+    def test_rollup_waits_for_buffered_logs(self):
+        self.log(datetime(2024, 5, 1, 23, 59))
+
+        with patch(
+            "django.utils.timezone.now",
+            return_value=datetime(2024, 5, 2, 0, 0, 30),
+        ):
+            self.assertEqual(RollupUserLogs(), 0)
+        self.log(datetime(2024, 5, 1, 23, 59, 59))
+        with patch(
+            "django.utils.timezone.now",
+            return_value=datetime(2024, 5, 2, 2),
+        ):
+            self.assertEqual(RollupUserLogs(), 1)
+
+        self.assertEqual(UserLogDaily.objects.get().count, 2)
+
+    @override_settings(USERLOG_RETENTION_DAYS=None)
+    def test_purge_can_be_disabled(self):
+        self.log(datetime(2020, 1, 1))
+        RollupUserLogs()
+
+        self.assertEqual(PurgeUserLogs(), 0)
+        self.assertEqual(UserLog.objects.count(), 1)
@@ -1,11 +1,73 @@
+import atexit
 import json
+import threading
+from logging import getLogger
 
+from django.conf import settings
+from django.db import close_old_connections
 from django.utils import timezone
 
 from games.tools import GetIpAddr
 
 from .models import UserLog
 
+logger = getLogger("web")
+
+
+class UserLogBuffer:
+    """Collects UserLog rows in-process and writes them with bulk_create.
+
+    Rows are flushed by a background thread once `max_size` of them have
+    accumulated or `max_delay` seconds have passed, whichever comes first,
+    and once more when the process exits.
+    """
+
+    def __init__(self, max_size, max_delay):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.records = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="userlog-flusher", daemon=True
+                )
+                self.thread.start()
+            if len(self.records) >= self.max_size:
+                self.wakeup.set()
+
+    def flush(self):
+        with self.lock:
+            records, self.records = self.records, []
+        if records:
+            UserLog.objects.bulk_create(records, batch_size=self.max_size)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.max_delay)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Unable to write user logs")
+            finally:
+                close_old_connections()
+
+
+_buffer = UserLogBuffer(
+    settings.USERLOG_BUFFER_SIZE, settings.USERLOG_FLUSH_SECONDS
+)
+atexit.register(_buffer.flush)
+
+
+def FlushUserLogs():
+    _buffer.flush()
+
 
 def LogAction(
     request,
@@ -43,4 +105,9 @@ def LogAction(
         x.before = json.dumps(before, ensure_ascii=False, sort_keys=2)
     if after:
         x.after = json.dumps(after, ensure_ascii=False, sort_keys=2)
-    x.save()
+    # Mutations are rare and belong with the change they describe, so only
+    # views and searches go through the buffer.
+    if is_mutation or not settings.USERLOG_BUFFERED:
+        x.save()
+    else:
+        _buffer.add(x)